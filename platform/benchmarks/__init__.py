@@ -0,0 +1,7 @@
+"""
+Micro benchmarks for hot paths of the platform.
+Run from the platform directory, e.g. `python -m benchmarks.truncation`
+"""
+
+# The schemas import the agent API package, so it has to be loaded first
+import reworkd_platform.web.api.agent  # noqa: F401
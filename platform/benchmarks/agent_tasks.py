@@ -0,0 +1,95 @@
+"""
+Compares the per-step latency of recording an agent task by checking the run
+and the task count before inserting (three round trips) against the single
+conditional INSERT ... SELECT of AgentCRUD.create_task.
+
+Requires the MySQL database configured through the REWORKD_PLATFORM_DB_*
+settings, e.g. the one started by docker-compose. Runs and tasks created by the
+benchmark are deleted afterwards.
+
+    python -m benchmarks.agent_tasks
+"""
+import asyncio
+import time
+from statistics import median
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from reworkd_platform.db.crud.agent import AgentCRUD
+from reworkd_platform.db.meta import meta
+from reworkd_platform.db.models.agent import AgentRun, AgentTask
+from reworkd_platform.db.utils import create_engine
+from reworkd_platform.schemas.user import UserBase
+
+STEPS = 200
+STEPS_PER_RUN = 20  # Below max_loops so every step is accepted
+
+Step = Callable[[AgentCRUD, str], Awaitable[object]]
+
+
+async def validate_then_insert(crud: AgentCRUD, run_id: str) -> AgentTask:
+    await crud.validate_task_count(run_id, "analyze")
+    return await AgentTask(run_id=run_id, type_="analyze").save(crud.session)
+
+
+async def conditional_insert(crud: AgentCRUD, run_id: str) -> AgentTask:
+    return await crud.create_task(run_id, "analyze")
+
+
+async def measure(
+    session_factory: async_sessionmaker, user: UserBase, step: Step
+) -> List[float]:
+    timings: List[float] = []
+    run_ids: List[str] = []
+
+    for i in range(STEPS):
+        async with session_factory() as session:
+            crud = AgentCRUD(session, user)
+            if i % STEPS_PER_RUN == 0:
+                run_ids.append((await crud.create_run("benchmark")).id)
+                await session.commit()
+
+            # A request records its step and commits
+            start = time.perf_counter()
+            await step(crud, run_ids[-1])
+            await session.commit()
+            timings.append(time.perf_counter() - start)
+
+    async with session_factory() as session:
+        await session.execute(delete(AgentTask).where(AgentTask.run_id.in_(run_ids)))
+        await session.execute(delete(AgentRun).where(AgentRun.id.in_(run_ids)))
+        await session.commit()
+
+    return timings
+
+
+async def run() -> None:
+    engine = create_engine()
+    async with engine.begin() as connection:
+        await connection.run_sync(
+            meta.create_all, tables=[AgentRun.__table__, AgentTask.__table__]
+        )
+
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    user = UserBase(id="benchmark", email="benchmark@example.com")
+
+    print(f"{'':>22} {'median (ms)':>12} {'p95 (ms)':>10}")
+    for name, step in [
+        ("validate then insert", validate_then_insert),
+        ("conditional insert", conditional_insert),
+    ]:
+        timings = sorted(await measure(session_factory, user, step))
+        p95 = timings[int(len(timings) * 0.95)]
+        print(f"{name:>22} {median(timings) * 1e3:>12.2f} {p95 * 1e3:>10.2f}")
+
+    await engine.dispose()
+
+
+def main() -> None:
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
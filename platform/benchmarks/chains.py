@@ -0,0 +1,79 @@
+"""
+Compares the per-request cost of building the prompt and LLMChain objects of
+the agent endpoints against binding the prebuilt chain templates to a model.
+
+    python -m benchmarks.chains
+"""
+from timeit import timeit
+from typing import Callable, Dict
+
+from langchain import LLMChain
+from langchain.prompts import ChatPromptTemplate, SystemMessagePromptTemplate
+
+from reworkd_platform.schemas.agent import ModelSettings
+from reworkd_platform.schemas.user import UserBase
+from reworkd_platform.settings import Settings
+from reworkd_platform.web.api.agent.chains import (
+    code_chain,
+    create_tasks_chain,
+    execute_task_chain,
+    start_goal_chain,
+    summarize_chain,
+    summarize_with_sources_chain,
+)
+from reworkd_platform.web.api.agent.model_factory import create_model
+from reworkd_platform.web.api.agent.prompts import (
+    code_prompt,
+    create_tasks_prompt,
+    execute_task_prompt,
+    start_goal_prompt,
+    summarize_prompt,
+    summarize_with_sources_prompt,
+)
+
+NUMBER = 2_000
+
+
+def main() -> None:
+    model = create_model(
+        Settings(openai_api_key="key"),
+        ModelSettings(),
+        UserBase(id="user", email="user@example.com"),
+    )
+
+    def system_chain(prompt: ChatPromptTemplate) -> LLMChain:
+        chat_prompt = ChatPromptTemplate.from_messages(
+            [SystemMessagePromptTemplate(prompt=prompt)]
+        )
+        return LLMChain(llm=model, prompt=chat_prompt)
+
+    before: Dict[str, Callable[[], object]] = {
+        # start_goal_agent built its chat prompt twice
+        "start": lambda: (
+            system_chain(start_goal_prompt),
+            system_chain(start_goal_prompt),
+        ),
+        "create": lambda: system_chain(create_tasks_prompt),
+        "reason": lambda: LLMChain(llm=model, prompt=execute_task_prompt),
+        "code": lambda: LLMChain(llm=model, prompt=code_prompt),
+        "summarize": lambda: LLMChain(llm=model, prompt=summarize_prompt),
+        "search": lambda: LLMChain(llm=model, prompt=summarize_with_sources_prompt),
+    }
+    after: Dict[str, Callable[[], object]] = {
+        "start": lambda: start_goal_chain.bind(model),
+        "create": lambda: create_tasks_chain.bind(model),
+        "reason": lambda: execute_task_chain.bind(model),
+        "code": lambda: code_chain.bind(model),
+        "summarize": lambda: summarize_chain.bind(model),
+        "search": lambda: summarize_with_sources_chain.bind(model),
+    }
+
+    print(f"{'endpoint':>10} {'before (us)':>12} {'after (us)':>12}")
+    for name in before:
+        built = timeit(before[name], number=NUMBER) / NUMBER * 1e6
+        bound = timeit(after[name], number=NUMBER) / NUMBER * 1e6
+        print(f"{name:>10} {built:>12.1f} {bound:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Times LocalMemory's similarity search over 10k, 100k and 1M embeddings of
+OPENAI_EMBEDDING_DIM for each storage type, with and without memory mapping.
+Configurations whose matrix does not fit in half the available memory are
+skipped.
+
+    python -m benchmarks.local_memory
+"""
+import os
+import time
+from pathlib import Path
+from statistics import median
+from tempfile import TemporaryDirectory
+from typing import List, Optional
+
+import numpy as np
+
+from reworkd_platform.services.local_memory.store import VectorStore
+from reworkd_platform.web.api.memory.memory import OPENAI_EMBEDDING_DIM
+
+SIZES = [10_000, 100_000, 1_000_000]
+DTYPES = ["float32", "float16", "int8"]
+QUERIES = 20
+CHUNK = 10_000
+
+
+def available_memory() -> int:
+    return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+
+
+def build(size: int, dtype: str, path: Optional[Path]) -> VectorStore:
+    rng = np.random.default_rng(0)
+    store = VectorStore(OPENAI_EMBEDDING_DIM, dtype, path)
+    for start in range(0, size, CHUNK):
+        count = min(CHUNK, size - start)
+        ids = [str(i) for i in range(start, start + count)]
+        vectors = rng.standard_normal((count, OPENAI_EMBEDDING_DIM), np.float32)
+        store.add(ids, ids, vectors)
+    return store
+
+
+def search_ms(store: VectorStore) -> List[float]:
+    rng = np.random.default_rng(1)
+    timings = []
+    for _ in range(QUERIES):
+        query = rng.standard_normal(OPENAI_EMBEDDING_DIM, np.float32)
+        start = time.perf_counter()
+        store.search(query, top_k=5)
+        timings.append((time.perf_counter() - start) * 1e3)
+    return timings
+
+
+def main() -> None:
+    print(
+        f"{'vectors':>10} {'dtype':>8} {'mmap':>5} {'median (ms)':>12} {'max (ms)':>9}"
+    )
+    for size in SIZES:
+        for dtype in DTYPES:
+            matrix_bytes = size * OPENAI_EMBEDDING_DIM * np.dtype(dtype).itemsize
+            if matrix_bytes > available_memory() / 2:
+                print(f"{size:>10} {dtype:>8} {'':>5} {'skipped':>12}")
+                continue
+
+            for mapped in (False, True):
+                with TemporaryDirectory() as directory:
+                    path = Path(directory) if mapped else None
+                    timings = search_ms(build(size, dtype, path))
+                print(
+                    f"{size:>10} {dtype:>8} {'yes' if mapped else 'no':>5} "
+                    f"{median(timings):>12.2f} {max(timings):>9.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
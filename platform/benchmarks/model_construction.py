@@ -0,0 +1,34 @@
+"""
+Compares the per-request cost of building a chat model from scratch against
+copying a pooled one, as done by create_model for every agent service.
+
+    python -m benchmarks.model_construction
+"""
+from timeit import timeit
+
+from reworkd_platform.schemas.agent import ModelSettings
+from reworkd_platform.schemas.user import UserBase
+from reworkd_platform.settings import Settings
+from reworkd_platform.web.api.agent.model_factory import ModelPool, create_model
+
+NUMBER = 2_000
+
+
+def main() -> None:
+    settings = Settings(openai_api_key="key")
+    user = UserBase(id="user", email="user@example.com")
+    model_settings = ModelSettings()
+    unpooled = ModelPool(max_size=0)
+    pooled = ModelPool(max_size=16)
+
+    print(f"{'':>10} {'per model (us)':>16}")
+    for name, pool in [("unpooled", unpooled), ("pooled", pooled)]:
+        seconds = timeit(
+            lambda: create_model(settings, model_settings, user, pool=pool),
+            number=NUMBER,
+        )
+        print(f"{name:>10} {seconds / NUMBER * 1e6:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
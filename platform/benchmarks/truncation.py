@@ -0,0 +1,47 @@
+"""
+Compares truncating agent results for summarize_task_agent by joining and
+tokenizing everything against TokenService.truncate. The former grows with the
+total result size while the latter stays flat.
+
+    python -m benchmarks.truncation
+"""
+from timeit import timeit
+
+from reworkd_platform.services.tokenizer.token_service import TokenService
+
+MAX_TOKENS = 7000
+RESULT = (
+    "The economic growth forecast for the region has been adjusted from 2.5% "
+    "to 3.1% due to improved trade relations[1](https://economictimes.com). "
+) * 40
+
+
+def join_and_tokenize(service: TokenService, results: list[str]) -> str:
+    tokens = service.tokenize("".join(results))
+    return service.detokenize(tokens[:MAX_TOKENS])
+
+
+def main() -> None:
+    service = TokenService.create()
+
+    print(f"{'results':>8} {'chars':>12} {'join (ms)':>12} {'truncate (ms)':>14}")
+    for count in [10, 100, 1_000, 10_000]:
+        results = [f"{i}: {RESULT}" for i in range(count)]
+        chars = sum(len(result) for result in results)
+        number = 5
+
+        joined = timeit(lambda: join_and_tokenize(service, results), number=number)
+        # A fresh service per run so memoized counts do not flatter the result
+        truncated = timeit(
+            lambda: TokenService(service.encoding).truncate(results, MAX_TOKENS),
+            number=number,
+        )
+
+        print(
+            f"{count:>8} {chars:>12,} "
+            f"{joined / number * 1000:>12.2f} {truncated / number * 1000:>14.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
+import uuid
+from typing import TYPE_CHECKING, List, Optional
+
 from fastapi import HTTPException
-from sqlalchemy import and_, func, select
+from sqlalchemy import Insert, and_, func, insert, literal, select, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from reworkd_platform.db.crud.base import BaseCrud
@@ -9,11 +12,20 @@ from reworkd_platform.schemas.user import UserBase
 from reworkd_platform.settings import settings
 from reworkd_platform.web.api.errors import MaxLoopsError, MultipleSummaryError
 
+if TYPE_CHECKING:  # The writer records tasks through the crud
+    from reworkd_platform.services.task_writer.writer import AgentTaskWriter
+
 
 class AgentCRUD(BaseCrud):
-    def __init__(self, session: AsyncSession, user: UserBase):
+    def __init__(
+        self,
+        session: AsyncSession,
+        user: UserBase,
+        writer: Optional["AgentTaskWriter"] = None,
+    ):
         super().__init__(session)
         self.user = user
+        self.writer = writer
 
     async def create_run(self, goal: str) -> AgentRun:
         return await AgentRun(
@@ -22,13 +34,40 @@ class AgentCRUD(BaseCrud):
         ).save(self.session)
 
     async def create_task(self, run_id: str, type_: Loop_Step) -> AgentTask:
-        await self.validate_task_count(run_id, type_)
-        return await AgentTask(
-            run_id=run_id,
-            type_=type_,
-        ).save(self.session)
+        return (await self.create_tasks(run_id, type_, 1))[0]
+
+    async def create_tasks(
+        self, run_id: str, type_: Loop_Step, count: int
+    ) -> List[AgentTask]:
+        """
+        Records count steps of a run in a single round trip.
+        The tasks are only inserted if the run exists and all of them fit below
+        the step's limit, so either every task is recorded or none is. When
+        nothing is inserted the limits are checked again to raise the matching
+        error. With a write-behind writer the tasks are buffered.
+        """
+        if self.writer:
+            return await self.writer.record_many(self, run_id, type_, count)
+
+        tasks = [
+            AgentTask(id=str(uuid.uuid4()), run_id=run_id, type_=type_)
+            for _ in range(count)
+        ]
+        result = await self.session.execute(
+            create_task_statement([task.id for task in tasks], run_id, type_)
+        )
+        if result.rowcount == count:
+            return tasks
+
+        check_task_count(type_, await self.count_tasks(run_id, type_) + count - 1)
+        self.session.add_all(tasks)
+        await self.session.flush()
+        return tasks
 
     async def validate_task_count(self, run_id: str, type_: str) -> None:
+        check_task_count(type_, await self.count_tasks(run_id, type_))
+
+    async def count_tasks(self, run_id: str, type_: str) -> int:
         if not await AgentRun.get(self.session, run_id):
             raise HTTPException(404, f"Run {run_id} not found")
 
@@ -39,20 +78,52 @@ class AgentCRUD(BaseCrud):
             )
         )
 
-        task_count = (await self.session.execute(query)).scalar_one()
-        max_ = settings.max_loops
+        return (await self.session.execute(query)).scalar_one()
 
-        if task_count >= max_:
-            raise MaxLoopsError(
-                StopIteration(),
-                f"Max loops of {max_} exceeded, shutting down.",
-                429,
-                should_log=False,
-            )
 
-        if type_ == "summarize" and task_count > 1:
-            raise MultipleSummaryError(
-                StopIteration(),
-                "Multiple summary tasks are not allowed",
-                429,
-            )
+def check_task_count(type_: str, task_count: int) -> None:
+    max_ = settings.max_loops
+
+    if task_count >= max_:
+        raise MaxLoopsError(
+            StopIteration(),
+            f"Max loops of {max_} exceeded, shutting down.",
+            429,
+            should_log=False,
+        )
+
+    if type_ == "summarize" and task_count > 1:
+        raise MultipleSummaryError(
+            StopIteration(),
+            "Multiple summary tasks are not allowed",
+            429,
+        )
+
+
+def get_task_limit(type_: str) -> int:
+    # A run has a single summary, which may be retried once
+    return min(settings.max_loops, 2) if type_ == "summarize" else settings.max_loops
+
+
+def create_task_statement(task_ids: List[str], run_id: str, type_: str) -> Insert:
+    """
+    INSERT ... SELECT that only yields its rows while all of them keep the run
+    within limits
+    """
+    task_count = (
+        select(func.count(AgentTask.id))
+        .where(and_(AgentTask.run_id == run_id, AgentTask.type_ == type_))
+        .scalar_subquery()
+    )
+    rows = union_all(
+        *(select(literal(id_).label("id")) for id_ in task_ids)
+    ).subquery()
+    source = (
+        select(rows.c.id, literal(run_id), literal(type_))
+        .select_from(rows.join(AgentRun, AgentRun.id == run_id))
+        .where(task_count <= get_task_limit(type_) - len(task_ids))
+    )
+
+    return insert(AgentTask).from_select(
+        [AgentTask.id, AgentTask.run_id, AgentTask.type_], source
+    )
@@ -1,5 +1,7 @@
+import asyncio
 import secrets
-from typing import Dict, Optional
+from datetime import datetime
+from typing import Collection, Dict, List, Optional, Tuple
 
 from fastapi import Depends
 from sqlalchemy import func, select
@@ -12,6 +14,17 @@ from reworkd_platform.schemas import UserBase
 
 
 class OAuthCrud(BaseCrud):
+    """
+    Installations looked up by user are cached for the lifetime of the crud,
+    which is a single request. Lookups are serialized because concurrent tool
+    availability checks share the request's session.
+    """
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session)
+        self._installations: Dict[Tuple[str, str], Optional[OauthCredentials]] = {}
+        self._lock = asyncio.Lock()
+
     @classmethod
     async def inject(
         cls,
@@ -38,13 +51,21 @@ class OAuthCrud(BaseCrud):
     async def get_installation_by_user_id(
         self, user_id: str, provider: str
     ) -> Optional[OauthCredentials]:
-        query = select(OauthCredentials).filter(
-            OauthCredentials.user_id == user_id,
-            OauthCredentials.provider == provider,
-            OauthCredentials.access_token_enc.isnot(None),
-        )
+        key = (user_id, provider)
+        async with self._lock:
+            if key not in self._installations:
+                query = select(OauthCredentials).filter(
+                    OauthCredentials.user_id == user_id,
+                    OauthCredentials.provider == provider,
+                    OauthCredentials.access_token_enc.isnot(None),
+                )
+                result = await self.session.execute(query)
+                self._installations[key] = result.scalars().first()
 
-        return (await self.session.execute(query)).scalars().first()
+            return self._installations[key]
+
+    def forget_installation(self, user_id: str, provider: str) -> None:
+        self._installations.pop((user_id, provider), None)
 
     async def get_installation_by_organization_id(
         self, organization_id: str, provider: str
@@ -58,6 +79,44 @@ class OAuthCrud(BaseCrud):
 
         return (await self.session.execute(query)).scalars().first()
 
+    async def get_expiring_installations(
+        self,
+        provider: str,
+        expiring_before: datetime,
+        limit: int,
+        exclude: Collection[str] = (),
+    ) -> List[OauthCredentials]:
+        """Refreshable installations, soonest to expire first"""
+        query = (
+            select(OauthCredentials)
+            .filter(
+                OauthCredentials.provider == provider,
+                OauthCredentials.refresh_token_enc.isnot(None),
+                OauthCredentials.access_token_expiration < expiring_before,
+            )
+            .order_by(OauthCredentials.access_token_expiration)
+            .limit(limit)
+        )
+        if exclude:
+            query = query.filter(OauthCredentials.id.notin_(exclude))
+
+        return list((await self.session.execute(query)).scalars().all())
+
+    async def lock_expiring_installation(
+        self, installation_id: str, expiring_before: datetime
+    ) -> Optional[OauthCredentials]:
+        """The installation locked for update, unless locked or already renewed"""
+        query = (
+            select(OauthCredentials)
+            .filter(
+                OauthCredentials.id == installation_id,
+                OauthCredentials.access_token_expiration < expiring_before,
+            )
+            .with_for_update(skip_locked=True)
+        )
+
+        return (await self.session.execute(query)).scalars().first()
+
     async def get_all(self, user: UserBase) -> Dict[str, str]:
         query = (
             select(
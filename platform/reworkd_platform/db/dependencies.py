@@ -1,6 +1,6 @@
 from typing import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from starlette.requests import Request
 
 
@@ -18,3 +18,8 @@ async def get_db_session(request: Request) -> AsyncGenerator[AsyncSession, None]
         await session.commit()
     finally:
         await session.close()
+
+
+def get_db_session_factory(request: Request) -> "async_sessionmaker[AsyncSession]":
+    """Session factory for work outliving a request's own session"""
+    return request.app.state.db_session_factory
@@ -3,6 +3,7 @@ from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field, validator
 
+from reworkd_platform.settings import settings
 from reworkd_platform.web.api.agent.analysis import Analysis
 #一组字面量类型 表示可以使用的语言模型名称
 LLM_Model = Literal[
@@ -32,6 +33,7 @@ class ModelSettings(BaseModel):
     temperature: float = Field(default=0.9, ge=0.0, le=1.0)
     max_tokens: int = Field(default=500, ge=0)
     language: str = Field(default="English")
+    use_cache: bool = Field(default=True)
 
     @validator("max_tokens")
     def validate_max_tokens(cls, v: float, values: Dict[str, Any]) -> float:
@@ -50,15 +52,33 @@ class AgentRun(AgentRunCreate):
     run_id: str
 
 
+class AgentLoopCreate(AgentRunCreate):
+    tool_names: List[str] = Field(default=[])
+
+
+class AgentLoop(AgentRun):
+    tool_names: List[str] = Field(default=[])
+
+
 class AgentTaskAnalyze(AgentRun):
     task: str
     tool_names: List[str] = Field(default=[])
     model_settings: ModelSettings = Field(default=ModelSettings())
 
 
+class AgentTaskAnalyzeBatch(AgentRun):
+    # Each task counts as an analyze step, so a batch cannot exceed the loop budget
+    tasks: List[str] = Field(min_items=1, max_items=settings.max_loops)
+    tool_names: List[str] = Field(default=[])
+    model_settings: ModelSettings = Field(default=ModelSettings())
+
+
 class AgentTaskExecute(AgentRun):
     task: str
     analysis: Analysis
+    # Queued tasks whose analysis may be started while this one executes
+    next_tasks: List[str] = Field(default=[])
+    tool_names: List[str] = Field(default=[])
 
 
 class AgentTaskCreate(AgentRun):
@@ -82,6 +102,17 @@ class NewTasksResponse(BaseModel):
     new_tasks: List[str] = Field(alias="newTasks")
 
 
+class AnalysisError(BaseModel):
+    index: int
+    error: str
+    detail: str
+
+
+class AnalysisBatch(BaseModel):
+    analyses: List[Optional[Analysis]]
+    errors: List[AnalysisError] = Field(default=[])
+
+
 class RunCount(BaseModel):
     count: int
     first_run: Optional[datetime]
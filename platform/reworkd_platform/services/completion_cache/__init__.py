@@ -0,0 +1 @@
+"""Completion Cache"""
@@ -0,0 +1,298 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from langchain.schema import BaseMessage
+from loguru import logger
+
+from reworkd_platform.services.metrics import metrics
+
+
+class CacheTier(ABC):
+    """
+    A single storage layer of a cache.
+    Entries expire after the tier's TTL unless a TTL is given when setting them.
+    """
+
+    name: str = "tier"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError()
+
+    def set_many(self, values: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        for key, value in values.items():
+            self.set(key, value, ttl)
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryCacheTier(CacheTier):
+    """Bounded in-process LRU with a per-entry TTL"""
+
+    name = "memory"
+
+    def __init__(
+        self, max_entries: int, ttl: float, namespace: str = "completion_cache"
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.namespace = namespace
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.increment(f"{self.namespace}.evictions")
+
+
+class SqliteCacheTier(CacheTier):
+    """
+    Local on-disk tier shared by every worker on the host.
+    Values are stored as JSON and evicted by TTL and by least recent access.
+    Subclasses may store another encoding by overriding encode and decode.
+
+    Calls block on sqlite, so async callers run them in a thread. Reads only
+    buffer their access time, which is written in batches. Eviction runs once
+    the table holds more than a tenth over max_entries and trims it back, so
+    the cap is soft and most writes are a single insert.
+    """
+
+    name = "disk"
+    value_type = "TEXT"  # Column type of the encoded values
+    busy_timeout = 1.0  # Seconds to wait on another worker's write lock
+    access_flush_size = 256  # Buffered access times written together
+
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int,
+        ttl: float,
+        namespace: str = "completion_cache",
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.namespace = namespace  # Table name and metrics prefix
+        self._lock = Lock()
+        self._accessed: Dict[str, float] = {}
+        self._conn = sqlite3.connect(
+            str(path), timeout=self.busy_timeout, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {namespace} ("
+            f"key TEXT PRIMARY KEY, value {self.value_type} NOT NULL, "
+            "expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        for column in ("accessed", "expires"):
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {namespace}_{column} "
+                f"ON {namespace} ({column})"
+            )
+        self._conn.commit()
+        self._count = self._count_entries()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires FROM {self.namespace} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                return None
+
+            self._accessed[key] = now
+            if len(self._accessed) >= self.access_flush_size:
+                self._flush_accessed()
+                self._conn.commit()
+
+        return self.decode(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, values: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.namespace} VALUES (?, ?, ?, ?)",
+                [
+                    (key, self.encode(value), now + (ttl or self.ttl), now)
+                    for key, value in values.items()
+                ],
+            )
+            # Replaced keys are counted too, which only brings eviction forward
+            self._count += len(values)
+            if self._count > self.max_entries + self.max_entries // 10:
+                self._evict(now)
+            self._conn.commit()
+
+    @staticmethod
+    def encode(value: Any) -> Any:
+        return json.dumps(value)
+
+    @staticmethod
+    def decode(value: Any) -> Any:
+        return json.loads(value)
+
+    def _count_entries(self) -> int:
+        query = f"SELECT COUNT(*) FROM {self.namespace}"
+        return self._conn.execute(query).fetchone()[0]
+
+    def _flush_accessed(self) -> None:
+        self._conn.executemany(
+            f"UPDATE {self.namespace} SET accessed = MAX(accessed, ?) WHERE key = ?",
+            [(accessed, key) for key, accessed in self._accessed.items()],
+        )
+        self._accessed.clear()
+
+    def _evict(self, now: float) -> None:
+        self._flush_accessed()
+        evicted = self._conn.execute(
+            f"DELETE FROM {self.namespace} WHERE expires < ?", (now,)
+        ).rowcount
+
+        # Other workers write to the same table, so the count is refreshed
+        excess = self._count_entries() - self.max_entries
+        if excess > 0:
+            evicted += self._conn.execute(
+                f"DELETE FROM {self.namespace} WHERE key IN ("
+                f"SELECT key FROM {self.namespace} ORDER BY accessed LIMIT ?)",
+                (excess,),
+            ).rowcount
+
+        self._count = self._count_entries()
+        if evicted > 0:
+            metrics.increment(f"{self.namespace}.evictions", evicted)
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_accessed()
+            self._conn.commit()
+            self._conn.close()
+
+
+def create_tiers(
+    namespace: str,
+    max_entries: int,
+    ttl: float,
+    disk_path: Optional[Path],
+    disk_max_entries: int,
+    disk_tier: Type[SqliteCacheTier] = SqliteCacheTier,
+) -> List[CacheTier]:
+    """An in-process tier, followed by an on-disk tier when a path is given"""
+    tiers: List[CacheTier] = [MemoryCacheTier(max_entries, ttl, namespace)]
+    if disk_path:
+        tiers.append(disk_tier(disk_path, disk_max_entries, ttl, namespace))
+    return tiers
+
+
+def record_lookup(namespace: str, outcome: str) -> None:
+    """Counts a hit or miss of a cache and updates its hit ratio"""
+    metrics.increment(f"{namespace}.{outcome}")
+    hits = metrics.counter(f"{namespace}.hit")
+    total = hits + metrics.counter(f"{namespace}.miss")
+    metrics.gauge(f"{namespace}.hit_ratio", hits / total)
+
+
+class CompletionCache:
+    """
+    Content-addressed cache for deterministic-enough LLM completions.
+    Lookups walk the tiers in order and backfill the faster tiers on a hit.
+    """
+
+    def __init__(self, tiers: List[CacheTier], max_temperature: float = 0.0):
+        self.tiers = tiers
+        self.max_temperature = max_temperature
+
+    def should_cache(self, temperature: float, enabled: bool = True) -> bool:
+        return enabled and temperature <= self.max_temperature
+
+    @staticmethod
+    def create_key(
+        model_name: str,
+        temperature: float,
+        max_tokens: int,
+        messages: Sequence[BaseMessage],
+        functions: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> str:
+        payload = json.dumps(
+            {
+                "model": model_name,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "messages": [(message.type, message.content) for message in messages],
+                "functions": functions or [],
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        for i, tier in enumerate(self.tiers):
+            try:
+                value = tier.get(key)
+            except Exception as e:
+                logger.exception(e)
+                continue
+
+            if value is not None:
+                metrics.increment(f"completion_cache.{tier.name}.hit")
+                record_lookup("completion_cache", "hit")
+                for faster_tier in self.tiers[:i]:
+                    faster_tier.set(key, value)
+                return value
+
+        record_lookup("completion_cache", "miss")
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        for tier in self.tiers:
+            try:
+                tier.set(key, value)
+            except Exception as e:
+                logger.exception(e)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any) -> None:
+        await asyncio.to_thread(self.set, key, value)
+
+    def close(self) -> None:
+        for tier in self.tiers:
+            tier.close()
@@ -0,0 +1,10 @@
+"""Completion Cache"""
+from typing import Optional
+
+from fastapi import Request
+
+from reworkd_platform.services.completion_cache.cache import CompletionCache
+
+
+def get_completion_cache(request: Request) -> Optional[CompletionCache]:
+    return getattr(request.app.state, "completion_cache", None)
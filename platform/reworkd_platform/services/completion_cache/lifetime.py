@@ -0,0 +1,30 @@
+from fastapi import FastAPI
+
+from reworkd_platform.services.completion_cache.cache import (
+    CompletionCache,
+    create_tiers,
+)
+from reworkd_platform.settings import settings
+
+
+def init_completion_cache(app: FastAPI) -> None:  # pragma: no cover
+    """Initialize the completion cache, if enabled."""
+    if not settings.completion_cache_enabled:
+        app.state.completion_cache = None
+        return
+
+    tiers = create_tiers(
+        "completion_cache",
+        max_entries=settings.completion_cache_max_entries,
+        ttl=settings.completion_cache_ttl,
+        disk_path=settings.completion_cache_disk_path,
+        disk_max_entries=settings.completion_cache_disk_max_entries,
+    )
+    app.state.completion_cache = CompletionCache(
+        tiers, max_temperature=settings.completion_cache_max_temperature
+    )
+
+
+def shutdown_completion_cache(app: FastAPI) -> None:  # pragma: no cover
+    if cache := getattr(app.state, "completion_cache", None):
+        cache.close()
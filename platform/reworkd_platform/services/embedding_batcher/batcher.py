@@ -0,0 +1,112 @@
+"""Embedding Batcher"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Set
+
+from langchain.embeddings.base import Embeddings
+
+from reworkd_platform.services.metrics import metrics
+
+Vector = List[float]
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+WAIT_SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+
+@dataclass
+class Pending:
+    text: str
+    future: "asyncio.Future[Vector]"
+    queued_at: float
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Embeddings that coalesce the async calls of concurrent coroutines.
+    Texts queued within `window` seconds of the first one, or until
+    `max_batch_size` are queued, are embedded with a single upstream call and
+    the vectors are handed back to each caller. Sync calls are passed through.
+    A failed upstream call fails every caller of its batch.
+    """
+
+    def __init__(self, embeddings: Embeddings, window: float, max_batch_size: int):
+        self.embeddings = embeddings
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending: List[Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: Set["asyncio.Task[None]"] = set()
+
+    @property
+    def model(self) -> str:
+        """The wrapped model, which caches in front of the batcher key on"""
+        return getattr(self.embeddings, "model", type(self.embeddings).__name__)
+
+    def embed_documents(self, texts: List[str]) -> List[Vector]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> Vector:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[Vector]:
+        return list(await asyncio.gather(*(self._enqueue(text) for text in texts)))
+
+    async def aembed_query(self, text: str) -> Vector:
+        return await self._enqueue(text)
+
+    async def close(self) -> None:
+        self._flush()
+        await asyncio.gather(*self._batches, return_exceptions=True)
+
+    def _enqueue(self, text: str) -> "asyncio.Future[Vector]":
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[Vector]" = loop.create_future()
+        self._pending.append(Pending(text, future, time.monotonic()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size :]
+            task = asyncio.create_task(self._send(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _send(self, batch: List[Pending]) -> None:
+        now = time.monotonic()
+        metrics.histogram(
+            "embedding_batcher.batch_size", len(batch), BATCH_SIZE_BUCKETS
+        )
+        for pending in batch:
+            metrics.histogram(
+                "embedding_batcher.wait_seconds",
+                now - pending.queued_at,
+                WAIT_SECONDS_BUCKETS,
+            )
+
+        texts = list(dict.fromkeys(pending.text for pending in batch))
+        try:
+            vectors = await self.embeddings.aembed_documents(texts)
+            if len(vectors) != len(texts):
+                raise ValueError("Embeddings and texts are not the same length")
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+
+        embedded = dict(zip(texts, vectors))
+        for pending in batch:
+            # Callers that were cancelled while waiting have a done future
+            if not pending.future.done():
+                pending.future.set_result(embedded[pending.text])
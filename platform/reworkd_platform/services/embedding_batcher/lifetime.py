@@ -0,0 +1,52 @@
+from typing import Optional
+
+from fastapi import FastAPI
+from langchain.embeddings import OpenAIEmbeddings
+from langchain.embeddings.base import Embeddings
+
+from reworkd_platform.services.embedding_batcher.batcher import BatchedEmbeddings
+from reworkd_platform.services.embedding_cache.lifetime import cached_embeddings
+from reworkd_platform.settings import settings
+
+embedding_batcher: Optional[BatchedEmbeddings] = None
+
+
+def create_openai_embeddings() -> Embeddings:
+    return OpenAIEmbeddings(
+        client=None,  # Meta private value but mypy will complain its missing
+        openai_api_key=settings.openai_api_key,
+    )
+
+
+def create_embeddings() -> Embeddings:
+    """
+    Embeddings of the vector memories, which are not handed FastAPI dependencies.
+    Cache hits are answered first, misses go through the worker's batcher.
+    """
+    return cached_embeddings(embedding_batcher or create_openai_embeddings())
+
+
+def init_embedding_batcher(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Initialize the embedding batcher shared by the requests of this worker.
+
+    :param app: current application.
+    """
+    global embedding_batcher
+    embedding_batcher = (
+        BatchedEmbeddings(
+            create_openai_embeddings(),
+            window=settings.embedding_batch_window,
+            max_batch_size=settings.embedding_batch_max_size,
+        )
+        if settings.embedding_batch_enabled
+        else None
+    )
+    app.state.embedding_batcher = embedding_batcher
+
+
+async def shutdown_embedding_batcher(app: FastAPI) -> None:  # pragma: no cover
+    global embedding_batcher
+    if embedding_batcher:
+        await embedding_batcher.close()
+    embedding_batcher = None
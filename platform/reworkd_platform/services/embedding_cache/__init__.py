@@ -0,0 +1 @@
+"""Embedding Cache"""
@@ -0,0 +1,152 @@
+"""Embedding Cache"""
+import hashlib
+import json
+from array import array
+from typing import Dict, List, Optional, cast
+
+from langchain.embeddings.base import Embeddings
+from loguru import logger
+
+from reworkd_platform.services.completion_cache.cache import (
+    CacheTier,
+    SqliteCacheTier,
+    record_lookup,
+)
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.web.api.memory.memory import run_in_thread
+
+Vector = List[float]
+
+
+def embedding_key(model: str, text: str) -> str:
+    payload = json.dumps([model, text])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PackedVectorTier(SqliteCacheTier):
+    """Disk tier storing each embedding as a packed float32 array"""
+
+    value_type = "BLOB"
+
+    @staticmethod
+    def encode(value: Vector) -> bytes:
+        return array("f", value).tobytes()
+
+    @staticmethod
+    def decode(value: bytes) -> Vector:
+        vector = array("f")
+        vector.frombytes(value)
+        return vector.tolist()
+
+
+class EmbeddingCache:
+    """
+    Embeddings keyed on the model name and a hash of the text.
+    Lookups walk the tiers in order and backfill the faster tiers on a hit.
+    """
+
+    def __init__(self, tiers: List[CacheTier]):
+        self.tiers = tiers
+
+    def get_many(self, keys: List[str]) -> List[Optional[Vector]]:
+        vectors: List[Optional[Vector]] = [None] * len(keys)
+        missing = list(range(len(keys)))
+        for i, tier in enumerate(self.tiers):
+            found: Dict[str, Vector] = {}
+            for j in missing:
+                try:
+                    vector = tier.get(keys[j])
+                except Exception as e:
+                    logger.exception(e)
+                    continue
+
+                if vector is not None:
+                    vectors[j] = found[keys[j]] = vector
+                    metrics.increment(f"embedding_cache.{tier.name}.hit")
+                    record_lookup("embedding_cache", "hit")
+
+            if found:
+                missing = [j for j in missing if vectors[j] is None]
+                # A batch of hits backfills each faster tier in one write
+                for faster_tier in self.tiers[:i]:
+                    faster_tier.set_many(found)
+
+        for _ in missing:
+            record_lookup("embedding_cache", "miss")
+        return vectors
+
+    def set_many(self, vectors: Dict[str, Vector]) -> None:
+        for tier in self.tiers:
+            try:
+                tier.set_many(vectors)
+            except Exception as e:
+                logger.exception(e)
+
+    def close(self) -> None:
+        for tier in self.tiers:
+            tier.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings that only send the texts missing from the cache upstream.
+    Misses of a call are embedded in one request, each distinct text once,
+    and the vectors are returned in the order of the texts.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = getattr(embeddings, "model", type(embeddings).__name__)
+
+    def embed_documents(self, texts: List[str]) -> List[Vector]:
+        vectors = self.cache.get_many(self._keys(texts))
+        if missing := _missing(texts, vectors):
+            self._fill(texts, vectors, self.embeddings.embed_documents(missing))
+        return cast(List[Vector], vectors)
+
+    def embed_query(self, text: str) -> Vector:
+        key = embedding_key(self.model, text)
+        if (vector := self.cache.get_many([key])[0]) is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.set_many({key: vector})
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[Vector]:
+        # The disk tier is blocking sqlite, so lookups leave the event loop
+        vectors = await run_in_thread(self.cache.get_many, self._keys(texts))
+        if missing := _missing(texts, vectors):
+            embeds = await self.embeddings.aembed_documents(missing)
+            await run_in_thread(self._fill, texts, vectors, embeds)
+        return cast(List[Vector], vectors)
+
+    async def aembed_query(self, text: str) -> Vector:
+        key = embedding_key(self.model, text)
+        if (vector := (await run_in_thread(self.cache.get_many, [key]))[0]) is None:
+            vector = await self.embeddings.aembed_query(text)
+            await run_in_thread(self.cache.set_many, {key: vector})
+        return vector
+
+    def _keys(self, texts: List[str]) -> List[str]:
+        return [embedding_key(self.model, text) for text in texts]
+
+    def _fill(
+        self, texts: List[str], vectors: List[Optional[Vector]], embeds: List[Vector]
+    ) -> None:
+        missing = _missing(texts, vectors)
+        if len(embeds) != len(missing):
+            raise ValueError("Embeddings and texts are not the same length")
+
+        embedded = dict(zip(missing, embeds))
+        for i, text in enumerate(texts):
+            if vectors[i] is None:
+                vectors[i] = embedded[text]
+
+        self.cache.set_many(
+            {embedding_key(self.model, text): v for text, v in embedded.items()}
+        )
+
+
+def _missing(texts: List[str], vectors: List[Optional[Vector]]) -> List[str]:
+    """Distinct texts without a cached vector, in order of appearance"""
+    return list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
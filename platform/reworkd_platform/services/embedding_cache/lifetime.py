@@ -0,0 +1,49 @@
+from typing import Optional
+
+from fastapi import FastAPI
+from langchain.embeddings.base import Embeddings
+
+from reworkd_platform.services.completion_cache.cache import create_tiers
+from reworkd_platform.services.embedding_cache.cache import (
+    CachedEmbeddings,
+    EmbeddingCache,
+    PackedVectorTier,
+)
+from reworkd_platform.settings import settings
+
+embedding_cache: Optional[EmbeddingCache] = None
+
+
+def create_embedding_cache() -> EmbeddingCache:
+    tiers = create_tiers(
+        "embedding_cache",
+        max_entries=settings.embedding_cache_max_entries,
+        ttl=settings.embedding_cache_ttl,
+        disk_path=settings.embedding_cache_disk_path,
+        disk_max_entries=settings.embedding_cache_disk_max_entries,
+        disk_tier=PackedVectorTier,
+    )
+    return EmbeddingCache(tiers)
+
+
+def cached_embeddings(embeddings: Embeddings) -> Embeddings:
+    """Embeddings of the vector memories, which are not handed FastAPI dependencies"""
+    if embedding_cache is None:
+        return embeddings
+    return CachedEmbeddings(embeddings, embedding_cache)
+
+
+def init_embedding_cache(app: FastAPI) -> None:  # pragma: no cover
+    """Initialize the embedding cache, if enabled."""
+    global embedding_cache
+    embedding_cache = (
+        create_embedding_cache() if settings.embedding_cache_enabled else None
+    )
+    app.state.embedding_cache = embedding_cache
+
+
+def shutdown_embedding_cache(app: FastAPI) -> None:  # pragma: no cover
+    global embedding_cache
+    if embedding_cache:
+        embedding_cache.close()
+    embedding_cache = None
@@ -0,0 +1,9 @@
+"""Shared HTTP client session"""
+from aiohttp import ClientSession
+from fastapi import Request
+
+from reworkd_platform.services.http_client.session import session_pool
+
+
+def get_http_session(request: Request) -> ClientSession:
+    return getattr(request.app.state, "http_session", None) or session_pool.session
@@ -0,0 +1,22 @@
+from fastapi import FastAPI
+
+from reworkd_platform.services.http_client.session import (
+    llm_session_pool,
+    session_pool,
+)
+
+
+def init_http_session(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Initialize the pooled HTTP session shared by tools and OAuth installers
+    and the separately pooled session of LLM requests.
+
+    :param app: current application.
+    """
+    app.state.http_session = session_pool.session
+    app.state.llm_http_session = llm_session_pool.session
+
+
+async def shutdown_http_session(app: FastAPI) -> None:  # pragma: no cover
+    await session_pool.close()
+    await llm_session_pool.close()
@@ -0,0 +1,130 @@
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.settings import Settings
+from reworkd_platform.settings import settings as platform_settings
+
+
+class ClientSessionPool:
+    """
+    Owns a pooled aiohttp session of a worker.
+    Opened on application startup and closed on shutdown. Code running outside
+    the application lifecycle (scripts, tests) lazily gets a session on first use.
+    Connection limits default to the shared pool's and metrics use `name`.
+    """
+
+    def __init__(
+        self,
+        settings: Settings = platform_settings,
+        name: str = "http_pool",
+        limit: Optional[int] = None,
+        limit_per_host: Optional[int] = None,
+    ):
+        self.settings = settings
+        self.name = name
+        self.limit = settings.http_pool_limit if limit is None else limit
+        self.limit_per_host = (
+            settings.http_pool_limit_per_host
+            if limit_per_host is None
+            else limit_per_host
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def stats(self) -> Dict[str, Any]:
+        if self._session is None or self._session.closed:
+            return {}
+
+        connector = self._session.connector
+        acquired = getattr(connector, "_acquired", ())
+        idle = getattr(connector, "_conns", {})
+        return {
+            "limit": connector.limit if connector else 0,
+            "limit_per_host": connector.limit_per_host if connector else 0,
+            "in_use": len(acquired),
+            "idle": sum(len(conns) for conns in idle.values()),
+        }
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.settings.http_keepalive_timeout,
+            ttl_dns_cache=self.settings.http_dns_cache_ttl,
+            use_dns_cache=True,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=self.settings.http_connect_timeout,
+            sock_read=self.settings.http_read_timeout,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            trace_configs=[_create_trace_config(self)],
+        )
+
+
+def _create_trace_config(pool: ClientSessionPool) -> aiohttp.TraceConfig:
+    def _count(name: str) -> Any:
+        async def handler(*_: Any) -> None:
+            metrics.increment(f"{pool.name}.{name}")
+
+        return handler
+
+    async def on_request_end(*_: Any) -> None:
+        metrics.increment(f"{pool.name}.requests")
+        for key, value in pool.stats().items():
+            metrics.gauge(f"{pool.name}.{key}", value)
+
+    async def on_queued_start(_: Any, ctx: SimpleNamespace, __: Any) -> None:
+        ctx.queued_at = time.monotonic()
+
+    async def on_queued_end(_: Any, ctx: SimpleNamespace, __: Any) -> None:
+        metrics.increment(f"{pool.name}.connection_queued")
+        metrics.observe(f"{pool.name}.queue_seconds", time.monotonic() - ctx.queued_at)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(_count("request_errors"))
+    trace_config.on_connection_create_end.append(_count("connection_created"))
+    trace_config.on_connection_reuseconn.append(_count("connection_reused"))
+    trace_config.on_connection_queued_start.append(on_queued_start)
+    trace_config.on_connection_queued_end.append(on_queued_end)
+    trace_config.on_dns_cache_hit.append(_count("dns_cache_hit"))
+    trace_config.on_dns_cache_miss.append(_count("dns_cache_miss"))
+    return trace_config
+
+
+session_pool = ClientSessionPool()
+
+# LLM calls are long-lived and would otherwise hold the tools' connections
+llm_session_pool = ClientSessionPool(
+    name="llm_http_pool",
+    limit=platform_settings.llm_http_pool_limit,
+    limit_per_host=platform_settings.llm_http_pool_limit_per_host,
+)
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Session for code that is not handed one through a FastAPI dependency"""
+    return session_pool.session
+
+
+def get_llm_session() -> aiohttp.ClientSession:
+    """Session of the OpenAI client, pooled apart from tool and OAuth traffic"""
+    return llm_session_pool.session
@@ -0,0 +1 @@
+"""Local Memory"""
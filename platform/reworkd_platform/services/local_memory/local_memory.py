@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import fcntl
+import uuid
+from pathlib import Path
+from threading import Lock
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+from langchain.embeddings.base import Embeddings
+
+from reworkd_platform.services.embedding_batcher.lifetime import create_embeddings
+from reworkd_platform.services.local_memory.store import Match, VectorStore
+from reworkd_platform.settings import VECTOR_DTYPE, settings
+from reworkd_platform.timer import timed_function
+from reworkd_platform.web.api.memory.memory import (
+    OPENAI_EMBEDDING_DIM,
+    AgentMemory,
+    QueryResult,
+    run_in_thread,
+)
+
+TOP_K = 5
+
+_stores: Dict[str, VectorStore] = {}
+_stores_lock = Lock()
+# Directory claimed by this worker under each path, with its open lock file
+_worker_dirs: Dict[Path, Tuple[Path, IO[str]]] = {}
+
+
+def get_store(
+    namespace: str, dim: int, dtype: VECTOR_DTYPE, path: Optional[Path]
+) -> VectorStore:
+    """The worker's store of a namespace, opened on first use"""
+    with _stores_lock:
+        if (store := _stores.get(namespace)) is None:
+            directory = claim_worker_dir(path) / namespace if path else None
+            store = VectorStore(dim, dtype, directory)
+            _stores[namespace] = store
+
+    if store.dim != dim:
+        raise ValueError(
+            f"Namespace {namespace} stores vectors of dimension {store.dim}"
+        )
+    return store
+
+
+def claim_worker_dir(path: Path) -> Path:
+    """
+    Directory under path that only this worker writes to. The first free slot
+    is held with an exclusive flock until the process exits, so workers sharing
+    local_memory_path never write the same files and a restarted worker picks
+    up the slot, and the memory, its predecessor released.
+    """
+    if (claimed := _worker_dirs.get(path)) is not None:
+        return claimed[0]
+
+    path.mkdir(parents=True, exist_ok=True)
+    slot = 0
+    while True:
+        lock_file = open(path / f"worker-{slot}.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            slot += 1
+            continue
+
+        _worker_dirs[path] = (path / f"worker-{slot}", lock_file)
+        return _worker_dirs[path][0]
+
+
+class LocalMemory(AgentMemory):
+    """
+    AgentMemory held in the worker's memory, without a network round trip
+    beyond the embeddings. Namespaces are shared by every memory of a worker
+    and are persisted across restarts when local_memory_path is set, in a
+    directory of the path claimed by the worker.
+    """
+
+    def __init__(
+        self,
+        index_name: str,
+        namespace: str = "",
+        embeddings: Optional[Embeddings] = None,
+        dim: int = OPENAI_EMBEDDING_DIM,
+    ):
+        self.namespace = namespace or index_name
+        self.embeddings = embeddings
+        self.store = get_store(
+            self.namespace, dim, settings.local_memory_dtype, settings.local_memory_path
+        )
+
+    def __enter__(self) -> AgentMemory:
+        if self.embeddings is None:
+            self.embeddings = create_embeddings()
+
+        return self
+
+    def __exit__(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    async def __aenter__(self) -> AgentMemory:
+        return self.__enter__()
+
+    async def __aexit__(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    @timed_function(level="DEBUG")
+    def reset_class(self) -> None:
+        self.store.reset()
+
+    @timed_function(level="DEBUG")
+    def add_tasks(self, tasks: List[str]) -> List[str]:
+        if len(tasks) == 0:
+            return []
+
+        return self._add(tasks, self._get_embeddings().embed_documents(tasks))
+
+    @timed_function(level="DEBUG")
+    def get_similar_tasks(
+        self, text: str, score_threshold: float = 0.95
+    ) -> List[QueryResult]:
+        vector = self._get_embeddings().embed_query(text)
+        return _to_results(self.store.search(vector, TOP_K, score_threshold))
+
+    @timed_function(level="DEBUG")
+    async def areset_class(self) -> None:
+        await run_in_thread(self.store.reset)
+
+    @timed_function(level="DEBUG")
+    async def aadd_tasks(self, tasks: List[str]) -> List[str]:
+        if len(tasks) == 0:
+            return []
+
+        embeds = await self._get_embeddings().aembed_documents(tasks)
+        return await run_in_thread(self._add, tasks, embeds)
+
+    @timed_function(level="DEBUG")
+    async def aget_similar_tasks(
+        self, text: str, score_threshold: float = 0.95
+    ) -> List[QueryResult]:
+        vector = await self._get_embeddings().aembed_query(text)
+        # Large namespaces take milliseconds to scan, so off the event loop
+        matches = await run_in_thread(
+            self.store.search, vector, TOP_K, score_threshold
+        )
+        return _to_results(matches)
+
+    def _add(self, tasks: List[str], embeds: List[List[float]]) -> List[str]:
+        if len(tasks) != len(embeds):
+            raise ValueError("Embeddings and tasks are not the same length")
+
+        ids = [str(uuid.uuid4()) for _ in tasks]
+        self.store.add(ids, tasks, embeds)
+        return ids
+
+    def _get_embeddings(self) -> Embeddings:
+        if self.embeddings is None:
+            raise RuntimeError("LocalMemory must be entered before use")
+        return self.embeddings
+
+
+def _to_results(matches: List[Match]) -> List[QueryResult]:
+    return [
+        QueryResult(id=id_, score=score, metadata={"text": text})
+        for id_, score, text in matches
+    ]
@@ -0,0 +1,179 @@
+import json
+import os
+from pathlib import Path
+from threading import Lock
+from typing import List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from reworkd_platform.settings import VECTOR_DTYPE
+
+INITIAL_CAPACITY = 1024
+INT8_SCALE = 127.0  # Components of unit vectors lie in [-1, 1]
+SEARCH_BLOCK_ROWS = 1024  # Rows converted to float32 at a time, sized to stay in cache
+
+Match = Tuple[str, float, str]  # id, cosine similarity, text
+
+
+class VectorStore:
+    """
+    Embeddings of one namespace in a contiguous matrix, with their ids and texts.
+    Vectors are normalized on insert, so a search is a single matrix-vector
+    product followed by argpartition for the top k. Rows may be stored as
+    float16 or as int8 scaled by 127; those are scored in float32 blocks.
+
+    With a path, the matrix is a memory-mapped .npy file next to a JSON lines
+    file of ids and texts, so reopening a store maps it instead of loading it.
+    Rows are written before their ids, and only rows with an id are read back.
+    Rows are never rewritten in place: growing or resetting the store swaps in a
+    new matrix, so a search keeps scoring the rows it started with.
+    """
+
+    def __init__(
+        self, dim: int, dtype: VECTOR_DTYPE = "float32", path: Optional[Path] = None
+    ):
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.path = path
+        self._lock = Lock()
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._matrix = (
+            self._open() if path else np.empty((INITIAL_CAPACITY, dim), self.dtype)
+        )
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, ids: List[str], texts: List[str], vectors: npt.ArrayLike) -> None:
+        rows = self._encode(vectors)
+        if not len(ids) == len(texts) == len(rows):
+            raise ValueError("Ids, texts and vectors are not the same length")
+
+        with self._lock:
+            start = len(self._ids)
+            self._reserve(start + len(ids))
+            self._matrix[start : start + len(ids)] = rows
+
+            if self.path:
+                self._matrix.flush()
+                with open(self._tasks_path, "a", encoding="utf-8") as file:
+                    for id_, text in zip(ids, texts):
+                        file.write(json.dumps([id_, text]) + "\n")
+
+            self._ids.extend(ids)
+            self._texts.extend(texts)
+
+    def search(
+        self, vector: npt.ArrayLike, top_k: int, score_threshold: float = -1.0
+    ) -> List[Match]:
+        with self._lock:
+            # Reset and growth swap in a new matrix along with new lists
+            matrix, ids, texts = self._matrix, self._ids, self._texts
+            count = len(ids)
+
+        if count == 0 or top_k <= 0:
+            return []
+
+        scores = self._scores(matrix, count, _normalize(vector))
+        k = min(top_k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            (ids[i], float(scores[i]), texts[i])
+            for i in top
+            if scores[i] > score_threshold
+        ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._ids, self._texts = [], []
+            if self.path:
+                self._tasks_path.write_text("", encoding="utf-8")
+            self._swap((INITIAL_CAPACITY, self.dim), count=0)
+
+    def _scores(self, matrix: np.ndarray, count: int, query: np.ndarray) -> np.ndarray:
+        if self.dtype == np.float32:
+            return matrix[:count] @ query
+
+        if self.dtype == np.int8:
+            query = query / INT8_SCALE
+
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, count)
+            scores[start:end] = matrix[start:end].astype(np.float32) @ query
+        return scores
+
+    def _encode(self, vectors: npt.ArrayLike) -> np.ndarray:
+        vectors = _normalize(vectors)
+        if self.dtype == np.int8:
+            return np.round(vectors * INT8_SCALE).astype(np.int8)
+        return vectors.astype(self.dtype, copy=False)
+
+    def _reserve(self, rows: int) -> None:
+        capacity = len(self._matrix)
+        if rows <= capacity:
+            return
+
+        self._swap((max(rows, capacity * 2), self.dim), count=len(self._ids))
+
+    def _swap(self, shape: Tuple[int, int], count: int) -> None:
+        """Replaces the matrix with a new one holding its first count rows"""
+        if not self.path:
+            matrix = np.empty(shape, self.dtype)
+            matrix[:count] = self._matrix[:count]
+            self._matrix = matrix
+            return
+
+        # Written to a new file that replaces the old one once it is complete,
+        # searches holding the old matrix keep their mapping of the old file
+        partial = self._vectors_path.with_suffix(".partial.npy")
+        matrix = np.lib.format.open_memmap(partial, "w+", self.dtype, shape)
+        matrix[:count] = self._matrix[:count]
+        matrix.flush()
+        os.replace(partial, self._vectors_path)
+        self._matrix = matrix
+
+    def _open(self) -> np.ndarray:
+        assert self.path
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        if not self._vectors_path.exists():
+            self._tasks_path.write_text("", encoding="utf-8")
+            shape = (INITIAL_CAPACITY, self.dim)
+            return np.lib.format.open_memmap(
+                self._vectors_path, "w+", self.dtype, shape
+            )
+
+        if self._tasks_path.exists():
+            with open(self._tasks_path, encoding="utf-8") as file:
+                for line in file:
+                    id_, text = json.loads(line)
+                    self._ids.append(id_)
+                    self._texts.append(text)
+
+        matrix = np.lib.format.open_memmap(self._vectors_path, "r+")
+        if matrix.dtype != self.dtype or matrix.shape[1] != self.dim:
+            raise ValueError(
+                f"Stored vectors are {matrix.dtype} of dimension {matrix.shape[1]}"
+            )
+        return matrix
+
+    @property
+    def _vectors_path(self) -> Path:
+        assert self.path
+        return self.path / "vectors.npy"
+
+    @property
+    def _tasks_path(self) -> Path:
+        assert self.path
+        return self.path / "tasks.jsonl"
+
+
+def _normalize(vectors: npt.ArrayLike) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
@@ -0,0 +1,94 @@
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from threading import Lock
+from typing import Any, Dict, List, Sequence, Tuple
+
+
+@dataclass
+class Summary:
+    count: int = 0
+    total: float = 0.0
+    min: float = 0.0
+    max: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.min = value if self.count == 0 else min(self.min, value)
+        self.max = value if self.count == 0 else max(self.max, value)
+        self.count += 1
+        self.total += value
+
+
+@dataclass
+class Histogram:
+    """Counts per bucket upper bound, the last count is for values above them all"""
+
+    buckets: Tuple[float, ...]
+    counts: List[int] = field(default_factory=list)
+    count: int = 0
+    total: float = 0.0
+
+    def __post_init__(self) -> None:
+        self.counts = self.counts or [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry.
+    Counters, gauges, summaries and histograms are keyed by dotted names and
+    exposed through the monitoring router.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._gauges: Dict[str, float] = {}
+        self._summaries: Dict[str, Summary] = defaultdict(Summary)
+        self._histograms: Dict[str, Histogram] = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            self._summaries[name].observe(value)
+
+    def histogram(self, name: str, value: float, buckets: Sequence[float]) -> None:
+        """Buckets are fixed by the first observation of a name"""
+        with self._lock:
+            if (histogram := self._histograms.get(name)) is None:
+                histogram = Histogram(tuple(sorted(buckets)))
+                self._histograms[name] = histogram
+            histogram.observe(value)
+
+    def counter(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "summaries": {k: asdict(v) for k, v in self._summaries.items()},
+                "histograms": {k: asdict(v) for k, v in self._histograms.items()},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+            self._histograms.clear()
+
+
+metrics = Metrics()
@@ -1,24 +1,39 @@
 import json
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
+from typing import Optional
 from urllib.parse import urlencode
 
-import aiohttp
+from aiohttp import ClientSession
 from fastapi import Depends, Path
 
 from reworkd_platform.db.crud.oauth import OAuthCrud
 from reworkd_platform.db.models.auth import OauthCredentials
 from reworkd_platform.schemas import UserBase
+from reworkd_platform.services.http_client.dependencies import get_http_session
+from reworkd_platform.services.http_client.session import get_session
 from reworkd_platform.services.security import encryption_service
+from reworkd_platform.services.token_refresher.tokens import access_tokens
 from reworkd_platform.settings import Settings
 from reworkd_platform.settings import settings as platform_settings
+from reworkd_platform.web.api.agent.tools.availability import availability_cache
 from reworkd_platform.web.api.http_responses import forbidden
 
 
 class OAuthInstaller(ABC):
-    def __init__(self, crud: OAuthCrud, settings: Settings):
+    def __init__(
+        self,
+        crud: OAuthCrud,
+        settings: Settings,
+        session: Optional[ClientSession] = None,
+    ):
         self.crud = crud
         self.settings = settings
+        self._http_session = session
+
+    @property
+    def http_session(self) -> ClientSession:
+        return self._http_session or get_session()
 
     @abstractmethod
     async def install(self, user: UserBase, redirect_uri: str) -> str:
@@ -80,23 +95,26 @@ class SIDInstaller(OAuthInstaller):
             "redirect_uri": self.settings.sid_redirect_uri,
             "code": code,
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://auth.sid.ai/oauth/token",
-                headers={
-                    "Content-Type": "application/json",
-                    "Accept": "application/json",
-                },
-                data=json.dumps(req),
-            ) as response:
-                res_data = await response.json()
+        async with self.http_session.post(
+            "https://auth.sid.ai/oauth/token",
+            headers={
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            },
+            data=json.dumps(req),
+        ) as response:
+            res_data = await response.json()
 
         OAuthInstaller.store_access_token(creds, res_data["access_token"])
         OAuthInstaller.store_refresh_token(creds, res_data["refresh_token"])
         creds.access_token_expiration = datetime.now() + timedelta(
             seconds=res_data["expires_in"]
         )
-        return await creds.save(self.crud.session)
+        creds = await creds.save(self.crud.session)
+        self.crud.forget_installation(creds.user_id, self.PROVIDER)
+        availability_cache.invalidate(creds.user_id)
+        access_tokens.invalidate(creds.id)
+        return creds
 
     async def uninstall(self, user: UserBase) -> bool:
         creds = await self.crud.get_installation_by_user_id(user.id, self.PROVIDER)
@@ -108,22 +126,25 @@ class SIDInstaller(OAuthInstaller):
         delete_token = encryption_service.decrypt(creds.refresh_token_enc)
         # delete credentials from database
         await self.crud.session.delete(creds)
+        self.crud.forget_installation(user.id, self.PROVIDER)
+        availability_cache.invalidate(user.id)
+        access_tokens.invalidate(creds.id)
 
         # revoke refresh token
-        async with aiohttp.ClientSession() as session:
-            await session.post(
-                "https://auth.sid.ai/oauth/revoke",
-                headers={
-                    "Content-Type": "application/json",
-                },
-                data=json.dumps(
-                    {
-                        "client_id": self.settings.sid_client_id,
-                        "client_secret": self.settings.sid_client_secret,
-                        "token": delete_token,
-                    }
-                ),
-            )
+        async with self.http_session.post(
+            "https://auth.sid.ai/oauth/revoke",
+            headers={
+                "Content-Type": "application/json",
+            },
+            data=json.dumps(
+                {
+                    "client_id": self.settings.sid_client_id,
+                    "client_secret": self.settings.sid_client_secret,
+                    "token": delete_token,
+                }
+            ),
+        ):
+            pass
         return True
 
 
@@ -135,13 +156,15 @@ integrations = {
 def installer_factory(
     provider: str = Path(description="OAuth Provider"),
     crud: OAuthCrud = Depends(OAuthCrud.inject),
+    session: ClientSession = Depends(get_http_session),
 ) -> OAuthInstaller:
     """Factory for OAuth installers
     Args:
         provider (str): OAuth Provider (can be slack, github, etc.) (injected)
         crud (OAuthCrud): OAuth Crud (injected)
+        session (ClientSession): Pooled HTTP session (injected)
     """
 
     if provider in integrations:
-        return integrations[provider](crud, platform_settings)
+        return integrations[provider](crud, platform_settings, session)
     raise NotImplementedError()
@@ -1,30 +1,47 @@
 from __future__ import annotations
 
-import uuid
-from typing import Any, Dict, List
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Dict, List, Optional
 
-from langchain.embeddings import OpenAIEmbeddings
 from langchain.embeddings.base import Embeddings
 from pinecone import Index  # import doesnt work on plane wifi
-from pydantic import BaseModel
 
+from reworkd_platform.services.embedding_batcher.lifetime import create_embeddings
 from reworkd_platform.settings import settings
 from reworkd_platform.timer import timed_function
-from reworkd_platform.web.api.memory.memory import AgentMemory
+from reworkd_platform.web.api.memory.memory import (
+    AgentMemory,
+    QueryResult,
+    run_in_thread,
+)
 
-OPENAI_EMBEDDING_DIM = 1536
 
+_upsert_executor: Optional[ThreadPoolExecutor] = None
+_upsert_executor_lock = Lock()
 
-class Row(BaseModel):
-    id: str
-    values: List[float]
-    metadata: Dict[str, Any] = {}
+
+def get_upsert_executor() -> ThreadPoolExecutor:
+    """
+    Pool the batches of sync add_tasks calls are upserted on, shared by the
+    calls of a worker. It is apart from the memory pool, whose threads may be
+    the ones blocking on it.
+    """
+    global _upsert_executor
+    with _upsert_executor_lock:
+        if _upsert_executor is None:
+            _upsert_executor = ThreadPoolExecutor(
+                max_workers=settings.pinecone_upsert_concurrency,
+                thread_name_prefix="pinecone_upsert",
+            )
+        return _upsert_executor
 
 
-class QueryResult(BaseModel):
-    id: str
-    score: float
-    metadata: Dict[str, Any] = {}
+def task_id(task: str) -> str:
+    """Derived from the text, so adding a task again overwrites its vector"""
+    return hashlib.sha256(task.encode("utf-8")).hexdigest()
 
 
 class PineconeMemory(AgentMemory):
@@ -38,10 +55,7 @@ class PineconeMemory(AgentMemory):
 
     @timed_function(level="DEBUG")
     def __enter__(self) -> AgentMemory:
-        self.embeddings: Embeddings = OpenAIEmbeddings(
-            client=None,  # Meta private value but mypy will complain its missing
-            openai_api_key=settings.openai_api_key,
-        )
+        self.embeddings: Embeddings = create_embeddings()
 
         return self
 
@@ -54,24 +68,29 @@ class PineconeMemory(AgentMemory):
 
     @timed_function(level="DEBUG")
     def add_tasks(self, tasks: List[str]) -> List[str]:
-        if len(tasks) == 0:
-            return []
+        batches = self._batches(tasks)
+        if len(batches) > 1:
+            list(get_upsert_executor().map(self._add_batch, batches))
+        elif batches:
+            self._add_batch(batches[0])
 
-        embeds = self.embeddings.embed_documents(tasks)
+        return [task_id(task) for task in tasks]
 
-        if len(tasks) != len(embeds):
-            raise ValueError("Embeddings and tasks are not the same length")
+    @timed_function(level="DEBUG")
+    async def aadd_tasks(self, tasks: List[str]) -> List[str]:
+        semaphore = asyncio.Semaphore(settings.pinecone_upsert_concurrency)
 
-        rows = [
-            Row(values=vector, metadata={"text": tasks[i]}, id=str(uuid.uuid4()))
-            for i, vector in enumerate(embeds)
-        ]
+        async def add_batch(batch: List[str]) -> None:
+            async with semaphore:
+                embeds = await self.embeddings.aembed_documents(batch)
+                await run_in_thread(
+                    self.index.upsert,
+                    vectors=self._to_rows(batch, embeds),
+                    namespace=self.namespace,
+                )
 
-        self.index.upsert(
-            vectors=[row.dict() for row in rows], namespace=self.namespace
-        )
-
-        return [row.id for row in rows]
+        await asyncio.gather(*(add_batch(batch) for batch in self._batches(tasks)))
+        return [task_id(task) for task in tasks]
 
     @timed_function(level="DEBUG")
     def get_similar_tasks(
@@ -79,15 +98,68 @@ class PineconeMemory(AgentMemory):
     ) -> List[QueryResult]:
         # Get similar tasks
         vector = self.embeddings.embed_query(text)
-        results = self.index.query(
-            vector=vector,
-            #5个子问题 写死 
-            top_k=5,
-            include_metadata=True,
-            include_values=True,
-            namespace=self.namespace,
+        results = self.index.query(vector=vector, **self._query_args())
+
+        return self._to_results(results, score_threshold)
+
+    @timed_function(level="DEBUG")
+    async def aget_similar_tasks(
+        self, text: str, score_threshold: float = 0.95
+    ) -> List[QueryResult]:
+        vector = await self.embeddings.aembed_query(text)
+        results = await run_in_thread(
+            self.index.query, vector=vector, **self._query_args()
         )
 
+        return self._to_results(results, score_threshold)
+
+    @timed_function(level="DEBUG")
+    async def areset_class(self) -> None:
+        await run_in_thread(
+            self.index.delete, delete_all=True, namespace=self.namespace
+        )
+
+    async def __aenter__(self) -> AgentMemory:
+        # Only builds the embeddings client, which does no I/O
+        return self.__enter__()
+
+    async def __aexit__(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def _add_batch(self, batch: List[str]) -> None:
+        embeds = self.embeddings.embed_documents(batch)
+        self.index.upsert(
+            vectors=self._to_rows(batch, embeds), namespace=self.namespace
+        )
+
+    @staticmethod
+    def _batches(tasks: List[str]) -> List[List[str]]:
+        """Distinct tasks split into batches of the provider's request size"""
+        unique = list(dict.fromkeys(tasks))
+        size = settings.pinecone_upsert_batch_size
+        return [unique[i : i + size] for i in range(0, len(unique), size)]
+
+    @staticmethod
+    def _to_rows(tasks: List[str], embeds: List[List[float]]) -> List[Dict[str, Any]]:
+        if len(tasks) != len(embeds):
+            raise ValueError("Embeddings and tasks are not the same length")
+
+        return [
+            {"id": task_id(task), "values": vector, "metadata": {"text": task}}
+            for task, vector in zip(tasks, embeds)
+        ]
+
+    def _query_args(self) -> Dict[str, Any]:
+        return {
+            #5个子问题 写死
+            "top_k": 5,
+            "include_metadata": True,
+            "include_values": True,
+            "namespace": self.namespace,
+        }
+
+    @staticmethod
+    def _to_results(results: Any, score_threshold: float) -> List[QueryResult]:
         return [
             QueryResult(id=row.id, score=row.score, metadata=row.metadata)
             for row in getattr(results, "matches", [])
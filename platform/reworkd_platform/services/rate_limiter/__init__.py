@@ -0,0 +1 @@
+"""LLM Rate Limiter"""
@@ -0,0 +1,9 @@
+from typing import Optional
+
+from fastapi import Request
+
+from reworkd_platform.services.rate_limiter.limiter import RateLimiter
+
+
+def get_rate_limiter(request: Request) -> Optional[RateLimiter]:
+    return getattr(request.app.state, "rate_limiter", None)
@@ -0,0 +1,26 @@
+from fastapi import FastAPI
+
+from reworkd_platform.services.rate_limiter.limiter import RateLimiter
+from reworkd_platform.settings import settings
+
+
+def init_rate_limiter(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Initialize the limiter shared by every model call of the worker.
+
+    The budget is split evenly across workers and token estimates
+    reuse the memoizing token counter, so run this after the tokenizer.
+
+    :param app: current application.
+    """
+    if not settings.llm_rate_limit_enabled:
+        app.state.rate_limiter = None
+        return
+
+    workers = max(settings.workers_count, 1)
+    app.state.rate_limiter = RateLimiter(
+        requests_per_minute=settings.llm_requests_per_minute // workers,
+        tokens_per_minute=settings.llm_tokens_per_minute // workers,
+        max_wait=settings.llm_rate_limit_max_wait,
+        counter=getattr(app.state, "token_counter", None),
+    )
@@ -0,0 +1,162 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional
+
+from langchain.schema import BaseMessage
+
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.services.tokenizer.token_service import TokenCounter
+from reworkd_platform.web.api.errors import RateLimitExceededError
+
+# Tokens OpenAI adds around every chat message
+MESSAGE_OVERHEAD_TOKENS = 4
+# Shortest pause of the scheduler while waiting for the buckets to refill
+MIN_SLEEP_SECONDS = 0.005
+
+
+class TokenBucket:
+    """Holds up to a minute worth of budget and refills continuously"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        return max(0.0, (amount - self.level) / self.rate)
+
+
+@dataclass
+class Waiter:
+    tokens: int
+    future: "asyncio.Future[None]"
+
+
+class RateLimiter:
+    """
+    Process-wide budget of requests and tokens per minute for upstream LLM calls.
+    Callers queue per key (the user) and are served round-robin across keys, so
+    one busy user cannot starve the others. A call whose estimated wait exceeds
+    its deadline is rejected immediately instead of joining the queue.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_wait: float,
+        counter: Optional[TokenCounter] = None,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_wait = max_wait
+        self.counter = counter
+        self._queues: "OrderedDict[str, Deque[Waiter]]" = OrderedDict()
+        self._scheduler: "Optional[asyncio.Task[None]]" = None
+
+    def estimate(self, messages: List[BaseMessage], max_tokens: int) -> int:
+        """Prompt tokens plus the completion tokens the call may use"""
+        texts = [str(message.content) for message in messages]
+        prompt_tokens = (
+            sum(self.counter.count_batch(texts))
+            if self.counter
+            else sum(len(text) // 4 for text in texts)
+        )
+        return prompt_tokens + MESSAGE_OVERHEAD_TOKENS * len(messages) + max_tokens
+
+    async def acquire(
+        self, key: str, tokens: int, max_wait: Optional[float] = None
+    ) -> None:
+        max_wait = self.max_wait if max_wait is None else max_wait
+        tokens = min(tokens, int(self.tokens.capacity))
+        start = time.monotonic()
+
+        if not self._queues and self._try_take(tokens):
+            metrics.observe("rate_limiter.wait_seconds", 0)
+            return
+
+        if self._estimate_wait(tokens) > max_wait:
+            self._reject("Rate limit budget cannot be met within the deadline")
+
+        waiter = Waiter(tokens, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(key, deque()).append(waiter)
+        metrics.gauge("rate_limiter.queued", self._queued_count())
+        if self._scheduler is None or self._scheduler.done():
+            self._scheduler = asyncio.create_task(self._schedule())
+
+        try:
+            await asyncio.wait_for(waiter.future, max_wait)
+        except asyncio.TimeoutError:
+            self._reject("Timed out waiting for the rate limit budget")
+        finally:
+            self._discard(key, waiter)
+
+        metrics.observe("rate_limiter.wait_seconds", time.monotonic() - start)
+
+    async def _schedule(self) -> None:
+        while self._queues:
+            key, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+
+            if waiter.future.done():
+                self._discard(key, waiter)
+            elif self._try_take(waiter.tokens):
+                waiter.future.set_result(None)
+                self._discard(key, waiter)
+                if key in self._queues:
+                    self._queues.move_to_end(key)
+            else:
+                wait = max(
+                    self.requests.wait_time(1), self.tokens.wait_time(waiter.tokens)
+                )
+                await asyncio.sleep(max(wait, MIN_SLEEP_SECONDS))
+
+    def _try_take(self, tokens: int) -> bool:
+        self.requests.refill()
+        self.tokens.refill()
+        if self.requests.level < 1 or self.tokens.level < tokens:
+            return False
+
+        self.requests.level -= 1
+        self.tokens.level -= tokens
+        return True
+
+    def _estimate_wait(self, tokens: int) -> float:
+        self.requests.refill()
+        self.tokens.refill()
+        queued_tokens = sum(w.tokens for q in self._queues.values() for w in q)
+        return max(
+            self.requests.wait_time(self._queued_count() + 1),
+            self.tokens.wait_time(queued_tokens + tokens),
+        )
+
+    def _queued_count(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _discard(self, key: str, waiter: Waiter) -> None:
+        if (queue := self._queues.get(key)) is None:
+            return
+
+        if waiter in queue:
+            queue.remove(waiter)
+        if not queue:
+            del self._queues[key]
+        metrics.gauge("rate_limiter.queued", self._queued_count())
+
+    @staticmethod
+    def _reject(reason: str) -> None:
+        metrics.increment("rate_limiter.rejected")
+        raise RateLimitExceededError(
+            Exception(reason),
+            "The AI model is receiving too many requests. Please try again shortly.",
+            code=429,
+            should_log=False,
+        )
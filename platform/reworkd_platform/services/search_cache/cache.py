@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+from dataclasses import astuple
+from typing import List, Optional
+
+from loguru import logger
+
+from reworkd_platform.services.completion_cache.cache import (
+    CacheTier,
+    record_lookup,
+)
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.web.api.agent.tools.utils import CitedSnippet
+
+# Queries about current events go stale quickly and get the short TTL
+NEWS_SEARCH_TYPES = {"news"}
+NEWS_QUERY_PATTERN = re.compile(
+    r"\b(news|latest|today|tonight|yesterday|breaking|current|currently|now|"
+    r"recent|recently|this (week|month|year)|live|score|stock|price|weather)\b"
+)
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def is_news_query(query: str, search_type: str) -> bool:
+    return search_type in NEWS_SEARCH_TYPES or bool(
+        NEWS_QUERY_PATTERN.search(normalize_query(query))
+    )
+
+
+class SearchCache:
+    """
+    Cache of parsed search results keyed on the normalized query and search type.
+    Entries are fresh for a TTL depending on the query class, then kept for a
+    stale window during which they are only served if the search API fails.
+    """
+
+    def __init__(
+        self,
+        tiers: List[CacheTier],
+        ttl: float,
+        news_ttl: float,
+        stale_ttl: float,
+    ):
+        self.tiers = tiers
+        self.ttl = ttl
+        self.news_ttl = news_ttl
+        self.stale_ttl = stale_ttl
+
+    @staticmethod
+    def create_key(query: str, search_type: str) -> str:
+        payload = json.dumps([normalize_query(query), search_type])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, query: str, search_type: str) -> Optional[List[CitedSnippet]]:
+        entry = self._get(self.create_key(query, search_type))
+        if entry is None or entry["fresh_until"] < time.time():
+            record_lookup("search_cache", "miss")
+            return None
+
+        record_lookup("search_cache", "hit")
+        return _to_snippets(entry)
+
+    def get_stale(
+        self, query: str, search_type: str
+    ) -> Optional[List[CitedSnippet]]:
+        if (entry := self._get(self.create_key(query, search_type))) is None:
+            return None
+
+        metrics.increment("search_cache.stale_served")
+        return _to_snippets(entry)
+
+    def set(self, query: str, search_type: str, snippets: List[CitedSnippet]) -> None:
+        ttl = self.news_ttl if is_news_query(query, search_type) else self.ttl
+        entry = {
+            "snippets": [astuple(snippet) for snippet in snippets],
+            "fresh_until": time.time() + ttl,
+        }
+
+        key = self.create_key(query, search_type)
+        for tier in self.tiers:
+            try:
+                tier.set(key, entry, ttl=ttl + self.stale_ttl)
+            except Exception as e:
+                logger.exception(e)
+
+    async def aget(self, query: str, search_type: str) -> Optional[List[CitedSnippet]]:
+        return await asyncio.to_thread(self.get, query, search_type)
+
+    async def aget_stale(
+        self, query: str, search_type: str
+    ) -> Optional[List[CitedSnippet]]:
+        return await asyncio.to_thread(self.get_stale, query, search_type)
+
+    async def aset(
+        self, query: str, search_type: str, snippets: List[CitedSnippet]
+    ) -> None:
+        await asyncio.to_thread(self.set, query, search_type, snippets)
+
+    def close(self) -> None:
+        for tier in self.tiers:
+            tier.close()
+
+    def _get(self, key: str) -> Optional[dict]:
+        for i, tier in enumerate(self.tiers):
+            try:
+                entry = tier.get(key)
+            except Exception as e:
+                logger.exception(e)
+                continue
+
+            if entry is not None:
+                metrics.increment(f"search_cache.{tier.name}.found")
+                for faster_tier in self.tiers[:i]:
+                    ttl = entry["fresh_until"] - time.time() + self.stale_ttl
+                    faster_tier.set(key, entry, ttl=max(ttl, 1))
+                return entry
+
+        return None
+
+
+def _to_snippets(entry: dict) -> List[CitedSnippet]:
+    return [CitedSnippet(*snippet) for snippet in entry["snippets"]]
@@ -0,0 +1,44 @@
+from typing import Optional
+
+from fastapi import FastAPI
+
+from reworkd_platform.services.completion_cache.cache import create_tiers
+from reworkd_platform.services.search_cache.cache import SearchCache
+from reworkd_platform.settings import settings
+
+search_cache: Optional[SearchCache] = None
+
+
+def create_search_cache() -> SearchCache:
+    tiers = create_tiers(
+        "search_cache",
+        max_entries=settings.search_cache_max_entries,
+        ttl=settings.search_cache_ttl,
+        disk_path=settings.search_cache_disk_path,
+        disk_max_entries=settings.search_cache_disk_max_entries,
+    )
+    return SearchCache(
+        tiers,
+        ttl=settings.search_cache_ttl,
+        news_ttl=settings.search_cache_news_ttl,
+        stale_ttl=settings.search_cache_stale_ttl,
+    )
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """Cache for the search tool, which is not handed FastAPI dependencies"""
+    return search_cache
+
+
+def init_search_cache(app: FastAPI) -> None:  # pragma: no cover
+    """Initialize the search result cache, if enabled."""
+    global search_cache
+    search_cache = create_search_cache() if settings.search_cache_enabled else None
+    app.state.search_cache = search_cache
+
+
+def shutdown_search_cache(app: FastAPI) -> None:  # pragma: no cover
+    global search_cache
+    if search_cache:
+        search_cache.close()
+    search_cache = None
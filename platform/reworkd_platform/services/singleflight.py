@@ -0,0 +1,55 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+from reworkd_platform.services.metrics import metrics
+
+T = TypeVar("T")
+
+
+@dataclass
+class Call(Generic[T]):
+    task: "asyncio.Task[T]"
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one in-flight request.
+    Callers with the same key share the first caller's task and its result or
+    exception. A waiter that is cancelled leaves the shared task running for the
+    others; the task is only cancelled once every waiter has gone away, unless
+    the flight is detached, in which case calls always run to completion.
+    Nothing is cached: a call arriving after completion starts a new request.
+    """
+
+    def __init__(self, name: str, detached: bool = False):
+        self.name = name
+        self.detached = detached
+        self._calls: Dict[Hashable, Call[Any]] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = Call(task=asyncio.ensure_future(func()))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self._calls[key] = call
+            metrics.increment(f"singleflight.{self.name}.calls")
+        else:
+            metrics.increment(f"singleflight.{self.name}.deduplicated")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done() and not self.detached:
+                call.task.cancel()
+                self._forget(key, call)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key: Hashable, call: Call[Any]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
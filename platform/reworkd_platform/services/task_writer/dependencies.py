@@ -0,0 +1,9 @@
+from typing import Optional
+
+from fastapi import Request
+
+from reworkd_platform.services.task_writer.writer import AgentTaskWriter
+
+
+def get_task_writer(request: Request) -> Optional[AgentTaskWriter]:
+    return getattr(request.app.state, "task_writer", None)
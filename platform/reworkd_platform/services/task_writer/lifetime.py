@@ -0,0 +1,32 @@
+from fastapi import FastAPI
+
+from reworkd_platform.services.task_writer.writer import AgentTaskWriter
+from reworkd_platform.settings import settings
+
+
+def init_task_writer(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Start the write-behind buffer of agent tasks when enabled.
+
+    Requires the database session factory, so it runs after the
+    database is set up.
+
+    :param app: current application.
+    """
+    app.state.task_writer = None
+    if not settings.agent_task_write_behind:
+        return
+
+    app.state.task_writer = AgentTaskWriter(
+        app.state.db_session_factory,
+        batch_size=settings.agent_task_batch_size,
+        flush_interval=settings.agent_task_flush_interval,
+        max_buffered=settings.agent_task_max_buffered,
+    )
+    app.state.task_writer.start()
+
+
+async def shutdown_task_writer(app: FastAPI) -> None:  # pragma: no cover
+    """Flush the buffered agent tasks before the database is disposed"""
+    if writer := getattr(app.state, "task_writer", None):
+        await writer.close()
@@ -0,0 +1,165 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from reworkd_platform.db.crud.agent import AgentCRUD, check_task_count
+from reworkd_platform.db.models.agent import AgentTask
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.services.singleflight import SingleFlight
+
+MAX_TRACKED_STEPS = 10_000
+
+
+class AgentTaskWriter:
+    """
+    Write-behind buffer for AgentTask rows.
+    Step limits are enforced from in-process counters that are seeded from the
+    database and the unflushed rows the first time a worker sees a run's step
+    type, one seed per step type at a time, and the rows are
+    inserted in multi-row batches on a timer or once the buffer fills. Closing
+    the writer flushes what is left.
+
+    Counters are per worker, so steps of one run handled by several workers are
+    only counted against the limit from the rows flushed before each worker
+    seeded its counter. Rows take the database time of their flush, which is
+    at most `flush_interval` late.
+    """
+
+    def __init__(
+        self,
+        session_factory: "async_sessionmaker[AsyncSession]",
+        batch_size: int,
+        flush_interval: float,
+        max_buffered: int,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self._counts: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._buffer: List[Dict[str, Any]] = []
+        self._flushing: List[Dict[str, Any]] = []
+        self._seeds = SingleFlight("task_writer_seed")
+        self._flush_lock = asyncio.Lock()
+        self._timer: Optional["asyncio.Task[None]"] = None
+        self._closing = asyncio.Event()
+        self._pending: Optional["asyncio.Task[None]"] = None
+
+    def start(self) -> None:
+        self._timer = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        # The timer is stopped rather than cancelled, so a flush in progress
+        # completes instead of losing the rows it took from the buffer
+        self._closing.set()
+        if self._timer is not None:
+            await asyncio.gather(self._timer, return_exceptions=True)
+            self._timer = None
+        if self._pending is not None:
+            await asyncio.gather(self._pending, return_exceptions=True)
+        await self.flush()
+
+    async def record(self, crud: AgentCRUD, run_id: str, type_: str) -> AgentTask:
+        return (await self.record_many(crud, run_id, type_, 1))[0]
+
+    async def record_many(
+        self, crud: AgentCRUD, run_id: str, type_: str, count: int
+    ) -> List[AgentTask]:
+        """Buffers count steps of a run if all of them fit within its limit"""
+        key = (run_id, type_)
+        if (recorded := self._counts.get(key)) is None:
+            seeded = await self._seeds.do(
+                key, partial(self._seed, crud, run_id, type_)
+            )
+            # Callers sharing a seed are counted after the first one resumed
+            if (recorded := self._counts.get(key)) is None:
+                recorded = seeded
+
+        check_task_count(type_, recorded + count - 1)
+        self._counts[key] = recorded + count
+        self._counts.move_to_end(key)
+        if len(self._counts) > MAX_TRACKED_STEPS:
+            self._counts.popitem(last=False)
+
+        tasks = [
+            AgentTask(id=str(uuid.uuid4()), run_id=run_id, type_=type_)
+            for _ in range(count)
+        ]
+        self._append(
+            [{"id": task.id, "run_id": run_id, "type_": type_} for task in tasks]
+        )
+        return tasks
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            rows, self._buffer = self._buffer, []
+            metrics.gauge("task_writer.buffer_depth", 0)
+            if not rows:
+                return 0
+
+            start = time.perf_counter()
+            self._flushing = rows
+            try:
+                async with self.session_factory() as session, session.begin():
+                    await session.execute(insert(AgentTask), rows)
+            except BaseException as e:
+                # Cancelled flushes requeue their rows too, then propagate
+                self._buffer[:0] = rows
+                self._trim()
+                if not isinstance(e, Exception):
+                    raise
+
+                logger.warning(f"Failed to flush {len(rows)} agent tasks: {e}")
+                metrics.increment("task_writer.failed")
+                return 0
+            finally:
+                self._flushing = []
+
+            metrics.observe("task_writer.flush_seconds", time.perf_counter() - start)
+            metrics.increment("task_writer.flushed", len(rows))
+            return len(rows)
+
+    async def _seed(self, crud: AgentCRUD, run_id: str, type_: str) -> int:
+        # Counted before the query, so rows committed meanwhile are counted
+        # twice rather than missed
+        unflushed = sum(
+            row["run_id"] == run_id and row["type_"] == type_
+            for row in self._buffer + self._flushing
+        )
+        return await crud.count_tasks(run_id, type_) + unflushed
+
+    def _append(self, rows: List[Dict[str, Any]]) -> None:
+        self._buffer.extend(rows)
+        self._trim()
+        metrics.gauge("task_writer.buffer_depth", len(self._buffer))
+
+        if len(self._buffer) >= self.batch_size and (
+            self._pending is None or self._pending.done()
+        ):
+            self._pending = asyncio.create_task(self._flush_quietly())
+
+    def _trim(self) -> None:
+        # Only reached while the database is failing, so the oldest rows go
+        if (overflow := len(self._buffer) - self.max_buffered) > 0:
+            del self._buffer[:overflow]
+            metrics.increment("task_writer.dropped", overflow)
+
+    async def _flush_quietly(self) -> None:
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.exception(e)
+
+    async def _run(self) -> None:
+        while not self._closing.is_set():
+            try:
+                await asyncio.wait_for(self._closing.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                await self._flush_quietly()
@@ -0,0 +1 @@
+"""Token Refresher"""
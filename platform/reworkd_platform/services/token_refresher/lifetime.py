@@ -0,0 +1,30 @@
+from fastapi import FastAPI
+
+from reworkd_platform.services.token_refresher.refresher import TokenRefresher
+from reworkd_platform.settings import settings
+
+
+def init_token_refresher(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Start renewing OAuth access tokens in the background.
+
+    Requires the database session factory, so it runs after the
+    database is set up.
+
+    :param app: current application.
+    """
+    app.state.token_refresher = None
+    if not (settings.sid_enabled and settings.sid_token_refresh_enabled):
+        return
+
+    app.state.token_refresher = TokenRefresher(
+        app.state.db_session_factory,
+        interval=settings.sid_token_refresh_interval,
+        lead=settings.sid_token_refresh_lead,
+    )
+    app.state.token_refresher.start()
+
+
+async def shutdown_token_refresher(app: FastAPI) -> None:  # pragma: no cover
+    if refresher := getattr(app.state, "token_refresher", None):
+        await refresher.stop()
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from reworkd_platform.db.crud.oauth import OAuthCrud
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.web.api.agent.tools.sidsearch import (
+    refresh_installation,
+    sid_refresh_flight,
+)
+
+
+class TokenRefresher:
+    """
+    Renews SID access tokens ahead of their expiry so tool calls rarely wait on
+    the token exchange. Each installation is refreshed in its own transaction
+    with its row locked with SKIP LOCKED, so workers scanning at the same time
+    split the rows instead of refreshing them twice. Installations that fail to
+    refresh are left out of the scans for an exponentially growing backoff.
+    """
+
+    def __init__(
+        self,
+        session_factory: "async_sessionmaker[AsyncSession]",
+        interval: float,
+        lead: float,
+        batch_size: int = 50,
+        max_backoff: float = 60 * 60,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.lead = timedelta(seconds=lead)
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self._task: Optional["asyncio.Task[None]"] = None
+        # Installation id to consecutive failures and when to retry it
+        self._backoff: Dict[str, Tuple[int, float]] = {}
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def refresh_expiring(self) -> int:
+        """Refreshes one batch of expiring tokens and returns how many succeeded"""
+        expiring_before = datetime.now() + self.lead
+        async with self.session_factory() as session:
+            installations = await OAuthCrud(session).get_expiring_installations(
+                "sid", expiring_before, self.batch_size, exclude=self._backing_off()
+            )
+
+        refreshed = 0
+        for installation in installations:
+            try:
+                if await self._refresh(installation.id, expiring_before):
+                    refreshed += 1
+                self._backoff.pop(installation.id, None)
+            except Exception as e:
+                self._back_off(installation.id)
+                metrics.increment("token_refresher.failed")
+                logger.warning(f"Failed to refresh sid token: {e}")
+
+        metrics.increment("token_refresher.refreshed", refreshed)
+        return refreshed
+
+    async def _refresh(self, installation_id: str, expiring_before: datetime) -> bool:
+        token = await sid_refresh_flight.do(
+            installation_id,
+            partial(
+                refresh_installation,
+                self.session_factory,
+                installation_id,
+                expiring_before,
+            ),
+        )
+        # None when renewed or being renewed by another worker since the scan
+        return token is not None
+
+    def _backing_off(self) -> List[str]:
+        now = time.monotonic()
+        return [id_ for id_, (_, retry_at) in self._backoff.items() if retry_at > now]
+
+    def _back_off(self, installation_id: str) -> None:
+        failures = self._backoff.get(installation_id, (0, 0.0))[0] + 1
+        delay = min(self.interval * 2 ** (failures - 1), self.max_backoff)
+        self._backoff[installation_id] = (failures, time.monotonic() + delay)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh_expiring()
+            except Exception as e:
+                logger.exception(e)
+            await asyncio.sleep(self.interval)
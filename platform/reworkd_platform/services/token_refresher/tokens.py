@@ -0,0 +1,54 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.settings import settings
+
+# Tokens closer than this to expiring are refreshed before use
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+
+class AccessTokenCache:
+    """
+    Decrypted OAuth access tokens by installation id.
+    A token is kept for at most `ttl` seconds and never past the point where it
+    would be refreshed, so a hit can always be used as is.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._tokens: "OrderedDict[str, Tuple[str, datetime]]" = OrderedDict()
+
+    def get(self, installation_id: str) -> Optional[str]:
+        entry = self._tokens.get(installation_id)
+        if entry is None or entry[1] <= datetime.now():
+            metrics.increment("access_tokens.miss")
+            return None
+
+        metrics.increment("access_tokens.hit")
+        self._tokens.move_to_end(installation_id)
+        return entry[0]
+
+    def set(self, installation_id: str, token: str, expiration: datetime) -> None:
+        if self.ttl <= 0:
+            return
+
+        valid_until = min(
+            expiration - TOKEN_REFRESH_MARGIN,
+            datetime.now() + timedelta(seconds=self.ttl),
+        )
+        self._tokens[installation_id] = (token, valid_until)
+        self._tokens.move_to_end(installation_id)
+        if len(self._tokens) > self.max_entries:
+            self._tokens.popitem(last=False)
+
+    def invalidate(self, installation_id: str) -> None:
+        self._tokens.pop(installation_id, None)
+
+    def clear(self) -> None:
+        self._tokens.clear()
+
+
+access_tokens = AccessTokenCache(ttl=settings.sid_token_cache_ttl)
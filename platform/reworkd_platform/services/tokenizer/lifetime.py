@@ -1,6 +1,9 @@
 import tiktoken
 from fastapi import FastAPI
 
+from reworkd_platform.services.tokenizer.token_service import TokenCounter
+from reworkd_platform.settings import settings
+
 ENCODING_NAME = "cl100k_base"  # gpt-4, gpt-3.5-turbo, text-embedding-ada-002
 
 
@@ -9,8 +12,12 @@ def init_tokenizer(app: FastAPI) -> None:  # pragma: no cover
     Initialize tokenizer.
 
     TikToken downloads the encoding on start. It is then
-    stored in the state of the application.
+    stored in the state of the application along with a
+    memoizing counter shared by all requests.
 
     :param app: current application.
     """
     app.state.token_encoding = tiktoken.get_encoding(ENCODING_NAME)
+    app.state.token_counter = TokenCounter(
+        app.state.token_encoding, max_entries=settings.token_count_cache_size
+    )
@@ -1,12 +1,157 @@
+import hashlib
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from string import Formatter
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain import PromptTemplate
+from loguru import logger
 from tiktoken import Encoding, get_encoding
 
 from reworkd_platform.schemas.agent import LLM_MODEL_MAX_TOKENS, LLM_Model
+from reworkd_platform.services.metrics import metrics
 from reworkd_platform.web.api.agent.model_factory import WrappedChatOpenAI
 
+TemplateCost = Tuple[int, Dict[str, int]]  # static tokens, variable occurrences
+
+# Initial characters encoded per token of budget when truncating. The window
+# grows until it either covers the text or yields more tokens than the budget.
+TRUNCATION_CHARS_PER_TOKEN = 4
+
+
+class TokenCounter:
+    """
+    Memoizing token counter shared by every TokenService of a worker.
+    Counts are cached by content hash in a bounded LRU, and each prompt template
+    has the token cost of its static text computed once.
+    """
+
+    def __init__(self, encoding: Encoding, max_entries: int = 10_000):
+        self.encoding = encoding
+        self.max_entries = max_entries
+        self._counts: "OrderedDict[bytes, int]" = OrderedDict()
+        self._templates: Dict[str, TemplateCost] = {}
+        self._lock = Lock()
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+
+        key = _hash(text)
+        if (cached := self._get(key)) is not None:
+            return cached
+
+        count = len(self.encoding.encode(text))
+        self._set(key, count)
+        return count
+
+    def count_batch(self, texts: List[str], num_threads: int = 8) -> List[int]:
+        keys = [_hash(text) for text in texts]
+        counts = [self._get(key) for key in keys]
+        misses = [i for i, count in enumerate(counts) if count is None and texts[i]]
+
+        if misses:
+            miss_texts = [texts[i] for i in misses]
+            encoded = (
+                self.encoding.encode_batch(miss_texts, num_threads=num_threads)
+                if len(miss_texts) > 1
+                else [self.encoding.encode(miss_texts[0])]
+            )
+            for i, tokens in zip(misses, encoded):
+                counts[i] = len(tokens)
+                self._set(keys[i], len(tokens))
+
+        return [count or 0 for count in counts]
+
+    def count_template(self, template: PromptTemplate, **inputs: Any) -> int:
+        """
+        Token count of a rendered template without rendering it.
+        Static text is counted once per template. Only the variables are
+        tokenized per call. Boundary merges are ignored, so the result may
+        overestimate the rendered prompt by a few tokens.
+        """
+        static_tokens, occurrences = self._get_template_cost(template.template)
+        counts = self.count_batch(
+            [str(inputs.get(name, "")) for name in occurrences]
+        )
+
+        return static_tokens + sum(
+            count * occurrences[name] for name, count in zip(occurrences, counts)
+        )
+
+    def _get_template_cost(self, template: str) -> TemplateCost:
+        if (cost := self._templates.get(template)) is not None:
+            return cost
+
+        literals: List[str] = []
+        occurrences: Dict[str, int] = Counter()
+        for literal, field, _, _ in Formatter().parse(template):
+            literals.append(literal)
+            if field is not None:
+                occurrences[field] += 1
+
+        cost = (len(self.encoding.encode("".join(literals))), dict(occurrences))
+        self._templates[template] = cost
+        return cost
+
+    def _get(self, key: bytes) -> Optional[int]:
+        with self._lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+            return count
+
+    def _set(self, key: bytes, count: int) -> None:
+        with self._lock:
+            self._counts[key] = count
+            if len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+
+
+def _hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+@dataclass
+class TokenBudget:
+    """Allocation of a model's context window for a single call"""
+
+    step: str
+    model: str
+    context: int
+    prompt: int
+    tools: int
+    completion: int
+    trimmed: bool = False
+
+    @property
+    def unused(self) -> int:
+        return self.context - self.prompt - self.tools - self.completion
+
+    @property
+    def llm_kwargs(self) -> Dict[str, Any]:
+        """Parameters of the call, passed with it rather than set on the model"""
+        return {"model": self.model, "max_tokens": self.completion}
+
+    def report(self) -> None:
+        logger.info(
+            f"Token budget for {self.step} on {self.model}: "
+            f"prompt={self.prompt} tools={self.tools} completion={self.completion} "
+            f"unused={self.unused} trimmed={self.trimmed}"
+        )
+        metrics.observe(f"token_budget.{self.step}.prompt", self.prompt)
+        metrics.observe(f"token_budget.{self.step}.tools", self.tools)
+        metrics.observe(f"token_budget.{self.step}.completion", self.completion)
+        metrics.observe(f"token_budget.{self.step}.unused", self.unused)
+        if self.trimmed:
+            metrics.increment(f"token_budget.{self.step}.trimmed")
+
 
 class TokenService:
-    def __init__(self, encoding: Encoding):
+    def __init__(self, encoding: Encoding, counter: Optional[TokenCounter] = None):
         self.encoding = encoding
+        self.counter = counter or TokenCounter(encoding)
 
     @classmethod
     def create(cls, encoding: str = "cl100k_base") -> "TokenService":
@@ -19,15 +164,123 @@ class TokenService:
         return self.encoding.decode(tokens)
 
     def count(self, text: str) -> int:
-        return len(self.tokenize(text))
+        return self.counter.count(text)
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        return self.counter.count_batch(texts)
+
+    def count_prompt(self, template: PromptTemplate, **inputs: Any) -> int:
+        return self.counter.count_template(template, **inputs)
+
+    def truncate(self, texts: Iterable[str], max_tokens: int) -> str:
+        """
+        Concatenation of texts cut down to max_tokens.
+        Texts are consumed one by one and only the kept prefix is ever encoded,
+        so the cost depends on the budget rather than the total input size.
+        """
+        kept: List[str] = []
+        remaining = max_tokens
+
+        for text in texts:
+            if remaining <= 0:
+                break
+
+            prefix, tokens = self._take(text, remaining)
+            kept.append(prefix)
+            remaining -= tokens
+
+        return "".join(kept)
+
+    def _take(self, text: str, budget: int) -> Tuple[str, int]:
+        window = budget * TRUNCATION_CHARS_PER_TOKEN
+        while window < len(text):
+            tokens = self.tokenize(text[:window])
+            # The last token may be cut by the window, so require one spare
+            if len(tokens) > budget:
+                return self.detokenize(tokens[:budget]), budget
+            window *= 2
+
+        if (count := self.count(text)) <= budget:
+            return text, count
+        return self.detokenize(self.tokenize(text)[:budget]), budget
+
+    def fit_latest(self, texts: List[str], max_tokens: int) -> List[str]:
+        """
+        The most recent texts that fit in max_tokens, in their original order.
+        The oldest text kept may be cut to use the remaining budget.
+        """
+        kept: List[str] = []
+        remaining = max_tokens
+
+        for text, count in zip(reversed(texts), reversed(self.count_batch(texts))):
+            if remaining <= 0:
+                break
+
+            if count > remaining:
+                text, count = self._take(text, remaining)
+            kept.append(text)
+            remaining -= count
+
+        return kept[::-1]
+
+    @staticmethod
+    def get_context_size(model: LLM_Model) -> int:
+        return LLM_MODEL_MAX_TOKENS.get(model, 4000)
+
+    def get_input_space(self, model: LLM_Model, *reserved_tokens: int) -> int:
+        """Tokens left for variable inputs once everything else is reserved"""
+        return max(self.get_context_size(model) - sum(reserved_tokens), 0)
+
+    def plan(
+        self,
+        step: str,
+        model: WrappedChatOpenAI,
+        prompt_tokens: int,
+        tool_tokens: int = 0,
+        completion_tokens: Optional[int] = None,
+        trimmed: bool = False,
+        model_name: Optional[LLM_Model] = None,
+    ) -> TokenBudget:
+        """
+        Allocates the context window of model_name, the model's own by default,
+        between the prompt, the tool schemas and the completion. The completion
+        defaults to the model's configured max_tokens and shrinks to whatever
+        the prompt leaves. The model is left untouched; the call is made with
+        the budget's llm_kwargs.
+        """
+        model_name = model_name or model.model_name
+        context = self.get_context_size(model_name)
+        completion = min(
+            model.max_tokens if completion_tokens is None else completion_tokens,
+            context - prompt_tokens - tool_tokens,
+        )
+        completion = max(completion, 1)
+
+        budget = TokenBudget(
+            step=step,
+            model=model_name,
+            context=context,
+            prompt=prompt_tokens,
+            tools=tool_tokens,
+            completion=completion,
+            trimmed=trimmed,
+        )
+        budget.report()
+        return budget
 
-    def get_completion_space(self, model: LLM_Model, *prompts: str) -> int:
+    def get_completion_space(
+        self, model: LLM_Model, *prompts: str, prompt_tokens: int = 0
+    ) -> int:
         max_allowed_tokens = LLM_MODEL_MAX_TOKENS.get(model, 4000)
-        prompt_tokens = sum([self.count(p) for p in prompts])
+        prompt_tokens += sum(self.count_batch(list(prompts)))
         return max_allowed_tokens - prompt_tokens
 
-    def calculate_max_tokens(self, model: WrappedChatOpenAI, *prompts: str) -> None:
-        requested_tokens = self.get_completion_space(model.model_name, *prompts)
+    def calculate_max_tokens(
+        self, model: WrappedChatOpenAI, *prompts: str, prompt_tokens: int = 0
+    ) -> None:
+        requested_tokens = self.get_completion_space(
+            model.model_name, *prompts, prompt_tokens=prompt_tokens
+        )
 
         model.max_tokens = min(model.max_tokens, requested_tokens)
         model.max_tokens = max(model.max_tokens, 1)
@@ -30,6 +30,12 @@ ENVIRONMENT = Literal[
     "production",
 ]
 
+VECTOR_DTYPE = Literal[
+    "float32",
+    "float16",
+    "int8",
+]
+
 
 class Settings(BaseSettings):
     """
@@ -82,6 +88,20 @@ class Settings(BaseSettings):
     pinecone_api_key: Optional[str] = None
     pinecone_index_name: Optional[str] = None
     pinecone_environment: Optional[str] = None
+    pinecone_upsert_batch_size: int = 100  # Tasks per embedding and upsert request
+    pinecone_upsert_concurrency: int = 4  # Batches in flight per add_tasks call
+
+    # Shared HTTP client pool used by tools and OAuth installers
+    http_pool_limit: int = 100  # Total open connections per worker
+    http_pool_limit_per_host: int = 20
+    http_keepalive_timeout: float = 30.0  # Seconds
+    http_dns_cache_ttl: int = 300  # Seconds
+    http_connect_timeout: float = 5.0  # Seconds
+    http_read_timeout: float = 60.0  # Seconds
+
+    # Separate HTTP client pool for LLM requests
+    llm_http_pool_limit: int = 100
+    llm_http_pool_limit_per_host: int = 50
 
     # Sentry's configuration.
     sentry_dsn: Optional[str] = None
@@ -101,11 +121,86 @@ class Settings(BaseSettings):
     # Application Settings
     ff_mock_mode_enabled: bool = False  # Controls whether calls are mocked
     max_loops: int = 25  # Maximum number of loops to run
+    max_concurrent_analyses: int = 5  # Concurrent completions per batch analyze
+    tool_availability_ttl: int = 0  # Seconds availability is shared across requests
+
+    # Buffer agent task rows and insert them in batches instead of per request
+    agent_task_write_behind: bool = False
+    agent_task_batch_size: int = 500  # Rows that trigger a flush
+    agent_task_flush_interval: float = 1.0  # Seconds between timed flushes
+    agent_task_max_buffered: int = 50_000  # Oldest rows dropped past this
+
+    # Speculative analysis of queued tasks while a task executes
+    speculative_analysis_enabled: bool = False
+    speculative_analysis_depth: int = 1  # Queued tasks analyzed ahead
+    speculative_analysis_ttl: int = 120  # Seconds an unused analysis is kept
+    speculative_analysis_max_per_run: int = 25  # Speculative completions per run
+    speculative_analysis_max_in_flight: int = 50  # Per worker
+
+    # Budget of calls made with the platform's OpenAI key, split across workers.
+    # Opt-in: set the limits to the key's tier before enabling it, calls past
+    # them wait up to the max wait and then fail instead of reaching OpenAI
+    llm_rate_limit_enabled: bool = False
+    llm_requests_per_minute: int = 3_500
+    llm_tokens_per_minute: int = 90_000
+    llm_rate_limit_max_wait: float = 30.0  # Seconds before failing fast
+    llm_client_pool_size: int = 256  # Validated chat models kept per worker
+
+    # Authenticated sessions cached per worker, never past the session's expiry.
+    # Signing out is not seen by the backend, so a signed out session is still
+    # accepted for up to the ttl
+    session_cache_ttl: int = 60  # Seconds, 0 disables the cache
+    session_cache_negative_ttl: int = 5  # Seconds an invalid token is remembered
+    session_cache_max_entries: int = 10_000
+
+    # Number of memoized token counts kept per worker
+    token_count_cache_size: int = 10_000
+
+    # Completion cache
+    completion_cache_enabled: bool = True
+    completion_cache_ttl: int = 60 * 60 * 24  # Seconds
+    completion_cache_max_entries: int = 2048  # In-process LRU size
+    completion_cache_disk_path: Optional[Path] = TEMP_DIR / "completion_cache.db"
+    completion_cache_disk_max_entries: int = 100_000
+    # Runs above this temperature are never cached, users expect varied output
+    completion_cache_max_temperature: float = 0.2
+
+    # Search result cache
+    search_cache_enabled: bool = True
+    search_cache_ttl: int = 60 * 60 * 24  # Seconds
+    search_cache_news_ttl: int = 60 * 15  # Seconds for news-like queries
+    search_cache_stale_ttl: int = 60 * 60  # Served past expiry if Serper fails
+    search_cache_max_entries: int = 1024  # In-process LRU size
+    search_cache_disk_path: Optional[Path] = TEMP_DIR / "search_cache.db"
+    search_cache_disk_max_entries: int = 50_000
+
+    # Embedding cache, entries are float32 vectors of 6KB
+    embedding_cache_enabled: bool = True
+    embedding_cache_ttl: int = 60 * 60 * 24 * 30  # Seconds, embeddings do not change
+    embedding_cache_max_entries: int = 4096  # In-process LRU size
+    embedding_cache_disk_path: Optional[Path] = TEMP_DIR / "embedding_cache.db"
+    embedding_cache_disk_max_entries: int = 100_000
+
+    # Concurrent embedding requests of a worker coalesced into one upstream call
+    embedding_batch_enabled: bool = True
+    embedding_batch_window: float = 0.005  # Seconds the first text waits for others
+    embedding_batch_max_size: int = 256  # Texts per upstream call
+
+    # Threads running blocking vector memory calls per worker
+    memory_max_threads: int = 8
+
+    # Local vector memory
+    local_memory_dtype: VECTOR_DTYPE = "float32"  # Storage of the embeddings
+    local_memory_path: Optional[Path] = None  # Memory-mapped persistence when set
 
     # Settings for sid
     sid_client_id: Optional[str] = None
     sid_client_secret: Optional[str] = None
     sid_redirect_uri: Optional[str] = None
+    sid_token_cache_ttl: int = 60 * 5  # Seconds a decrypted access token is kept
+    sid_token_refresh_enabled: bool = True  # Renew tokens in the background
+    sid_token_refresh_interval: int = 60  # Seconds between scans
+    sid_token_refresh_lead: int = 60 * 15  # Renew tokens expiring within this
 
     @property
     def kafka_consumer_group(self) -> str:
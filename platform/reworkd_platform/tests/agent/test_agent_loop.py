@@ -0,0 +1,234 @@
+import json
+from contextlib import asynccontextmanager
+from typing import List, Tuple
+
+import pytest
+from lanarky.responses import StreamingResponse
+
+from reworkd_platform.schemas.agent import AgentLoop, AgentTaskExecute
+from reworkd_platform.web.api.agent import views
+from reworkd_platform.web.api.agent.agent_loop import (
+    AgentLoopRunner,
+    format_event,
+    iterate_response,
+)
+from reworkd_platform.web.api.agent.analysis import Analysis
+from reworkd_platform.web.api.agent.stream_mock import stream_string
+from reworkd_platform.web.api.errors import MaxLoopsError
+
+
+def parse_events(events: List[str]) -> List[Tuple[str, dict]]:
+    parsed = []
+    for event in events:
+        name, data = event.strip().split("\n")
+        parsed.append((name.removeprefix("event: "), json.loads(data[6:])))
+    return parsed
+
+
+def create_service(mocker):
+    service = mocker.Mock()
+    service.start_goal_agent = mocker.AsyncMock(return_value=["task 1"])
+    service.analyze_task_agent = mocker.AsyncMock(
+        return_value=Analysis(action="code", arg="", reasoning="because")
+    )
+    service.prefetch_analyses = mocker.AsyncMock()
+    service.execute_task_agent = mocker.AsyncMock(
+        side_effect=lambda **kwargs: stream_string(f"done {kwargs['task']}")
+    )
+    service.create_tasks_agent = mocker.AsyncMock(side_effect=[["task 2"], []])
+    service.summarize_task_agent = mocker.AsyncMock(
+        side_effect=lambda **_: stream_string("summary")
+    )
+    return service
+
+
+def create_crud_factory(crud):
+    @asynccontextmanager
+    async def create_crud():
+        yield crud
+
+    return create_crud
+
+
+async def run(runner: AgentLoopRunner) -> List[Tuple[str, dict]]:
+    return parse_events([event async for event in runner.stream()])
+
+
+def test_format_event() -> None:
+    assert format_event("tasks", {"tasks": []}) == 'event: tasks\ndata: {"tasks": []}\n\n'
+
+
+@pytest.mark.asyncio
+async def test_iterate_response() -> None:
+    chunks = [chunk async for chunk in iterate_response(stream_string("abc"))]
+    assert "".join(chunks) == "abc"
+
+
+@pytest.mark.asyncio
+async def test_iterate_chain_response() -> None:
+    async def chain_executor(send) -> None:
+        for token in ["a", "b"]:
+            await send({"type": "http.response.body", "body": token.encode()})
+
+    response = StreamingResponse(chain_executor=chain_executor)
+    chunks = [chunk async for chunk in iterate_response(response)]
+    assert chunks == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_runs_loop_until_no_tasks_remain(mocker) -> None:
+    service = create_service(mocker)
+    crud = mocker.Mock(create_task=mocker.AsyncMock())
+    runner = AgentLoopRunner(
+        AgentLoop(goal="goal", run_id="run"),
+        create_crud_factory(crud),
+        lambda **_: service,
+    )
+
+    events = await run(runner)
+
+    assert [name for name, _ in events] == [
+        "start",
+        "tasks",
+        *["analysis", "execution", "result", "tasks"] * 2,
+        "summary",
+        "end",
+    ]
+    assert events[4] == ("result", {"task": "task 1", "result": "done task 1"})
+    service.summarize_task_agent.assert_called_once_with(
+        goal="goal", results=["done task 1", "done task 2"]
+    )
+    service.prefetch_analyses.assert_any_call(
+        run_id="run", goal="goal", tasks=[], tool_names=[]
+    )
+    assert [c.args[1] for c in crud.create_task.call_args_list] == [
+        *["analyze", "execute", "create"] * 2,
+        "summarize",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stops_at_max_loops(mocker) -> None:
+    service = create_service(mocker)
+    service.create_tasks_agent = mocker.AsyncMock(return_value=["another task"])
+    crud = mocker.Mock(create_task=mocker.AsyncMock())
+    runner = AgentLoopRunner(
+        AgentLoop(goal="goal", run_id="run"),
+        create_crud_factory(crud),
+        lambda **_: service,
+        max_loops=3,
+    )
+
+    events = await run(runner)
+
+    assert service.analyze_task_agent.call_count == 3
+    assert events[-2][0] == "summary"
+
+
+@pytest.mark.asyncio
+async def test_reports_errors_as_events(mocker) -> None:
+    service = create_service(mocker)
+    crud = mocker.Mock(
+        create_task=mocker.AsyncMock(
+            side_effect=MaxLoopsError(StopIteration(), "Max loops exceeded")
+        )
+    )
+    runner = AgentLoopRunner(
+        AgentLoop(goal="goal", run_id="run"),
+        create_crud_factory(crud),
+        lambda **_: service,
+    )
+
+    events = await run(runner)
+
+    assert events[-2] == (
+        "error",
+        {"error": "MaxLoopsError", "detail": "Max loops exceeded"},
+    )
+    assert events[-1][0] == "end"
+    service.analyze_task_agent.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_reports_unexpected_errors_as_events(mocker) -> None:
+    service = create_service(mocker)
+    service.analyze_task_agent.side_effect = KeyError("tool")
+    runner = AgentLoopRunner(
+        AgentLoop(goal="goal", run_id="run"),
+        create_crud_factory(mocker.Mock(create_task=mocker.AsyncMock())),
+        lambda **_: service,
+    )
+
+    events = await run(runner)
+
+    assert events[-2] == ("error", {"error": "KeyError", "detail": "Unexpected error"})
+    assert events[-1] == ("end", {"run_id": "run"})
+
+
+@pytest.mark.asyncio
+async def test_closed_stream_does_not_end(mocker) -> None:
+    runner = AgentLoopRunner(
+        AgentLoop(goal="goal", run_id="run"),
+        create_crud_factory(mocker.Mock(create_task=mocker.AsyncMock())),
+        lambda **_: create_service(mocker),
+    )
+    stream = runner.stream()
+
+    assert (await stream.__anext__()).startswith("event: start")
+    assert (await stream.__anext__()).startswith("event: tasks")
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_each_step_has_its_own_session(mocker) -> None:
+    service = create_service(mocker)
+    open_sessions: List[int] = []
+    cruds = []
+
+    @asynccontextmanager
+    async def create_crud():
+        open_sessions.append(1)
+        crud = mocker.Mock(create_task=mocker.AsyncMock())
+        cruds.append(crud)
+        yield crud
+        open_sessions.pop()
+
+    runner = AgentLoopRunner(
+        AgentLoop(goal="goal", run_id="run"), create_crud, lambda **_: service
+    )
+
+    async for event in runner.stream():
+        # No session is held while events are streamed
+        assert open_sessions == []
+
+    steps = [crud for crud in cruds if crud.create_task.called]
+    assert len(steps) == 7
+    assert all(crud.create_task.call_count == 1 for crud in steps)
+
+
+@pytest.mark.asyncio
+async def test_execute_prefetch_uses_its_own_session(mocker) -> None:
+    service = create_service(mocker)
+    create_service_ = mocker.Mock(return_value=service)
+    session = mocker.Mock()
+
+    @asynccontextmanager
+    async def session_factory():
+        yield session
+
+    oauth_crud = mocker.patch.object(views, "OAuthCrud")
+    body = AgentTaskExecute(
+        goal="goal",
+        run_id="run",
+        task="task",
+        analysis=Analysis(action="code", arg="", reasoning=""),
+        next_tasks=["next"],
+    )
+
+    await views.prefetch_analyses(create_service_, session_factory, body)
+
+    oauth_crud.assert_called_once_with(session)
+    create_service_.assert_called_once_with(oauth_crud=oauth_crud.return_value)
+    service.prefetch_analyses.assert_called_once_with(
+        run_id="run", goal="goal", tasks=["next"], tool_names=[]
+    )
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from reworkd_platform.schemas.agent import ModelSettings
+from reworkd_platform.settings import settings
+from reworkd_platform.web.api.agent.agent_service import open_ai_agent_service
+from reworkd_platform.web.api.agent.agent_service.open_ai_agent_service import (
+    OpenAIAgentService,
+)
+from reworkd_platform.web.api.agent.analysis import Analysis
+from reworkd_platform.web.api.errors import OpenAIError
+
+
+def create_service(mocker) -> OpenAIAgentService:
+    return OpenAIAgentService(
+        mocker.Mock(),
+        ModelSettings(),
+        mocker.Mock(),
+        callbacks=None,
+        user=mocker.Mock(),
+        oauth_crud=mocker.Mock(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_analyze_batch_preserves_order_and_reports_errors(mocker) -> None:
+    get_user_tools = mocker.patch.object(
+        open_ai_agent_service, "get_user_tools", return_value=[]
+    )
+    service = create_service(mocker)
+
+    async def analyze(goal: str, task: str, *_) -> Analysis:
+        if task == "bad":
+            raise OpenAIError(Exception(), "Upstream failed")
+        await asyncio.sleep(0.01 if task == "slow" else 0)
+        return Analysis(action="code", arg=task, reasoning="")
+
+    mocker.patch.object(service, "_analyze_task", side_effect=analyze)
+
+    batch = await service.analyze_tasks_agent(
+        goal="goal", tasks=["slow", "bad", "fast"], tool_names=[]
+    )
+
+    get_user_tools.assert_called_once()
+    assert [a.arg if a else None for a in batch.analyses] == ["slow", None, "fast"]
+    assert len(batch.errors) == 1
+    assert batch.errors[0].index == 1
+    assert batch.errors[0].error == "OpenAIError"
+    assert batch.errors[0].detail == "Upstream failed"
+
+
+@pytest.mark.asyncio
+async def test_analyze_batch_concurrency_cap(mocker) -> None:
+    mocker.patch.object(open_ai_agent_service, "get_user_tools", return_value=[])
+    mocker.patch.object(settings, "max_concurrent_analyses", 2)
+    service = create_service(mocker)
+    running = 0
+    peak = 0
+
+    async def analyze(goal: str, task: str, *_) -> Analysis:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return Analysis(action="code", arg=task, reasoning="")
+
+    mocker.patch.object(service, "_analyze_task", side_effect=analyze)
+
+    batch = await service.analyze_tasks_agent(
+        goal="goal", tasks=[str(i) for i in range(6)], tool_names=[]
+    )
+
+    assert len(batch.analyses) == 6
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_analyses_send_their_own_budget(mocker) -> None:
+    mocker.patch.object(open_ai_agent_service, "get_user_tools", return_value=[])
+    service = create_service(mocker)
+    service.model.max_tokens = 500
+    service.token_service.count_prompt = lambda *_, **args: len(args["task"])
+    service.token_service.plan.side_effect = lambda *_, prompt_tokens, **__: (
+        mocker.Mock(llm_kwargs={"max_tokens": 1000 - prompt_tokens})
+    )
+    mocker.patch.object(
+        open_ai_agent_service.function_specs, "assemble", return_value=([], 0)
+    )
+    sent = {}
+
+    async def predict(model, messages, *, llm_kwargs, **_):
+        await asyncio.sleep(0.01 if "slow" in messages[0].content else 0)
+        sent[messages[0].content] = llm_kwargs["max_tokens"]
+        return mocker.Mock(additional_kwargs={})
+
+    mocker.patch.object(
+        open_ai_agent_service, "predict_messages_with_handling", side_effect=predict
+    )
+
+    tasks = ["slow task", "a much longer task"]
+    await service.analyze_tasks_agent(goal="goal", tasks=tasks, tool_names=[])
+
+    for task in tasks:
+        prompt = next(prompt for prompt in sent if task in prompt)
+        assert sent[prompt] == 1000 - len(task)
+    assert service.model.max_tokens == 500
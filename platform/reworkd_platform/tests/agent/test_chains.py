@@ -0,0 +1,44 @@
+from langchain import LLMChain, PromptTemplate
+
+from reworkd_platform.schemas import ModelSettings, UserBase
+from reworkd_platform.settings import Settings
+from reworkd_platform.web.api.agent.chains import ChainTemplate, start_goal_chain
+from reworkd_platform.web.api.agent.model_factory import create_model
+
+
+def create_llm(temperature: float = 0.5):
+    return create_model(
+        Settings(),
+        ModelSettings(temperature=temperature),
+        UserBase(id="user_id", email="test@example.com"),
+    )
+
+
+def test_bind_skips_validation(mocker) -> None:
+    spy = mocker.spy(LLMChain, "__init__")
+    template = ChainTemplate(PromptTemplate.from_template("{goal}"))
+    first_llm, second_llm = create_llm(0.1), create_llm(0.9)
+
+    first = template.bind(first_llm)
+    second = template.bind(second_llm)
+
+    assert spy.call_count == 0
+    assert isinstance(first, LLMChain)
+    assert first is not second
+    assert (first.llm, second.llm) == (first_llm, second_llm)
+    assert first.prompt is second.prompt
+
+
+def test_template_keeps_no_model() -> None:
+    template = ChainTemplate(PromptTemplate.from_template("{goal}"))
+    template.bind(create_llm())
+
+    assert list(vars(template)) == ["prompt"]
+
+
+def test_start_goal_chain_formats_inputs() -> None:
+    chain = start_goal_chain.bind(create_llm())
+
+    messages = chain.prep_prompts([{"goal": "bagels", "language": "English"}])[0]
+
+    assert "bagels" in messages[0].to_string()
@@ -3,8 +3,11 @@ from unittest.mock import AsyncMock
 import pytest
 from fastapi import HTTPException
 from pytest_mock import MockerFixture
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
 
-from reworkd_platform.db.crud.agent import AgentCRUD
+from reworkd_platform.db.crud.agent import AgentCRUD, create_task_statement
+from reworkd_platform.db.models.agent import AgentRun, AgentTask
 from reworkd_platform.settings import settings
 from reworkd_platform.web.api.errors import MaxLoopsError, MultipleSummaryError
 
@@ -50,6 +53,102 @@ async def test_validate_task_count_multiple_summary_error(
         await agent_crud.validate_task_count("test", "summarize")
 
 
+@pytest.mark.asyncio
+async def test_create_task_single_round_trip(mocker: MockerFixture) -> None:
+    session = mocker.AsyncMock()
+    session.execute.return_value = mocker.Mock(rowcount=1)
+    agent_crud = AgentCRUD(session, mocker.MagicMock())
+    validate = mocker.patch.object(agent_crud, "validate_task_count")
+
+    task = await agent_crud.create_task("run", "analyze")
+
+    assert (task.run_id, task.type_) == ("run", "analyze")
+    session.execute.assert_awaited_once()
+    validate.assert_not_called()
+    session.add.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_create_task_rejected_raises(mocker: MockerFixture) -> None:
+    mock_agent_run_exists(mocker, True)
+    session = mock_session_with_run_count(mocker, settings.max_loops)
+    session.execute.return_value.rowcount = 0
+    agent_crud = AgentCRUD(session, mocker.MagicMock())
+
+    with pytest.raises(MaxLoopsError):
+        await agent_crud.create_task("run", "analyze")
+
+
+@pytest.mark.parametrize(
+    "type_, existing, inserted",
+    [
+        ("analyze", 0, True),
+        ("analyze", settings.max_loops - 1, True),
+        ("analyze", settings.max_loops, False),
+        ("summarize", 1, True),
+        ("summarize", 2, False),
+    ],
+)
+def test_create_task_statement_enforces_limits(
+    type_: str, existing: int, inserted: bool
+) -> None:
+    engine = create_engine("sqlite://")
+    AgentRun.metadata.create_all(
+        engine, tables=[AgentRun.__table__, AgentTask.__table__]
+    )
+
+    with Session(engine) as session:
+        session.add(AgentRun(id="run", user_id="user", goal="goal"))
+        session.add_all(
+            AgentTask(id=str(i), run_id="run", type_=type_) for i in range(existing)
+        )
+        session.flush()
+
+        result = session.execute(create_task_statement(["new"], "run", type_))
+        missing_run = session.execute(create_task_statement(["x"], "other", type_))
+
+        assert result.rowcount == int(inserted)
+        assert missing_run.rowcount == 0
+        count = select(func.count()).select_from(AgentTask)
+        assert session.execute(count).scalar_one() == existing + int(inserted)
+
+
+@pytest.mark.parametrize("existing, inserted", [(0, 3), (settings.max_loops - 2, 0)])
+def test_create_task_statement_inserts_all_or_nothing(
+    existing: int, inserted: int
+) -> None:
+    engine = create_engine("sqlite://")
+    AgentRun.metadata.create_all(
+        engine, tables=[AgentRun.__table__, AgentTask.__table__]
+    )
+
+    with Session(engine) as session:
+        session.add(AgentRun(id="run", user_id="user", goal="goal"))
+        session.add_all(
+            AgentTask(id=str(i), run_id="run", type_="analyze")
+            for i in range(existing)
+        )
+        session.flush()
+
+        statement = create_task_statement(["a", "b", "c"], "run", "analyze")
+
+        assert session.execute(statement).rowcount == inserted
+        count = select(func.count()).select_from(AgentTask)
+        assert session.execute(count).scalar_one() == existing + inserted
+
+
+@pytest.mark.asyncio
+async def test_create_tasks_over_budget_raises(mocker: MockerFixture) -> None:
+    mock_agent_run_exists(mocker, True)
+    session = mock_session_with_run_count(mocker, settings.max_loops - 2)
+    session.execute.return_value.rowcount = 0
+    agent_crud = AgentCRUD(session, mocker.MagicMock())
+
+    with pytest.raises(MaxLoopsError):
+        await agent_crud.create_tasks("run", "analyze", 3)
+    session.add_all.assert_not_called()
+
+
 def mock_agent_run_exists(mocker: MockerFixture, exists: bool) -> None:
     mocker.patch("reworkd_platform.db.models.agent.AgentRun.get", return_value=exists)
 
@@ -1,11 +1,15 @@
 import itertools
 
+import openai
 import pytest
 from langchain.chat_models import AzureChatOpenAI, ChatOpenAI
+from langchain.schema import HumanMessage
+from tenacity import wait_none
 
 from reworkd_platform.schemas import ModelSettings, UserBase
 from reworkd_platform.settings import Settings
 from reworkd_platform.web.api.agent.model_factory import (
+    ModelPool,
     WrappedAzureChatOpenAI,
     WrappedChatOpenAI,
     create_model,
@@ -136,3 +140,80 @@ def test_custom_model_settings(model_settings: ModelSettings, streaming: bool):
     assert model.model_name.startswith(model_settings.model)
     assert model.max_tokens == model_settings.max_tokens
     assert model.streaming == streaming
+
+
+@pytest.mark.parametrize("custom_api_key", [None, "custom_key"])
+def test_rate_limiter_only_for_platform_key(mocker, custom_api_key):
+    rate_limiter = mocker.Mock()
+    model = create_model(
+        Settings(),
+        ModelSettings(custom_api_key=custom_api_key),
+        UserBase(id="user_id", email="test@example.com"),
+        rate_limiter=rate_limiter,
+    )
+
+    assert model.rate_limit_key == "user_id"
+    assert model.rate_limiter is (None if custom_api_key else rate_limiter)
+
+
+RESPONSE = {"choices": [{"message": {"role": "assistant", "content": "Hi"}}]}
+
+
+@pytest.mark.asyncio
+async def test_completions_are_budgeted(mocker):
+    rate_limiter = mocker.Mock(acquire=mocker.AsyncMock(), estimate=lambda *_: 42)
+    mocker.patch.object(openai.ChatCompletion, "acreate", return_value=RESPONSE)
+    model = create_model(
+        Settings(),
+        ModelSettings(),
+        UserBase(id="user_id", email="test@example.com"),
+        rate_limiter=rate_limiter,
+    )
+
+    await model._agenerate([HumanMessage(content="Hello")])
+
+    rate_limiter.acquire.assert_awaited_once_with("user_id", 42)
+    assert model.client is openai.ChatCompletion
+
+
+@pytest.mark.asyncio
+async def test_retries_are_budgeted(mocker):
+    rate_limiter = mocker.Mock(acquire=mocker.AsyncMock(), estimate=lambda *_: 42)
+    mocker.patch("langchain.llms.base.wait_exponential", return_value=wait_none())
+    acreate = mocker.patch.object(
+        openai.ChatCompletion,
+        "acreate",
+        side_effect=[
+            openai.error.RateLimitError("Slow down"),
+            RESPONSE,
+        ],
+    )
+    model = create_model(
+        Settings(),
+        ModelSettings(),
+        UserBase(id="user_id", email="test@example.com"),
+        rate_limiter=rate_limiter,
+    )
+
+    result = await model._agenerate([HumanMessage(content="Hello")])
+
+    assert result.generations[0].text == "Hi"
+    assert acreate.await_count == 2
+    assert rate_limiter.acquire.await_count == 2
+
+
+def test_models_are_pooled_per_client():
+    pool = ModelPool(max_size=2)
+    user = UserBase(id="user_id", email="test@example.com")
+
+    first = create_model(Settings(), ModelSettings(temperature=0.1), user, pool=pool)
+    second = create_model(Settings(), ModelSettings(temperature=0.5), user, pool=pool)
+    create_model(Settings(), ModelSettings(), user, streaming=True, pool=pool)
+    create_model(Settings(), ModelSettings(), user, force_model="gpt-4", pool=pool)
+
+    # Requests get their own copy of the pooled model
+    assert first is not second
+    assert (first.temperature, second.temperature) == (0.1, 0.5)
+    first.max_tokens = 1
+    assert second.max_tokens == ModelSettings().max_tokens
+    assert len(pool._models) == 2
@@ -0,0 +1,43 @@
+import json
+
+from reworkd_platform.web.api.agent.tools import open_ai_function
+from reworkd_platform.web.api.agent.tools.code import Code
+from reworkd_platform.web.api.agent.tools.open_ai_function import (
+    FunctionSpecRegistry,
+    get_tool_function,
+)
+from reworkd_platform.web.api.agent.tools.search import Search
+
+
+def create_token_service(mocker, encoding: str = "test"):
+    token_service = mocker.Mock()
+    token_service.encoding.name = encoding
+    token_service.count.side_effect = len
+    return token_service
+
+
+def test_spec_is_built_once_per_encoding(mocker) -> None:
+    spy = mocker.spy(open_ai_function, "get_tool_function")
+    registry = FunctionSpecRegistry()
+    token_service = create_token_service(mocker)
+
+    spec = registry.get(Search, token_service)
+
+    assert registry.get(Search, token_service) is spec
+    assert spec.function == get_tool_function(Search)
+    assert spec.json == json.dumps(spec.function)
+    assert spec.tokens == len(spec.json)
+    assert registry.get(Search, create_token_service(mocker, "other")) is not spec
+    assert spy.call_count == 2
+
+
+def test_assemble_sums_spec_costs(mocker) -> None:
+    registry = FunctionSpecRegistry()
+    token_service = create_token_service(mocker)
+
+    functions, tokens = registry.assemble([Search, Code], token_service)
+
+    assert [f["name"] for f in functions] == ["search", "code"]
+    specs = [registry.get(tool, token_service) for tool in (Search, Code)]
+    assert tokens == sum(spec.tokens for spec in specs) + 3
+    assert registry.assemble([], token_service) == ([], 0)
@@ -0,0 +1,205 @@
+import asyncio
+
+import pytest
+
+from reworkd_platform.schemas.agent import ModelSettings
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.services.tokenizer.token_service import TokenService
+from reworkd_platform.settings import settings
+from reworkd_platform.web.api.agent.agent_service import open_ai_agent_service
+from reworkd_platform.web.api.agent.agent_service.open_ai_agent_service import (
+    OpenAIAgentService,
+)
+from reworkd_platform.web.api.agent.analysis import Analysis
+from reworkd_platform.web.api.agent.speculation import (
+    SpeculativeAnalyses,
+    speculation_key,
+    speculative_analyses,
+)
+
+
+def analysis(arg: str) -> Analysis:
+    return Analysis(action="code", arg=arg, reasoning="")
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    metrics.reset()
+    speculative_analyses.clear()
+    yield
+    speculative_analyses.clear()
+
+
+def test_speculation_key_ignores_tool_order() -> None:
+    assert speculation_key("a", tool_names=["x", "y"]) == speculation_key(
+        "a", tool_names=["y", "x"]
+    )
+    assert speculation_key("a") != speculation_key("b")
+
+
+@pytest.mark.asyncio
+async def test_pop_returns_scheduled_analysis() -> None:
+    cache = SpeculativeAnalyses(ttl=60, max_per_run=5, max_in_flight=5)
+
+    async def analyze() -> Analysis:
+        return analysis("result")
+
+    assert cache.schedule("key", "run", analyze)
+    assert not cache.schedule("key", "run", analyze)
+
+    assert await cache.pop("key") == analysis("result")
+    assert await cache.pop("key") is None
+    assert metrics.counter("speculation.hit") == 1
+    assert metrics.counter("speculation.miss") == 1
+
+
+@pytest.mark.asyncio
+async def test_spend_is_capped_per_run() -> None:
+    cache = SpeculativeAnalyses(ttl=60, max_per_run=2, max_in_flight=10)
+
+    async def analyze() -> Analysis:
+        return analysis("")
+
+    assert cache.schedule("a", "run", analyze)
+    assert cache.schedule("b", "run", analyze)
+    assert not cache.schedule("c", "run", analyze)
+    assert cache.schedule("c", "other run", analyze)
+    assert metrics.counter("speculation.skipped") == 1
+
+
+@pytest.mark.asyncio
+async def test_unused_and_failed_speculation_is_wasted() -> None:
+    cache = SpeculativeAnalyses(ttl=0, max_per_run=5, max_in_flight=5)
+
+    async def slow() -> Analysis:
+        await asyncio.sleep(10)
+        return analysis("")
+
+    async def failing() -> Analysis:
+        raise ValueError("boom")
+
+    cache.schedule("slow", "run", slow)
+    await asyncio.sleep(0.01)
+    assert await cache.pop("slow") is None
+
+    cache.ttl = 60
+    cache.schedule("failing", "run", failing)
+    assert await cache.pop("failing") is None
+    assert metrics.counter("speculation.wasted") == 2
+
+
+@pytest.mark.asyncio
+async def test_prefetched_analysis_is_served(mocker) -> None:
+    mocker.patch.object(settings, "speculative_analysis_enabled", True)
+    get_user_tools = mocker.patch.object(
+        open_ai_agent_service, "get_user_tools", return_value=[]
+    )
+    service = OpenAIAgentService(
+        mocker.Mock(),
+        ModelSettings(),
+        mocker.Mock(),
+        callbacks=None,
+        user=mocker.Mock(id="user"),
+        oauth_crud=mocker.Mock(),
+    )
+    analyze = mocker.patch.object(
+        service, "_analyze_task", return_value=analysis("prefetched")
+    )
+
+    await service.prefetch_analyses(
+        run_id="run", goal="goal", tasks=["next", "later"], tool_names=["search"]
+    )
+    result = await service.analyze_task_agent(
+        goal="goal", task="next", tool_names=["search"]
+    )
+
+    assert result == analysis("prefetched")
+    analyze.assert_called_once_with("goal", "next", [])
+    get_user_tools.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_prefetch_is_opt_in(mocker) -> None:
+    get_user_tools = mocker.patch.object(open_ai_agent_service, "get_user_tools")
+    service = OpenAIAgentService(
+        mocker.Mock(),
+        ModelSettings(),
+        mocker.Mock(),
+        callbacks=None,
+        user=mocker.Mock(id="user"),
+        oauth_crud=mocker.Mock(),
+    )
+
+    await service.prefetch_analyses(
+        run_id="run", goal="goal", tasks=["next"], tool_names=[]
+    )
+
+    get_user_tools.assert_not_called()
+    assert metrics.counter("speculation.started") == 0
+
+
+@pytest.mark.asyncio
+async def test_spend_cap_resets_for_a_new_run_of_the_same_goal(mocker) -> None:
+    mocker.patch.object(settings, "speculative_analysis_enabled", True)
+    mocker.patch.object(speculative_analyses, "max_per_run", 1)
+    mocker.patch.object(open_ai_agent_service, "get_user_tools", return_value=[])
+    service = OpenAIAgentService(
+        mocker.Mock(),
+        ModelSettings(),
+        mocker.Mock(),
+        callbacks=None,
+        user=mocker.Mock(id="user"),
+        oauth_crud=mocker.Mock(),
+    )
+    mocker.patch.object(service, "_analyze_task", return_value=analysis(""))
+
+    for i, run_id in enumerate(["first run", "first run", "second run"]):
+        await service.prefetch_analyses(
+            run_id=run_id, goal="goal", tasks=[f"task {i}"], tool_names=[]
+        )
+
+    assert metrics.counter("speculation.started") == 2
+    assert metrics.counter("speculation.skipped") == 1
+
+
+class WordEncoding:
+    def encode(self, text: str, **_) -> list:
+        return text.split()
+
+    def encode_batch(self, texts: list, **_) -> list:
+        return [text.split() for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_speculation_leaves_the_next_budget_alone(mocker) -> None:
+    mocker.patch.object(settings, "speculative_analysis_enabled", True)
+    mocker.patch.object(open_ai_agent_service, "get_user_tools", return_value=[])
+    mocker.patch.object(
+        open_ai_agent_service.function_specs, "assemble", return_value=([], 0)
+    )
+    predict = mocker.patch.object(
+        open_ai_agent_service,
+        "predict_messages_with_handling",
+        return_value=mocker.Mock(additional_kwargs={}),
+    )
+    model = mocker.Mock(model_name="gpt-3.5-turbo", max_tokens=500)
+    service = OpenAIAgentService(
+        model,
+        ModelSettings(),
+        TokenService(WordEncoding()),
+        callbacks=None,
+        user=mocker.Mock(id="user"),
+        oauth_crud=mocker.Mock(),
+    )
+
+    # Leaves fewer than max_tokens of the context for its completion
+    await service.prefetch_analyses(
+        run_id="run", goal="goal", tasks=["word " * 3900], tool_names=[]
+    )
+    await asyncio.sleep(0)
+    await service.analyze_task_agent(goal="goal", task="short", tool_names=[])
+
+    speculated, analyzed = predict.call_args_list
+    assert speculated.kwargs["llm_kwargs"]["max_tokens"] < 500
+    assert analyzed.kwargs["llm_kwargs"]["max_tokens"] == 500
+    assert model.max_tokens == 500
@@ -1,8 +1,16 @@
+import asyncio
 from typing import List, Type
 
+import pytest
+
 from reworkd_platform.web.api.agent.tools.conclude import Conclude
 from reworkd_platform.web.api.agent.tools.image import Image
+from reworkd_platform.schemas import UserBase
+from reworkd_platform.web.api.agent.tools import registry, tools
+from reworkd_platform.web.api.agent.tools.availability import AvailabilityCache
+from reworkd_platform.web.api.agent.tools.code import Code
 from reworkd_platform.web.api.agent.tools.reason import Reason
+from reworkd_platform.web.api.agent.tools.registry import ToolRegistry
 from reworkd_platform.web.api.agent.tools.search import Search
 from reworkd_platform.web.api.agent.tools.sidsearch import SID
 from reworkd_platform.web.api.agent.tools.tools import (
@@ -12,6 +20,7 @@ from reworkd_platform.web.api.agent.tools.tools import (
     get_tool_from_name,
     get_tool_name,
     get_tools_overview,
+    get_user_tools,
 )
 
 
@@ -54,3 +63,98 @@ def test_get_tool_from_name() -> None:
     assert get_tool_from_name("CoNcLuDe") == Conclude
     assert get_tool_from_name("NonExistingTool") == Search
     assert get_tool_from_name("SID") == SID
+
+
+def create_registry() -> ToolRegistry:
+    tool_registry = ToolRegistry()
+    tool_registry.register(Image)
+    tool_registry.register(SID)
+    tool_registry.register(Search, default=True, fallback=True)
+    return tool_registry
+
+
+def test_registry_lookup() -> None:
+    tool_registry = create_registry()
+
+    assert tool_registry.get("image") is Image
+    assert tool_registry.get("SiD") is SID
+    assert tool_registry.get("unknown") is Search
+    assert tool_registry.is_valid("sid")
+    assert not tool_registry.is_valid("SID")
+    assert tool_registry.external == [Image, SID]
+    assert tool_registry.defaults == [Search]
+    with pytest.raises(ValueError):
+        tool_registry.register(Image)
+
+
+def test_registry_caches_public_tools(mocker) -> None:
+    tool_registry = create_registry()
+    available = mocker.patch.object(SID, "available", return_value=False)
+
+    public = tool_registry.public_tools()
+
+    assert [tool["name"] for tool in public] == ["image"]
+    assert tool_registry.public_tools() is public
+    available.assert_called_once()
+
+    tool_registry.register(Code)
+    assert [tool["name"] for tool in tool_registry.public_tools()] == [
+        "image",
+        "code",
+    ]
+
+
+def test_registry_loads_entry_points(mocker) -> None:
+    tool_registry = create_registry()
+    broken = mocker.Mock()
+    broken.load.side_effect = ImportError("missing")
+    entry_points = mocker.patch.object(
+        registry,
+        "entry_points",
+        return_value=[mocker.Mock(load=lambda: Reason), broken],
+    )
+
+    tool_registry.load_entry_points()
+
+    entry_points.assert_called_once_with(group=registry.ENTRY_POINT_GROUP)
+    assert tool_registry.get("reason") is Reason
+
+
+@pytest.mark.asyncio
+async def test_get_user_tools_checks_availability_concurrently(mocker) -> None:
+    mocker.patch.object(tools, "availability_cache", AvailabilityCache(ttl=60))
+    running = 0
+    peak = 0
+
+    async def dynamic_available(*_) -> bool:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return True
+
+    sid = mocker.patch.object(SID, "dynamic_available", side_effect=dynamic_available)
+    search = mocker.patch.object(
+        Search, "dynamic_available", side_effect=dynamic_available
+    )
+    user = UserBase(id="user", email="user@example.com")
+
+    assert await get_user_tools(["sid"], user, mocker.Mock()) == [SID, Search]
+    assert peak == 2
+
+    assert await get_user_tools(["sid"], user, mocker.Mock()) == [SID, Search]
+    assert (sid.call_count, search.call_count) == (1, 1)
+
+
+def test_availability_cache_invalidation() -> None:
+    cache = AvailabilityCache(ttl=60)
+    cache.set("user", "sid", True)
+    assert cache.get("user", "sid") is True
+
+    cache.invalidate("user")
+    assert cache.get("user", "sid") is None
+
+    disabled = AvailabilityCache(ttl=0)
+    disabled.set("user", "sid", True)
+    assert disabled.get("user", "sid") is None
@@ -0,0 +1,135 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from reworkd_platform.services.local_memory import local_memory, store
+from reworkd_platform.services.local_memory.local_memory import LocalMemory
+from reworkd_platform.services.local_memory.store import VectorStore
+from reworkd_platform.web.api.memory.memory_with_fallback import MemoryWithFallback
+
+DIM = 16
+
+
+def random_vectors(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, DIM))
+
+
+def embed(text: str) -> list:
+    return list(random_vectors(1, seed=len(text))[0])
+
+
+def fill(vector_store: VectorStore, vectors: np.ndarray) -> None:
+    ids = [str(i) for i in range(len(vectors))]
+    vector_store.add(ids, [f"task {i}" for i in ids], vectors)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_search_matches_brute_force(dtype) -> None:
+    vectors = random_vectors(500)
+    vector_store = VectorStore(DIM, dtype)
+    fill(vector_store, vectors)
+    query = vectors[42] + random_vectors(1, seed=1)[0] * 0.1
+
+    matches = vector_store.search(query, top_k=5)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+    assert matches[0][0] == "42"
+    assert matches[0][2] == "task 42"
+    assert [score for _, score, _ in matches] == sorted(
+        [score for _, score, _ in matches], reverse=True
+    )
+    if dtype == "float32":
+        assert [int(id_) for id_, _, _ in matches] == list(expected)
+
+
+def test_search_threshold_and_reset() -> None:
+    vector_store = VectorStore(DIM)
+    fill(vector_store, random_vectors(3))
+
+    assert vector_store.search(random_vectors(3)[0], top_k=10, score_threshold=0.99)
+    assert len(vector_store.search(random_vectors(3)[0], top_k=10)) == 3
+
+    vector_store.reset()
+    assert vector_store.search(random_vectors(3)[0], top_k=10) == []
+
+
+@pytest.mark.parametrize("on_disk", [False, True])
+def test_reset_during_search_keeps_its_rows(
+    mocker, tmp_path: Path, on_disk
+) -> None:
+    vectors = random_vectors(3)
+    vector_store = VectorStore(DIM, path=tmp_path if on_disk else None)
+    fill(vector_store, vectors)
+    scores = vector_store._scores
+
+    def reset_and_score(*args) -> np.ndarray:
+        vector_store.reset()
+        vector_store.add(["new"], ["new task"], -vectors[:1])
+        return scores(*args)
+
+    mocker.patch.object(vector_store, "_scores", side_effect=reset_and_score)
+
+    (id_, score, _), *_ = vector_store.search(vectors[0], top_k=1)
+
+    assert (id_, round(score, 4)) == ("0", 1.0)
+    assert len(vector_store) == 1
+
+
+def test_memory_mapped_store_survives_reopen(mocker, tmp_path: Path) -> None:
+    mocker.patch.object(store, "INITIAL_CAPACITY", 4)
+    vectors = random_vectors(10)
+    fill(VectorStore(DIM, "int8", tmp_path), vectors)
+
+    reopened = VectorStore(DIM, "int8", tmp_path)
+
+    assert len(reopened) == 10
+    assert reopened.search(vectors[7], top_k=1)[0][0] == "7"
+    with pytest.raises(ValueError):
+        VectorStore(DIM, "float32", tmp_path)
+
+
+@pytest.mark.asyncio
+async def test_local_memory_as_fallback(mocker) -> None:
+    mocker.patch.object(local_memory, "_stores", {})
+    embeddings = mocker.Mock()
+    embeddings.aembed_documents = mocker.AsyncMock(
+        side_effect=lambda tasks: [embed(task) for task in tasks]
+    )
+    embeddings.aembed_query = mocker.AsyncMock(side_effect=embed)
+    primary = mocker.AsyncMock()
+    primary.aadd_tasks.side_effect = Exception("Primary Failed")
+    primary.aget_similar_tasks.side_effect = Exception("Primary Failed")
+    memory = MemoryWithFallback(
+        primary, LocalMemory("index", embeddings=embeddings, dim=DIM)
+    )
+
+    async with memory:
+        ids = await memory.aadd_tasks(["task", "a longer task"])
+        results = await memory.aget_similar_tasks("a longer task")
+
+    assert [result.id for result in results] == [ids[1]]
+    assert results[0].metadata == {"text": "a longer task"}
+
+
+def test_workers_sharing_a_path_claim_their_own_directory(
+    mocker, tmp_path: Path
+) -> None:
+    mocker.patch.object(local_memory, "_worker_dirs", {})
+    first = local_memory.claim_worker_dir(tmp_path)
+    assert local_memory.claim_worker_dir(tmp_path) == first
+
+    # Another worker: the lock file of the first slot is held
+    mocker.patch.object(local_memory, "_worker_dirs", {})
+    second = local_memory.claim_worker_dir(tmp_path)
+
+    assert (first, second) == (tmp_path / "worker-0", tmp_path / "worker-1")
+
+
+def test_dimension_mismatch_reports_stored_dimension(mocker) -> None:
+    mocker.patch.object(local_memory, "_stores", {})
+    local_memory.get_store("namespace", DIM, "float32", None)
+
+    with pytest.raises(ValueError, match=f"dimension {DIM}$"):
+        local_memory.get_store("namespace", DIM * 2, "float32", None)
@@ -1,6 +1,7 @@
 import pytest
 
 from reworkd_platform.web.api.memory.memory_with_fallback import MemoryWithFallback
+from reworkd_platform.web.api.memory.null import NullAgentMemory
 
 
 @pytest.mark.parametrize(
@@ -41,3 +42,33 @@ def test_memory_fallback(mocker, method_name: str, args) -> None:
     getattr(memory_with_fallback, method_name)(*args)
     getattr(primary, method_name).assert_called_once_with(*args)
     getattr(secondary, method_name).assert_called_once_with(*args)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "method_name, args",
+    [
+        ("aadd_tasks", (["task1", "task2"],)),
+        ("aget_similar_tasks", ("task1",)),
+        ("areset_class", ()),
+    ],
+)
+async def test_async_memory_fallback(mocker, method_name: str, args) -> None:
+    primary = mocker.AsyncMock()
+    secondary = mocker.AsyncMock()
+    memory_with_fallback = MemoryWithFallback(primary, secondary)
+
+    getattr(primary, method_name).side_effect = Exception("Primary Failed")
+
+    await getattr(memory_with_fallback, method_name)(*args)
+    getattr(primary, method_name).assert_awaited_once_with(*args)
+    getattr(secondary, method_name).assert_awaited_once_with(*args)
+
+
+@pytest.mark.asyncio
+async def test_async_context_management(mocker) -> None:
+    memory_with_fallback = MemoryWithFallback(NullAgentMemory(), NullAgentMemory())
+
+    async with memory_with_fallback as memory:
+        assert await memory.aadd_tasks(["task"]) == []
+        assert await memory.aget_similar_tasks("task") == []
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from typing import Any, Awaitable
+
+import pytest
+
+from reworkd_platform.services.pinecone import pinecone
+from reworkd_platform.services.pinecone.pinecone import PineconeMemory
+
+BLOCKING_SECONDS = 0.2
+TICK = 0.005
+
+
+async def max_loop_lag(call: Awaitable[Any]) -> float:
+    """Largest delay of a periodic tick on the event loop while call runs"""
+    lag = 0.0
+    done = False
+
+    async def monitor() -> None:
+        nonlocal lag
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lag = max(lag, time.perf_counter() - start - TICK)
+
+    task = asyncio.create_task(monitor())
+    await asyncio.sleep(0)
+    try:
+        await call
+    finally:
+        done = True
+        await task
+    return lag
+
+
+@pytest.fixture
+def memory(mocker) -> PineconeMemory:
+    mocker.patch.object(pinecone, "Index")
+    memory = PineconeMemory("index")
+    memory.embeddings = mocker.Mock()
+    memory.embeddings.aembed_query = mocker.AsyncMock(return_value=[0.1])
+    memory.embeddings.aembed_documents = mocker.AsyncMock(
+        side_effect=lambda tasks: [[0.1]] * len(tasks)
+    )
+
+    def blocking(*_: Any, **__: Any) -> Any:
+        time.sleep(BLOCKING_SECONDS)
+        return mocker.Mock(matches=[mocker.Mock(id="id", score=1.0, metadata={})])
+
+    memory.index.query.side_effect = blocking
+    memory.index.upsert.side_effect = blocking
+    memory.index.delete.side_effect = blocking
+    return memory
+
+
+@pytest.mark.asyncio
+async def test_async_calls_do_not_block_event_loop(memory) -> None:
+    lag = await max_loop_lag(
+        asyncio.gather(
+            memory.aget_similar_tasks("task"),
+            memory.aadd_tasks(["task1", "task2"]),
+            memory.areset_class(),
+        )
+    )
+
+    assert lag < BLOCKING_SECONDS / 2
+    memory.index.upsert.assert_called_once()
+    assert memory.index.upsert.call_args.kwargs["namespace"] == "index"
+
+
+@pytest.mark.asyncio
+async def test_sync_calls_block_event_loop(memory) -> None:
+    async def query() -> None:
+        memory.get_similar_tasks("task")
+
+    assert await max_loop_lag(query()) >= BLOCKING_SECONDS / 2
+
+
+@pytest.mark.asyncio
+async def test_async_query_filters_by_score(memory) -> None:
+    assert [r.id for r in await memory.aget_similar_tasks("task", 0.5)] == ["id"]
+    assert await memory.aget_similar_tasks("task", 1.0) == []
+
+
+@pytest.mark.asyncio
+async def test_async_add_upserts_idempotent_batches(memory, mocker) -> None:
+    mocker.patch.object(pinecone.settings, "pinecone_upsert_batch_size", 2)
+    mocker.patch.object(pinecone.settings, "pinecone_upsert_concurrency", 2)
+    in_flight = peak = 0
+
+    async def embed(tasks):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return [[0.1]] * len(tasks)
+
+    memory.embeddings.aembed_documents.side_effect = embed
+    memory.index.upsert.side_effect = None
+    tasks = ["a", "b", "c", "a", "d", "e"]
+
+    ids = await memory.aadd_tasks(tasks)
+
+    assert ids == await memory.aadd_tasks(tasks)
+    assert ids[0] == ids[3] == pinecone.task_id("a")
+    assert len(set(ids)) == 5
+    assert peak == 2
+    batches = [c.kwargs["vectors"] for c in memory.index.upsert.call_args_list]
+    assert [len(batch) for batch in batches] == [2, 2, 1] * 2
+    assert batches[0][0] == {"id": ids[0], "values": [0.1], "metadata": {"text": "a"}}
+
+
+def test_sync_add_upserts_batches(memory, mocker) -> None:
+    mocker.patch.object(pinecone.settings, "pinecone_upsert_batch_size", 2)
+    memory.embeddings.embed_documents = mocker.Mock(
+        side_effect=lambda tasks: [[0.1]] * len(tasks)
+    )
+    memory.index.upsert.side_effect = None
+
+    ids = memory.add_tasks(["a", "b", "c"])
+
+    assert ids == [pinecone.task_id(task) for task in ["a", "b", "c"]]
+    upserts = memory.index.upsert.call_args_list
+    texts = [row["metadata"]["text"] for c in upserts for row in c.kwargs["vectors"]]
+    assert len(upserts) == 2
+    assert sorted(texts) == ["a", "b", "c"]
+    assert memory.add_tasks([]) == []
+
+
+def test_sync_adds_share_one_upsert_pool() -> None:
+    executor = pinecone.get_upsert_executor()
+
+    assert pinecone.get_upsert_executor() is executor
+    assert executor._max_workers == pinecone.settings.pinecone_upsert_concurrency
@@ -0,0 +1,231 @@
+from pathlib import Path
+
+import pytest
+from langchain.prompts import PromptTemplate
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+
+from reworkd_platform.schemas.agent import ModelSettings
+from reworkd_platform.services.completion_cache.cache import (
+    CompletionCache,
+    MemoryCacheTier,
+    SqliteCacheTier,
+    create_tiers,
+)
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.settings import settings
+from reworkd_platform.web.api.agent.chains import ChainTemplate
+from reworkd_platform.web.api.agent.helpers import (
+    call_model_with_handling,
+    predict_messages_with_handling,
+)
+
+
+def create_key(**kwargs) -> str:
+    params = {
+        "model_name": "gpt-3.5-turbo",
+        "temperature": 0.0,
+        "max_tokens": 500,
+        "messages": [SystemMessage(content="Hello")],
+    }
+    return CompletionCache.create_key(**{**params, **kwargs})
+
+
+def test_key_is_deterministic() -> None:
+    assert create_key() == create_key()
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"model_name": "gpt-4"},
+        {"temperature": 0.5},
+        {"max_tokens": 100},
+        {"messages": [HumanMessage(content="Hello")]},
+        {"functions": [{"name": "search"}]},
+    ],
+)
+def test_key_changes_with_inputs(kwargs) -> None:
+    assert create_key() != create_key(**kwargs)
+
+
+def test_memory_tier_lru_eviction() -> None:
+    tier = MemoryCacheTier(max_entries=2, ttl=60)
+    tier.set("a", 1)
+    tier.set("b", 2)
+    tier.get("a")
+    tier.set("c", 3)
+
+    assert tier.get("a") == 1
+    assert tier.get("b") is None
+    assert tier.get("c") == 3
+
+
+def test_memory_tier_ttl() -> None:
+    tier = MemoryCacheTier(max_entries=2, ttl=-1)
+    tier.set("a", 1)
+
+    assert tier.get("a") is None
+    assert len(tier) == 0
+
+
+def test_sqlite_tier(tmp_path: Path) -> None:
+    tier = SqliteCacheTier(tmp_path / "cache.db", max_entries=2, ttl=60)
+    tier.set("a", {"content": "x"})
+    tier.set("b", "y")
+    tier.set("c", "z")
+
+    assert tier.get("a") is None
+    assert tier.get("b") == "y"
+    assert tier.get("c") == "z"
+    tier.close()
+
+    reopened = SqliteCacheTier(tmp_path / "cache.db", max_entries=2, ttl=60)
+    assert reopened.get("b") == "y"
+    reopened.close()
+
+
+@pytest.mark.parametrize("on_disk", [False, True])
+def test_create_tiers(tmp_path: Path, on_disk: bool) -> None:
+    tiers = create_tiers(
+        "search_cache",
+        max_entries=2,
+        ttl=60,
+        disk_path=tmp_path / "cache.db" if on_disk else None,
+        disk_max_entries=10,
+    )
+
+    expected = [MemoryCacheTier, SqliteCacheTier] if on_disk else [MemoryCacheTier]
+    assert [type(tier) for tier in tiers] == expected
+    assert {tier.namespace for tier in tiers} == {"search_cache"}  # type: ignore
+    for tier in tiers:
+        tier.close()
+
+
+def test_sqlite_tier_evicts_least_recently_read(tmp_path: Path) -> None:
+    tier = SqliteCacheTier(tmp_path / "cache.db", max_entries=10, ttl=60)
+    for i in range(10):
+        tier.set(str(i), i)
+    assert tier.get("0") == 0
+
+    # Eviction waits for the soft cap, then trims back to max_entries
+    tier.set("10", 10)
+    assert tier.get("1") == 1
+    tier.set("11", 11)
+
+    assert tier.get("0") == 0
+    assert tier.get("1") == 1
+    assert tier.get("2") is None
+    assert tier.get("3") is None
+    assert tier.get("4") == 4
+    tier.close()
+
+
+def test_hit_backfills_faster_tiers(tmp_path: Path) -> None:
+    memory = MemoryCacheTier(max_entries=2, ttl=60)
+    disk = SqliteCacheTier(tmp_path / "cache.db", max_entries=2, ttl=60)
+    disk.set("a", "value")
+    cache = CompletionCache([memory, disk])
+
+    assert cache.get("a") == "value"
+    assert memory.get("a") == "value"
+    disk.close()
+
+
+def test_default_runs_are_not_cached() -> None:
+    cache = CompletionCache(
+        [], max_temperature=settings.completion_cache_max_temperature
+    )
+
+    assert not cache.should_cache(ModelSettings().temperature)
+
+
+def test_should_cache() -> None:
+    cache = CompletionCache([], max_temperature=0.5)
+
+    assert cache.should_cache(0.2)
+    assert not cache.should_cache(0.9)
+    assert not cache.should_cache(0.2, enabled=False)
+
+
+@pytest.mark.asyncio
+async def test_call_model_with_handling_skips_upstream_on_hit(mocker) -> None:
+    metrics.reset()
+    cache = CompletionCache([MemoryCacheTier(max_entries=10, ttl=60)])
+    model = mocker.Mock(model_name="gpt-3.5-turbo", temperature=0.0, max_tokens=10)
+    chain = mocker.Mock()
+    chain.arun = mocker.AsyncMock(return_value="completion")
+    mocker.patch.object(ChainTemplate, "bind", return_value=chain)
+    prompt = ChainTemplate(
+        PromptTemplate(template="{goal}", input_variables=["goal"])
+    )
+
+    for _ in range(3):
+        completion = await call_model_with_handling(
+            model, prompt, {"goal": "x"}, settings=ModelSettings(), cache=cache
+        )
+        assert completion == "completion"
+
+    chain.arun.assert_called_once()
+    assert metrics.counter("completion_cache.hit") == 2
+    assert metrics.counter("completion_cache.miss") == 1
+
+
+@pytest.mark.asyncio
+async def test_predict_messages_opt_out(mocker) -> None:
+    cache = CompletionCache([MemoryCacheTier(max_entries=10, ttl=60)])
+    model = mocker.Mock(model_name="gpt-3.5-turbo", temperature=0.0, max_tokens=10)
+    model.apredict_messages = mocker.AsyncMock(
+        return_value=AIMessage(content="", additional_kwargs={"function_call": {}})
+    )
+    settings = ModelSettings(use_cache=False)
+
+    for _ in range(2):
+        await predict_messages_with_handling(
+            model, [SystemMessage(content="x")], settings=settings, cache=cache
+        )
+
+    assert model.apredict_messages.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_predict_messages_cached_message(mocker) -> None:
+    cache = CompletionCache([MemoryCacheTier(max_entries=10, ttl=60)])
+    model = mocker.Mock(model_name="gpt-3.5-turbo", temperature=0.0, max_tokens=10)
+    function_call = {"name": "search", "arguments": "{}"}
+    model.apredict_messages = mocker.AsyncMock(
+        return_value=AIMessage(
+            content="", additional_kwargs={"function_call": function_call}
+        )
+    )
+
+    for _ in range(2):
+        message = await predict_messages_with_handling(
+            model,
+            [SystemMessage(content="x")],
+            settings=ModelSettings(),
+            functions=[{"name": "search"}],
+            cache=cache,
+        )
+        assert message.additional_kwargs["function_call"] == function_call
+
+    model.apredict_messages.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_predict_messages_call_parameters(mocker) -> None:
+    cache = CompletionCache([MemoryCacheTier(max_entries=10, ttl=60)])
+    model = mocker.Mock(model_name="gpt-3.5-turbo", temperature=0.0, max_tokens=10)
+    model.apredict_messages = mocker.AsyncMock(return_value=AIMessage(content=""))
+
+    for max_tokens in [100, 200, 100]:
+        await predict_messages_with_handling(
+            model,
+            [SystemMessage(content="x")],
+            settings=ModelSettings(),
+            cache=cache,
+            llm_kwargs={"model": "gpt-3.5-turbo", "max_tokens": max_tokens},
+        )
+
+    calls = model.apredict_messages.call_args_list
+    assert [call.kwargs["max_tokens"] for call in calls] == [100, 200]
+    assert model.max_tokens == 10
@@ -1,5 +1,8 @@
 import pytest
+from pydantic import ValidationError
 
+from reworkd_platform.schemas.agent import AgentTaskAnalyzeBatch
+from reworkd_platform.settings import settings
 from reworkd_platform.web.api.agent import dependancies
 
 
@@ -20,7 +23,25 @@ async def test_agent_validate(mocker, validator, step):
     body = mocker.Mock()
     body.run_id = run_id
 
-    crud.create_task = mocker.AsyncMock()
+    crud.create_tasks = mocker.AsyncMock()
 
     await validator(body, crud)
-    crud.create_task.assert_called_once_with(run_id, step)
+    crud.create_tasks.assert_called_once_with(run_id, step, 1)
+
+
+@pytest.mark.anyio
+async def test_analyze_batch_counts_every_task(mocker):
+    crud = mocker.Mock()
+    crud.create_tasks = mocker.AsyncMock()
+    body = AgentTaskAnalyzeBatch(goal="goal", run_id="asim", tasks=["a", "b", "c"])
+
+    await dependancies.agent_analyze_batch_validator(body, crud)
+
+    crud.create_tasks.assert_awaited_once_with("asim", "analyze", 3)
+
+
+def test_analyze_batch_size_is_capped():
+    with pytest.raises(ValidationError):
+        AgentTaskAnalyzeBatch(
+            goal="goal", run_id="asim", tasks=["task"] * (settings.max_loops + 1)
+        )
@@ -0,0 +1,109 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from reworkd_platform.services.completion_cache.cache import MemoryCacheTier
+from reworkd_platform.services.embedding_batcher.batcher import BatchedEmbeddings
+from reworkd_platform.services.embedding_cache.cache import (
+    CachedEmbeddings,
+    EmbeddingCache,
+    embedding_key,
+)
+from reworkd_platform.services.metrics import metrics
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+
+def create_batcher(mocker, window: float = 0.01, max_batch_size: int = 10):
+    calls: List[List[str]] = []
+
+    async def embed(texts: List[str]) -> List[List[float]]:
+        calls.append(texts)
+        return [[float(len(text))] for text in texts]
+
+    upstream = mocker.Mock()
+    upstream.aembed_documents = mocker.AsyncMock(side_effect=embed)
+    return BatchedEmbeddings(upstream, window, max_batch_size), calls
+
+
+def test_histogram_buckets() -> None:
+    for value in [0.5, 1, 3, 100]:
+        metrics.histogram("test", value, buckets=[2, 1])
+
+    histogram = metrics.snapshot()["histograms"]["test"]
+    assert histogram["buckets"] == (1, 2)
+    assert histogram["counts"] == [2, 0, 2]
+    assert histogram["count"] == 4
+    assert histogram["total"] == 104.5
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_request(mocker) -> None:
+    batcher, calls = create_batcher(mocker)
+
+    results = await asyncio.gather(
+        batcher.aembed_query("a"),
+        batcher.aembed_query("bb"),
+        batcher.aembed_documents(["ccc", "a"]),
+    )
+
+    assert results == [[1.0], [2.0], [[3.0], [1.0]]]
+    assert calls == [["a", "bb", "ccc"]]
+    histograms = metrics.snapshot()["histograms"]
+    assert histograms["embedding_batcher.batch_size"]["total"] == 4
+    assert histograms["embedding_batcher.wait_seconds"]["count"] == 4
+
+
+@pytest.mark.asyncio
+async def test_full_batches_are_sent_without_waiting(mocker) -> None:
+    batcher, calls = create_batcher(mocker, window=60, max_batch_size=2)
+
+    vectors = await asyncio.wait_for(
+        batcher.aembed_documents(["a", "b", "c", "d"]), timeout=1
+    )
+
+    assert vectors == [[1.0]] * 4
+    assert calls == [["a", "b"], ["c", "d"]]
+
+
+@pytest.mark.asyncio
+async def test_failure_reaches_every_caller(mocker) -> None:
+    batcher, _ = create_batcher(mocker)
+    batcher.embeddings.aembed_documents.side_effect = Exception("Upstream failed")
+
+    results = await asyncio.gather(
+        batcher.aembed_query("a"),
+        batcher.aembed_query("b"),
+        return_exceptions=True,
+    )
+
+    assert [str(result) for result in results] == ["Upstream failed"] * 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_affect_batch(mocker) -> None:
+    batcher, calls = create_batcher(mocker)
+    cancelled = asyncio.create_task(batcher.aembed_query("a"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    assert await batcher.aembed_query("b") == [1.0]
+    assert calls == [["a", "b"]]
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_cache_keys_use_the_batched_model(mocker) -> None:
+    batcher, _ = create_batcher(mocker)
+    batcher.embeddings.model = "text-embedding-ada-002"
+    cache = EmbeddingCache([MemoryCacheTier(max_entries=10, ttl=60)])
+
+    await CachedEmbeddings(batcher, cache).aembed_query("a")
+
+    key = embedding_key("text-embedding-ada-002", "a")
+    assert cache.get_many([key]) == [[1.0]]
+    await batcher.close()
@@ -0,0 +1,116 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+from langchain.embeddings.base import Embeddings
+
+from reworkd_platform.services.completion_cache.cache import MemoryCacheTier
+from reworkd_platform.services.embedding_cache.cache import (
+    CachedEmbeddings,
+    EmbeddingCache,
+    PackedVectorTier,
+    embedding_key,
+)
+from reworkd_platform.services.metrics import metrics
+
+
+class CountingEmbeddings(Embeddings):
+    model = "text-embedding-ada-002"
+
+    def __init__(self) -> None:
+        self.calls: List[List[str]] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(texts)
+        return [[float(len(text)), 0.5] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+
+def create_cache(tmp_path: Path) -> EmbeddingCache:
+    return EmbeddingCache(
+        [
+            MemoryCacheTier(max_entries=10, ttl=60, namespace="embedding_cache"),
+            PackedVectorTier(
+                tmp_path / "embeddings.db",
+                max_entries=10,
+                ttl=60,
+                namespace="embedding_cache",
+            ),
+        ]
+    )
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+
+def test_key_depends_on_model() -> None:
+    assert embedding_key("a", "text") == embedding_key("a", "text")
+    assert embedding_key("a", "text") != embedding_key("b", "text")
+
+
+def test_packed_vectors_round_trip(tmp_path: Path) -> None:
+    tier = PackedVectorTier(tmp_path / "embeddings.db", 10, 60)
+    tier.set_many({"key": [0.25, -1.5]})
+
+    assert tier.get("key") == [0.25, -1.5]
+    assert isinstance(PackedVectorTier.encode([0.25, -1.5]), bytes)
+    assert len(PackedVectorTier.encode([0.25, -1.5])) == 8
+
+
+def test_only_misses_are_embedded_in_order(tmp_path: Path) -> None:
+    upstream = CountingEmbeddings()
+    embeddings = CachedEmbeddings(upstream, create_cache(tmp_path))
+    embeddings.embed_documents(["bb"])
+
+    vectors = embeddings.embed_documents(["a", "bb", "ccc", "a"])
+
+    assert upstream.calls == [["bb"], ["a", "ccc"]]
+    assert [vector[0] for vector in vectors] == [1.0, 2.0, 3.0, 1.0]
+    assert metrics.counter("embedding_cache.memory.hit") == 1
+    assert metrics.counter("embedding_cache.miss") == 4
+    assert metrics.snapshot()["gauges"]["embedding_cache.hit_ratio"] == 0.2
+
+
+def test_disk_tier_survives_restart(tmp_path: Path) -> None:
+    CachedEmbeddings(CountingEmbeddings(), create_cache(tmp_path)).embed_query("a")
+
+    upstream = CountingEmbeddings()
+    embeddings = CachedEmbeddings(upstream, create_cache(tmp_path))
+
+    assert embeddings.embed_query("a") == [1.0, 0.5]
+    assert upstream.calls == []
+    assert metrics.counter("embedding_cache.disk.hit") == 1
+
+
+@pytest.mark.asyncio
+async def test_async_embeddings_share_the_cache(tmp_path: Path) -> None:
+    upstream = CountingEmbeddings()
+    embeddings = CachedEmbeddings(upstream, create_cache(tmp_path))
+
+    assert await embeddings.aembed_query("a") == [1.0, 0.5]
+    vectors = await embeddings.aembed_documents(["a", "bb"])
+
+    assert vectors == [[1.0, 0.5], [2.0, 0.5]]
+    assert upstream.calls == [["a"], ["bb"]]
+
+
+def test_disk_hits_backfill_memory_in_one_write(mocker, tmp_path: Path) -> None:
+    create_cache(tmp_path).set_many({"a": [1.0], "b": [2.0]})
+    cache = create_cache(tmp_path)
+    set_many = mocker.spy(cache.tiers[0], "set_many")
+
+    assert cache.get_many(["a", "c", "b"]) == [[1.0], None, [2.0]]
+    set_many.assert_called_once_with({"a": [1.0], "b": [2.0]})
+    assert cache.get_many(["a", "b"]) == [[1.0], [2.0]]
+    assert metrics.counter("embedding_cache.memory.hit") == 2
+    assert metrics.counter("embedding_cache.miss") == 1
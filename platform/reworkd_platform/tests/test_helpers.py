@@ -1,8 +1,15 @@
+import asyncio
+
 import pytest
+from langchain.prompts import PromptTemplate
 from openai.error import InvalidRequestError, ServiceUnavailableError
 
 from reworkd_platform.schemas.agent import ModelSettings
-from reworkd_platform.web.api.agent.helpers import openai_error_handler
+from reworkd_platform.web.api.agent.chains import ChainTemplate
+from reworkd_platform.web.api.agent.helpers import (
+    call_model_with_handling,
+    openai_error_handler,
+)
 from reworkd_platform.web.api.errors import OpenAIError
 
 
@@ -43,3 +50,32 @@ async def test_should_log(settings, should_log):
     error: OpenAIError = exc_info.value
 
     assert error.should_log == should_log
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("temperature,calls", [(0.0, 1), (0.9, 3)])
+async def test_deterministic_completions_are_coalesced(mocker, temperature, calls):
+    async def arun(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return "completion"
+
+    chain = mocker.Mock(arun=mocker.AsyncMock(side_effect=arun))
+    mocker.patch.object(ChainTemplate, "bind", return_value=chain)
+    model = mocker.Mock(
+        model_name="gpt-3.5-turbo", temperature=temperature, max_tokens=10
+    )
+    prompt = ChainTemplate(
+        PromptTemplate(template="{goal}", input_variables=["goal"])
+    )
+
+    completions = await asyncio.gather(
+        *(
+            call_model_with_handling(
+                model, prompt, {"goal": "x"}, settings=ModelSettings()
+            )
+            for _ in range(3)
+        )
+    )
+
+    assert completions == ["completion"] * 3
+    assert chain.arun.call_count == calls
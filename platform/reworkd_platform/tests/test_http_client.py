@@ -0,0 +1,59 @@
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from reworkd_platform.services.http_client.session import ClientSessionPool
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.settings import Settings
+
+
+@pytest.mark.asyncio
+async def test_session_is_shared_and_configured() -> None:
+    pool = ClientSessionPool(Settings(http_pool_limit=7, http_pool_limit_per_host=3))
+
+    session = pool.session
+    assert pool.session is session
+    assert session.connector.limit == 7
+    assert session.connector.limit_per_host == 3
+
+    await pool.close()
+    assert session.closed
+    assert pool.session is not session
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_llm_pool_has_its_own_limits() -> None:
+    settings = Settings(http_pool_limit_per_host=3)
+    pool = ClientSessionPool(settings)
+    llm_pool = ClientSessionPool(settings, "llm_http_pool", limit_per_host=9)
+
+    assert llm_pool.session is not pool.session
+    assert llm_pool.session.connector.limit_per_host == 9
+    assert llm_pool.session.connector.limit == settings.http_pool_limit
+
+    await pool.close()
+    await llm_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_connections_are_reused() -> None:
+    async def handler(_: web.Request) -> web.Response:
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    metrics.reset()
+
+    async with TestServer(app) as server:
+        pool = ClientSessionPool(Settings())
+        for _ in range(3):
+            async with pool.session.get(server.make_url("/")) as response:
+                assert (await response.json()) == {"ok": True}
+
+        assert pool.stats()["idle"] == 1
+        await pool.close()
+
+    assert metrics.counter("http_pool.requests") == 3
+    assert metrics.counter("http_pool.connection_created") == 1
+    assert metrics.counter("http_pool.connection_reused") == 2
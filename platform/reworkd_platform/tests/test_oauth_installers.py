@@ -1,5 +1,10 @@
+import asyncio
+
 import pytest
 
+from reworkd_platform.db.crud.oauth import OAuthCrud
+from reworkd_platform.schemas import UserBase
+from reworkd_platform.services import oauth_installers
 from reworkd_platform.services.oauth_installers import installer_factory
 
 
@@ -13,3 +18,42 @@ def test_integration_dne(mocker):
 
     with pytest.raises(NotImplementedError):
         installer_factory("asim", crud)
+
+
+@pytest.mark.asyncio
+async def test_installation_lookups_are_cached_per_request(mocker):
+    session = mocker.Mock()
+    installation = mocker.Mock()
+    result = mocker.Mock()
+    result.scalars.return_value.first.return_value = installation
+    session.execute = mocker.AsyncMock(return_value=result)
+    crud = OAuthCrud(session)
+
+    results = await asyncio.gather(
+        *(crud.get_installation_by_user_id("user", "sid") for _ in range(3))
+    )
+
+    assert results == [installation] * 3
+    session.execute.assert_awaited_once()
+
+    crud.forget_installation("user", "sid")
+    await crud.get_installation_by_user_id("user", "sid")
+    assert session.execute.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_uninstall_invalidates_availability(mocker):
+    crud = OAuthCrud(mocker.AsyncMock())
+    crud.get_installation_by_user_id = mocker.AsyncMock(return_value=mocker.Mock())
+    mocker.patch.object(
+        oauth_installers.encryption_service, "decrypt", return_value="token"
+    )
+    invalidate = mocker.patch.object(oauth_installers.availability_cache, "invalidate")
+    http_session = mocker.MagicMock()
+    http_session.post.return_value.__aenter__ = mocker.AsyncMock()
+    http_session.post.return_value.__aexit__ = mocker.AsyncMock(return_value=None)
+    installer = installer_factory("sid", crud, http_session)
+
+    assert await installer.uninstall(UserBase(id="user", email="user@example.com"))
+
+    invalidate.assert_called_once_with("user")
@@ -0,0 +1,81 @@
+import asyncio
+from typing import List
+
+import pytest
+from langchain.schema import HumanMessage
+
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.services.rate_limiter.limiter import RateLimiter
+from reworkd_platform.web.api.errors import RateLimitExceededError
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+
+def create_limiter(rpm: int = 6000, tpm: int = 600_000, max_wait: float = 1.0):
+    return RateLimiter(
+        requests_per_minute=rpm, tokens_per_minute=tpm, max_wait=max_wait
+    )
+
+
+def test_estimate_includes_completion_tokens() -> None:
+    limiter = create_limiter()
+    messages = [HumanMessage(content="a" * 40)]
+
+    assert limiter.estimate(messages, max_tokens=100) == 10 + 4 + 100
+
+
+@pytest.mark.asyncio
+async def test_acquire_within_budget_does_not_wait() -> None:
+    limiter = create_limiter()
+
+    await limiter.acquire("user", 100)
+
+    assert limiter.requests.level == pytest.approx(5999, abs=0.1)
+    assert limiter.tokens.level == pytest.approx(599_900, abs=10)
+    assert metrics.snapshot()["summaries"]["rate_limiter.wait_seconds"]["max"] == 0
+
+
+@pytest.mark.asyncio
+async def test_waits_for_refill_and_records_wait_time() -> None:
+    limiter = create_limiter(rpm=6000)
+    limiter.requests.level = 0
+
+    await limiter.acquire("user", 1)
+
+    wait = metrics.snapshot()["summaries"]["rate_limiter.wait_seconds"]["max"]
+    assert 0 < wait < 0.5
+
+
+@pytest.mark.asyncio
+async def test_fails_fast_when_deadline_cannot_be_met() -> None:
+    limiter = create_limiter(tpm=600, max_wait=1.0)
+    limiter.tokens.level = 0
+
+    with pytest.raises(RateLimitExceededError) as exc_info:
+        await limiter.acquire("user", 500)
+
+    assert exc_info.value.code == 429
+    assert metrics.counter("rate_limiter.rejected") == 1
+    assert not limiter._queues
+
+
+@pytest.mark.asyncio
+async def test_users_are_served_round_robin() -> None:
+    limiter = create_limiter(rpm=600)  # One request every 100ms
+    limiter.requests.level = 0
+    served: List[str] = []
+
+    async def call(user: str) -> None:
+        await limiter.acquire(user, 1)
+        served.append(user)
+
+    busy = [asyncio.create_task(call("busy")) for _ in range(3)]
+    await asyncio.sleep(0)
+    other = asyncio.create_task(call("other"))
+
+    await asyncio.gather(*busy, other)
+
+    assert served.index("other") == 1
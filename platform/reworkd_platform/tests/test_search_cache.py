@@ -0,0 +1,133 @@
+from pathlib import Path
+
+import pytest
+from aiohttp import ClientResponseError
+
+from reworkd_platform.services.completion_cache.cache import (
+    MemoryCacheTier,
+    SqliteCacheTier,
+)
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.services.search_cache import lifetime
+from reworkd_platform.services.search_cache.cache import (
+    SearchCache,
+    is_news_query,
+    normalize_query,
+)
+from reworkd_platform.web.api.agent.tools import search
+from reworkd_platform.web.api.agent.tools.utils import CitedSnippet
+
+SNIPPETS = [CitedSnippet(1, "text", "https://example.com")]
+SNIPPETS_RESULTS = [{"snippet": "text", "link": "https://example.com"}]
+
+
+def create_cache(tmp_path: Path, ttl: float = 60, stale_ttl: float = 60):
+    return SearchCache(
+        [
+            MemoryCacheTier(max_entries=10, ttl=ttl, namespace="search_cache"),
+            SqliteCacheTier(
+                tmp_path / "search.db",
+                max_entries=10,
+                ttl=ttl,
+                namespace="search_cache",
+            ),
+        ],
+        ttl=ttl,
+        news_ttl=ttl,
+        stale_ttl=stale_ttl,
+    )
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+
+def test_normalize_query() -> None:
+    assert normalize_query("  Bagel   SHOPS\n") == "bagel shops"
+
+
+@pytest.mark.parametrize(
+    "query,search_type,expected",
+    [
+        ("history of bagels", "search", False),
+        ("Latest bagel trends", "search", True),
+        ("bagel prices today", "search", True),
+        ("bagels", "news", True),
+    ],
+)
+def test_is_news_query(query: str, search_type: str, expected: bool) -> None:
+    assert is_news_query(query, search_type) == expected
+
+
+def test_hit_on_normalized_query(tmp_path: Path) -> None:
+    cache = create_cache(tmp_path)
+    cache.set("Bagel  shops", "search", SNIPPETS)
+
+    assert cache.get("bagel shops", "search") == SNIPPETS
+    assert cache.get("bagel shops", "news") is None
+    assert metrics.snapshot()["gauges"]["search_cache.hit_ratio"] == 0.5
+
+
+def test_disk_tier_is_shared(tmp_path: Path) -> None:
+    create_cache(tmp_path).set("bagel shops", "search", SNIPPETS)
+
+    assert create_cache(tmp_path).get("bagel shops", "search") == SNIPPETS
+    assert metrics.counter("search_cache.disk.found") == 1
+
+
+def test_news_queries_expire_sooner(tmp_path: Path) -> None:
+    cache = create_cache(tmp_path)
+    cache.news_ttl = -1
+    cache.set("latest bagel news", "search", SNIPPETS)
+    cache.set("bagel history", "search", SNIPPETS)
+
+    assert cache.get("latest bagel news", "search") is None
+    assert cache.get_stale("latest bagel news", "search") == SNIPPETS
+    assert cache.get("bagel history", "search") == SNIPPETS
+
+
+@pytest.mark.asyncio
+async def test_search_uses_cache_and_serves_stale_on_rate_limit(
+    mocker, tmp_path: Path
+) -> None:
+    cache = create_cache(tmp_path)
+    mocker.patch.object(lifetime, "search_cache", cache)
+    serper = mocker.patch.object(
+        search,
+        "_google_serper_search_results",
+        return_value={"organic": SNIPPETS_RESULTS},
+    )
+
+    assert await search._search_snippets("bagels") == SNIPPETS
+    assert await search._search_snippets("Bagels") == SNIPPETS
+    assert serper.call_count == 1
+
+    cache.ttl = -1
+    cache.set("bagels", "search", SNIPPETS)
+    serper.side_effect = ClientResponseError(mocker.Mock(), (), status=429)
+
+    assert await search._search_snippets("bagels") == SNIPPETS
+    assert metrics.counter("search_cache.stale_served") == 1
+
+    with pytest.raises(ClientResponseError):
+        await search._search_snippets("uncached query")
+
+
+@pytest.mark.asyncio
+async def test_cached_answer_box_links_the_current_query(
+    mocker, tmp_path: Path
+) -> None:
+    mocker.patch.object(lifetime, "search_cache", create_cache(tmp_path))
+    mocker.patch.object(
+        search,
+        "_google_serper_search_results",
+        return_value={"answerBox": {"answer": "42"}, "organic": SNIPPETS_RESULTS},
+    )
+
+    first = await search._search_snippets("Bagel  Shops")
+    second = await search._search_snippets("bagel shops")
+
+    assert first[0].url == "https://www.google.com/search?q=Bagel%20%20Shops"
+    assert second[0].url == "https://www.google.com/search?q=bagel%20shops"
+    assert second[1] == first[1] == CitedSnippet(2, "text", "https://example.com")
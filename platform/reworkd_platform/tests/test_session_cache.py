@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.orm.exc import NoResultFound
+
+from reworkd_platform.schemas.user import UserBase
+from reworkd_platform.web.api import dependencies
+from reworkd_platform.web.api.dependencies import SessionCache, get_current_user
+
+
+@pytest.fixture(autouse=True)
+def session_cache(mocker) -> SessionCache:
+    cache = SessionCache(ttl=60, negative_ttl=5, max_entries=2)
+    mocker.patch.object(dependencies, "session_cache", cache)
+    return cache
+
+
+def create_crud(mocker, expires: datetime):
+    session = mocker.Mock(expires=expires)
+    session.user.id = "user"
+    session.user.name = "name"
+    session.user.email = "user@example.com"
+    session.user.image = None
+    return mocker.Mock(get_user_session=mocker.AsyncMock(return_value=session))
+
+
+async def authenticate(crud, token: str = "token") -> UserBase:
+    bearer = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return await get_current_user(None, bearer, crud)
+
+
+@pytest.mark.asyncio
+async def test_session_is_cached(mocker, session_cache) -> None:
+    crud = create_crud(mocker, datetime.utcnow() + timedelta(days=1))
+
+    user = await authenticate(crud)
+
+    assert await authenticate(crud) is user
+    crud.get_user_session.assert_awaited_once_with("token")
+
+    mocker.patch.object(dependencies.time, "monotonic", return_value=10**9)
+    await authenticate(crud)
+    assert crud.get_user_session.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_never_outlives_session(mocker, session_cache) -> None:
+    session_cache.set(
+        "token", UserBase(id="user"), datetime.utcnow() - timedelta(seconds=1)
+    )
+    assert session_cache.get("token") is None
+
+    crud = create_crud(mocker, datetime.utcnow() - timedelta(seconds=1))
+    for _ in range(2):
+        with pytest.raises(HTTPException) as e:
+            await authenticate(crud)
+        assert e.value.detail == "Session token expired"
+    assert crud.get_user_session.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_invalid_tokens_are_cached(mocker) -> None:
+    crud = mocker.Mock(get_user_session=mocker.AsyncMock(side_effect=NoResultFound))
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as e:
+            await authenticate(crud)
+        assert e.value.detail == "Invalid session token"
+    crud.get_user_session.assert_awaited_once()
+
+
+def test_cache_is_bounded(session_cache) -> None:
+    expires = datetime.utcnow() + timedelta(days=1)
+    session_cache.set("a", UserBase(id="first"), expires)
+    session_cache.set("b", UserBase(id="second"), expires)
+    session_cache.set("c", UserBase(id="second"), expires)
+
+    assert session_cache.get("a") is None
+    assert session_cache.get("b") is not None
+    assert session_cache.get("c") is not None
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.services.singleflight import SingleFlight
+from reworkd_platform.web.api.agent.tools import search
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_request() -> None:
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def fetch() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+    assert results == ["result"] * 5
+    assert calls == 1
+    assert flight.in_flight() == 0
+    assert metrics.counter("singleflight.test.calls") == 1
+    assert metrics.counter("singleflight.test.deduplicated") == 4
+
+
+@pytest.mark.asyncio
+async def test_completed_calls_are_not_cached() -> None:
+    flight = SingleFlight("test")
+
+    async def fetch() -> int:
+        return 1
+
+    await flight.do("key", fetch)
+    await flight.do("key", fetch)
+
+    assert metrics.counter("singleflight.test.calls") == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_every_waiter() -> None:
+    flight = SingleFlight("test")
+
+    async def fail() -> None:
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        flight.do("key", fail), flight.do("key", fail), return_exceptions=True
+    )
+
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_affect_others() -> None:
+    flight = SingleFlight("test")
+
+    async def fetch() -> str:
+        await asyncio.sleep(0.02)
+        return "result"
+
+    first = asyncio.create_task(flight.do("key", fetch))
+    second = asyncio.create_task(flight.do("key", fetch))
+    await asyncio.sleep(0)
+
+    first.cancel()
+
+    assert await second == "result"
+    assert first.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_request_is_cancelled_when_every_waiter_leaves() -> None:
+    flight = SingleFlight("test")
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def fetch() -> None:
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.create_task(flight.do("key", fetch))
+    await started.wait()
+    waiter.cancel()
+
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_detached_request_outlives_its_waiters() -> None:
+    flight = SingleFlight("test", detached=True)
+    started = asyncio.Event()
+
+    async def fetch() -> str:
+        started.set()
+        await asyncio.sleep(0.01)
+        return "result"
+
+    waiter = asyncio.create_task(flight.do("key", fetch))
+    await started.wait()
+    waiter.cancel()
+    await asyncio.sleep(0)
+
+    assert flight.in_flight() == 1
+    assert await flight.do("key", fetch) == "result"
+    assert metrics.counter("singleflight.test.calls") == 1
+
+
+@pytest.mark.asyncio
+async def test_serper_searches_are_coalesced(mocker) -> None:
+    async def fetch_results(*_) -> dict:
+        await asyncio.sleep(0.01)
+        return {}
+
+    fetch = mocker.patch.object(
+        search, "_fetch_serper_results", side_effect=fetch_results
+    )
+
+    await asyncio.gather(
+        search._google_serper_search_results("query"),
+        search._google_serper_search_results("query"),
+        search._google_serper_search_results("query", "news"),
+    )
+
+    assert fetch.call_count == 2
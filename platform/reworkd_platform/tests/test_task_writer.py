@@ -0,0 +1,180 @@
+import asyncio
+
+import pytest
+
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.services.task_writer.writer import AgentTaskWriter
+from reworkd_platform.settings import settings
+from reworkd_platform.web.api.errors import MaxLoopsError
+
+
+def create_session_factory(mocker, fail: bool = False):
+    session = mocker.MagicMock()
+    session.__aenter__.return_value = session
+    session.execute = mocker.AsyncMock(side_effect=Exception() if fail else None)
+    return mocker.Mock(return_value=session), session
+
+
+def create_writer(session_factory, batch_size: int = 100) -> AgentTaskWriter:
+    return AgentTaskWriter(
+        session_factory, batch_size=batch_size, flush_interval=60, max_buffered=3
+    )
+
+
+def create_crud(mocker, count: int = 0):
+    return mocker.Mock(count_tasks=mocker.AsyncMock(return_value=count))
+
+
+@pytest.mark.asyncio
+async def test_counts_steps_in_process(mocker) -> None:
+    session_factory, _ = create_session_factory(mocker)
+    writer = create_writer(session_factory)
+    crud = create_crud(mocker, count=settings.max_loops - 2)
+
+    first = await writer.record(crud, "run", "analyze")
+    await writer.record(crud, "run", "analyze")
+    with pytest.raises(MaxLoopsError):
+        await writer.record(crud, "run", "analyze")
+
+    assert (first.run_id, first.type_) == ("run", "analyze")
+    crud.count_tasks.assert_awaited_once_with("run", "analyze")
+    session_factory.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_steps_over_budget_buffer_nothing(mocker) -> None:
+    writer = create_writer(create_session_factory(mocker)[0])
+    crud = create_crud(mocker, count=settings.max_loops - 2)
+
+    with pytest.raises(MaxLoopsError):
+        await writer.record_many(crud, "run", "analyze", 3)
+    tasks = await writer.record_many(crud, "run", "analyze", 2)
+
+    assert len({task.id for task in tasks}) == 2
+    assert writer._buffer == [
+        {"id": task.id, "run_id": "run", "type_": "analyze"} for task in tasks
+    ]
+    with pytest.raises(MaxLoopsError):
+        await writer.record(crud, "run", "analyze")
+
+
+@pytest.mark.asyncio
+async def test_flushes_batches(mocker) -> None:
+    metrics.reset()
+    session_factory, session = create_session_factory(mocker)
+    writer = create_writer(session_factory, batch_size=2)
+    crud = create_crud(mocker)
+
+    first = await writer.record(crud, "run", "analyze")
+    assert metrics.snapshot()["gauges"]["task_writer.buffer_depth"] == 1
+    second = await writer.record(crud, "run", "execute")
+    await asyncio.sleep(0)
+
+    session.execute.assert_awaited_once()
+    rows = session.execute.call_args.args[1]
+    assert [row["id"] for row in rows] == [first.id, second.id]
+    assert metrics.snapshot()["counters"]["task_writer.flushed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_rows_until_close(mocker) -> None:
+    failing_factory, _ = create_session_factory(mocker, fail=True)
+    writer = create_writer(failing_factory)
+    crud = create_crud(mocker)
+    for _ in range(4):
+        await writer.record(crud, "run", "analyze")
+
+    assert await writer.flush() == 0
+
+    session_factory, session = create_session_factory(mocker)
+    writer.session_factory = session_factory
+    await writer.close()
+
+    # The oldest row is dropped past max_buffered
+    assert len(session.execute.call_args.args[1]) == 3
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_steps_share_one_seed(mocker) -> None:
+    writer = create_writer(create_session_factory(mocker)[0])
+    crud = create_crud(mocker, count=settings.max_loops - 2)
+
+    results = await asyncio.gather(
+        *(writer.record(crud, "run", "analyze") for _ in range(3)),
+        return_exceptions=True,
+    )
+
+    assert [isinstance(result, MaxLoopsError) for result in results].count(True) == 1
+    crud.count_tasks.assert_awaited_once_with("run", "analyze")
+
+
+@pytest.mark.asyncio
+async def test_slow_seed_does_not_block_other_runs(mocker) -> None:
+    writer = create_writer(create_session_factory(mocker)[0])
+    seeded = asyncio.Event()
+
+    async def count_tasks(*_) -> int:
+        await seeded.wait()
+        return 0
+
+    slow_crud = mocker.Mock(count_tasks=count_tasks)
+    slow = asyncio.create_task(writer.record(slow_crud, "slow", "analyze"))
+    await asyncio.sleep(0)
+
+    task = await asyncio.wait_for(
+        writer.record(create_crud(mocker), "run", "analyze"), timeout=1
+    )
+
+    assert task.run_id == "run"
+    assert not slow.done()
+    slow.cancel()
+
+
+@pytest.mark.asyncio
+async def test_reseed_counts_unflushed_rows(mocker) -> None:
+    writer = create_writer(create_session_factory(mocker)[0])
+    crud = create_crud(mocker, count=settings.max_loops - 2)
+
+    for _ in range(2):
+        await writer.record(crud, "run", "analyze")
+        writer._counts.clear()  # As if evicted past MAX_TRACKED_STEPS
+    with pytest.raises(MaxLoopsError):
+        await writer.record(crud, "run", "analyze")
+
+
+@pytest.mark.asyncio
+async def test_close_waits_for_a_timer_flush(mocker) -> None:
+    session_factory, session = create_session_factory(mocker)
+    flushing = asyncio.Event()
+    inserted = []
+
+    async def execute(_, rows) -> None:
+        flushing.set()
+        await asyncio.sleep(0.01)
+        inserted.extend(rows)
+
+    session.execute = mocker.AsyncMock(side_effect=execute)
+    writer = AgentTaskWriter(
+        session_factory, batch_size=100, flush_interval=0.001, max_buffered=10
+    )
+    writer.start()
+    await writer.record(create_crud(mocker), "run", "analyze")
+    await flushing.wait()
+
+    await writer.close()
+
+    assert len(inserted) == 1
+    assert writer._buffer == []
+
+
+@pytest.mark.asyncio
+async def test_cancelled_flush_requeues_rows(mocker) -> None:
+    session_factory, session = create_session_factory(mocker)
+    session.execute = mocker.AsyncMock(side_effect=asyncio.CancelledError())
+    writer = create_writer(session_factory)
+    await writer.record(create_crud(mocker), "run", "analyze")
+
+    with pytest.raises(asyncio.CancelledError):
+        await writer.flush()
+
+    assert len(writer._buffer) == 1
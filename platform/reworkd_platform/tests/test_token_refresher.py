@@ -0,0 +1,193 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from reworkd_platform.services.token_refresher import refresher as refresher_module
+from reworkd_platform.services.token_refresher.refresher import TokenRefresher
+from reworkd_platform.services.token_refresher.tokens import (
+    TOKEN_REFRESH_MARGIN,
+    AccessTokenCache,
+)
+from reworkd_platform.web.api.agent.tools import sidsearch
+
+
+@pytest.fixture(autouse=True)
+def access_tokens(mocker) -> AccessTokenCache:
+    cache = AccessTokenCache(ttl=300)
+    mocker.patch.object(sidsearch, "access_tokens", cache)
+    mocker.patch.object(
+        sidsearch.encryption_service, "encrypt", side_effect=lambda t: f"enc:{t}"
+    )
+    mocker.patch.object(
+        sidsearch.encryption_service, "decrypt", side_effect=lambda t: t[4:]
+    )
+    return cache
+
+
+def create_session(mocker):
+    session = mocker.MagicMock()
+    session.__aenter__.return_value = session
+    session.begin.return_value = mocker.MagicMock()
+    session.refresh = mocker.AsyncMock()
+    return session
+
+
+def lock_installations(mocker, installations):
+    """Crud of the refresh transactions, which lock installations by id"""
+    by_id = {installation.id: installation for installation in installations}
+    crud = mocker.Mock()
+    crud.lock_expiring_installation = mocker.AsyncMock(
+        side_effect=lambda id_, _: by_id.get(id_)
+    )
+    mocker.patch.object(sidsearch, "OAuthCrud", return_value=crud)
+    return crud
+
+
+def create_installation(mocker, expires_in: timedelta):
+    installation = mocker.Mock()
+    installation.id = "installation"
+    installation.refresh_token_enc = "enc:refresh"
+    installation.access_token_enc = "enc:access"
+    installation.access_token_expiration = datetime.now() + expires_in
+    installation.save = mocker.AsyncMock()
+    return installation
+
+
+@pytest.mark.asyncio
+async def test_concurrent_refreshes_exchange_once(mocker) -> None:
+    async def token_exchange(refresh_token: str):
+        await asyncio.sleep(0.01)
+        return f"new-{refresh_token}", datetime.now() + timedelta(hours=1)
+
+    exchange = mocker.patch.object(
+        sidsearch, "token_exchange", side_effect=token_exchange
+    )
+    installation = create_installation(mocker, timedelta(minutes=1))
+    lock = lock_installations(mocker, [installation]).lock_expiring_installation
+    session = create_session(mocker)
+    mocker.patch.object(sidsearch, "AsyncSession", return_value=session)
+    crud = mocker.Mock()
+
+    tokens = await asyncio.gather(
+        *(sidsearch.get_access_token(crud, installation) for _ in range(5))
+    )
+
+    assert tokens == ["new-refresh"] * 5
+    exchange.assert_called_once_with("refresh")
+    lock.assert_awaited_once()
+    # Saved on a session of its own rather than the request's
+    installation.save.assert_awaited_once_with(session)
+
+
+@pytest.mark.asyncio
+async def test_refresh_outlives_its_caller(mocker) -> None:
+    exchanged = asyncio.Event()
+
+    async def token_exchange(refresh_token: str):
+        exchanged.set()
+        await asyncio.sleep(0.01)
+        return f"new-{refresh_token}", datetime.now() + timedelta(hours=1)
+
+    mocker.patch.object(sidsearch, "token_exchange", side_effect=token_exchange)
+    installation = create_installation(mocker, timedelta(minutes=1))
+    lock_installations(mocker, [installation])
+    mocker.patch.object(sidsearch, "AsyncSession", return_value=create_session(mocker))
+    caller = asyncio.create_task(
+        sidsearch.get_access_token(mocker.Mock(), installation)
+    )
+    await exchanged.wait()
+
+    caller.cancel()
+    await asyncio.sleep(0.02)
+
+    installation.save.assert_awaited_once()
+    assert installation.access_token_enc == "enc:new-refresh"
+
+
+@pytest.mark.asyncio
+async def test_installation_renewed_elsewhere_is_read_back(mocker) -> None:
+    installation = create_installation(mocker, timedelta(minutes=1))
+    lock_installations(mocker, [])
+    mocker.patch.object(sidsearch, "AsyncSession", return_value=create_session(mocker))
+    crud = mocker.Mock()
+    crud.session.refresh = mocker.AsyncMock()
+
+    assert await sidsearch.get_access_token(crud, installation) == "access"
+    crud.session.refresh.assert_awaited_once_with(installation)
+
+
+@pytest.mark.asyncio
+async def test_decrypted_token_is_cached(mocker, access_tokens) -> None:
+    installation = create_installation(mocker, timedelta(hours=1))
+
+    assert await sidsearch.get_access_token(mocker.Mock(), installation) == "access"
+    installation.access_token_enc = "enc:changed"
+    assert await sidsearch.get_access_token(mocker.Mock(), installation) == "access"
+
+    access_tokens.invalidate(installation.id)
+    assert await sidsearch.get_access_token(mocker.Mock(), installation) == "changed"
+
+
+def test_cached_token_expires_before_refresh_margin() -> None:
+    cache = AccessTokenCache(ttl=3600)
+    cache.set("soon", "token", datetime.now() + TOKEN_REFRESH_MARGIN)
+    cache.set("later", "token", datetime.now() + timedelta(hours=2))
+
+    assert cache.get("soon") is None
+    assert cache.get("later") == "token"
+
+
+def create_refresher(mocker, installations):
+    lock_installations(mocker, installations)
+    crud = mocker.Mock()
+    crud.get_expiring_installations = mocker.AsyncMock(return_value=installations)
+    mocker.patch.object(refresher_module, "OAuthCrud", return_value=crud)
+    session = create_session(mocker)
+    return TokenRefresher(lambda: session, interval=60, lead=900), crud, session
+
+
+@pytest.mark.asyncio
+async def test_refresher_renews_expiring_installations(mocker) -> None:
+    installations = [create_installation(mocker, timedelta(minutes=10))]
+    installations[0].id = "expiring"
+    refresh = mocker.patch.object(
+        sidsearch, "refresh_access_token", mocker.AsyncMock(return_value="access")
+    )
+    refresher, crud, session = create_refresher(mocker, installations)
+
+    assert await refresher.refresh_expiring() == 1
+
+    refresh.assert_awaited_once_with(session, installations[0])
+    assert session.begin.call_count == 1
+    provider, expiring_before, limit = crud.get_expiring_installations.call_args.args
+    assert provider == "sid"
+    assert expiring_before > datetime.now() + timedelta(minutes=14)
+    assert crud.get_expiring_installations.call_args.kwargs["exclude"] == []
+
+
+@pytest.mark.asyncio
+async def test_failed_installations_back_off(mocker) -> None:
+    async def refresh_access_token(_, installation) -> str:
+        if installation.id == "failing":
+            raise Exception("Refresh token revoked")
+        return "access"
+
+    installations = [
+        create_installation(mocker, timedelta(minutes=10)) for _ in range(2)
+    ]
+    installations[0].id, installations[1].id = "failing", "healthy"
+    refresh = mocker.patch.object(
+        sidsearch, "refresh_access_token", side_effect=refresh_access_token
+    )
+    refresher, crud, _ = create_refresher(mocker, installations)
+    crud.get_expiring_installations.side_effect = lambda *_, exclude: [
+        installation for installation in installations if installation.id not in exclude
+    ]
+
+    assert await refresher.refresh_expiring() == 1
+    assert await refresher.refresh_expiring() == 1
+
+    assert refresh.call_count == 3
+    assert crud.get_expiring_installations.call_args.kwargs["exclude"] == ["failing"]
+    assert list(refresher._backoff) == ["failing"]
@@ -2,8 +2,17 @@ from unittest.mock import Mock
 
 import tiktoken
 
+from reworkd_platform.services.metrics import metrics
+
 from reworkd_platform.schemas.agent import LLM_MODEL_MAX_TOKENS
-from reworkd_platform.services.tokenizer.token_service import TokenService
+from reworkd_platform.services.tokenizer.token_service import (
+    TokenCounter,
+    TokenService,
+)
+from reworkd_platform.web.api.agent.prompts import (
+    create_tasks_prompt,
+    start_goal_prompt,
+)
 
 encoding = tiktoken.get_encoding("cl100k_base")
 
@@ -67,6 +76,146 @@ def test_calculate_max_tokens_with_negative_result() -> None:
     assert model.max_tokens == 1
 
 
+def create_model(max_tokens: int, model_name: str = "gpt-3.5-turbo") -> Mock:
+    model = Mock(spec=["model_name", "max_tokens"])
+    model.model_name = model_name
+    model.max_tokens = max_tokens
+    return model
+
+
+def test_plan_allocates_context() -> None:
+    metrics.reset()
+    service = TokenService(encoding)
+    model = create_model(500)
+
+    budget = service.plan("create", model, prompt_tokens=300, tool_tokens=200)
+
+    assert budget.completion == 500
+    assert budget.llm_kwargs == {"model": "gpt-3.5-turbo", "max_tokens": 500}
+    assert model.max_tokens == 500
+    assert budget.context == LLM_MODEL_MAX_TOKENS["gpt-3.5-turbo"]
+    assert budget.unused == budget.context - 1000
+    summary = metrics.snapshot()["summaries"]["token_budget.create.completion"]
+    assert summary["max"] == 500
+
+
+def test_plan_shrinks_completion_to_fit() -> None:
+    service = TokenService(encoding)
+    model = create_model(3000)
+
+    budget = service.plan("execute", model, prompt_tokens=3500)
+
+    assert budget.completion == 500
+    assert budget.unused == 0
+    assert service.plan("execute", model, prompt_tokens=5000).completion == 1
+    # Budgets never carry over from one call to the next
+    assert service.plan("execute", model, prompt_tokens=100).completion == 3000
+    assert model.max_tokens == 3000
+
+
+def test_plan_with_explicit_completion() -> None:
+    service = TokenService(encoding)
+    model = create_model(500)
+
+    budget = service.plan(
+        "summarize",
+        model,
+        prompt_tokens=100,
+        completion_tokens=1000,
+        model_name="gpt-3.5-turbo-16k",
+    )
+
+    assert budget.llm_kwargs == {"model": "gpt-3.5-turbo-16k", "max_tokens": 1000}
+    assert budget.context == LLM_MODEL_MAX_TOKENS["gpt-3.5-turbo-16k"]
+    assert model.model_name == "gpt-3.5-turbo"
+
+
+def test_get_input_space() -> None:
+    service = TokenService(encoding)
+
+    assert service.get_input_space("gpt-4", 1000, 500) == 6500
+    assert service.get_input_space("gpt-4", 10_000) == 0
+
+
+def test_fit_latest_keeps_most_recent_texts() -> None:
+    service = TokenService(encoding)
+    texts = ["Hello world!", "Goodbye world!", "Hello again!"]
+    counts = service.count_batch(texts)
+
+    assert service.fit_latest(texts, sum(counts)) == texts
+    assert service.fit_latest(texts, counts[2]) == ["Hello again!"]
+    cut, latest = service.fit_latest(texts, counts[2] + 1)
+    assert latest == "Hello again!"
+    assert cut and "Goodbye world!".startswith(cut)
+    assert service.count(cut) == 1
+    assert service.fit_latest(texts, 0) == []
+
+
+def test_count_is_memoized(mocker) -> None:
+    counter = TokenCounter(encoding)
+    spy = mocker.spy(encoding, "encode")
+
+    assert counter.count(LONG_TEXT) == counter.count(LONG_TEXT)
+    assert spy.call_count == 1
+
+
+def test_count_cache_is_bounded() -> None:
+    counter = TokenCounter(encoding, max_entries=2)
+
+    for text in ["a", "b", "c"]:
+        counter.count(text)
+
+    assert len(counter._counts) == 2
+
+
+def test_count_batch() -> None:
+    service = TokenService(encoding)
+    texts = ["Hello world!", "", LONG_TEXT, "Hello world!"]
+
+    assert service.count_batch(texts) == [len(encoding.encode(t)) for t in texts]
+
+
+def test_count_prompt_covers_rendered_prompt() -> None:
+    service = TokenService(encoding)
+    args = {
+        "goal": "Create a business plan for a bagel company",
+        "language": "English",
+        "tasks": "Research bagels\nFind a location",
+        "lastTask": "Research competitors",
+        "result": LONG_TEXT,
+    }
+
+    for prompt in [start_goal_prompt, create_tasks_prompt]:
+        inputs = {k: v for k, v in args.items() if k in prompt.input_variables}
+        rendered = service.count(prompt.format(**inputs))
+        estimate = service.count_prompt(prompt, **inputs)
+
+        # Variables are counted separately from the static text,
+        # so merges across the boundaries may only add a few tokens
+        assert rendered <= estimate <= rendered * 1.05
+
+
+def test_truncate_keeps_texts_within_budget() -> None:
+    service = TokenService(encoding)
+
+    assert service.truncate(["Hello", " world!"], 100) == "Hello world!"
+    assert service.truncate(["Hello", " world!"], 1) == "Hello"
+    assert service.truncate([], 100) == ""
+
+
+def test_truncate_cuts_long_text(mocker) -> None:
+    service = TokenService(encoding)
+    results = [LONG_TEXT] * 1000
+    spy = mocker.spy(service, "tokenize")
+
+    text = service.truncate(results, 50)
+
+    assert service.count(text) == 50
+    assert LONG_TEXT.startswith(text)
+    # Only a window around the budget is ever encoded
+    assert all(len(call.args[0]) < len(LONG_TEXT) for call in spy.call_args_list)
+
+
 LONG_TEXT = """
 This is some long text. This is some long text. This is some long text.
 This is some long text. This is some long text. This is some long text.
@@ -1,3 +1,4 @@
+from asyncio import iscoroutinefunction
 from functools import wraps
 from time import time
 from typing import Any, Callable, Literal
@@ -17,16 +18,30 @@ Log_Level = Literal[
 
 def timed_function(level: Log_Level = "INFO") -> Callable[..., Any]:
     def decorator(func: Any) -> Callable[..., Any]:
-        @wraps(func)
-        def wrapper(*args: Any, **kwargs: Any) -> Any:
-            start_time = time()
-            result = func(*args, **kwargs)
+        def log(start_time: float) -> None:
             execution_time = time() - start_time
             logger.log(
                 level,
                 f"Function '{func.__qualname__}' executed in {execution_time:.4f} seconds",
             )
 
+        if iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                start_time = time()
+                result = await func(*args, **kwargs)
+                log(start_time)
+                return result
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start_time = time()
+            result = func(*args, **kwargs)
+            log(start_time)
+
             return result
 
         return wrapper
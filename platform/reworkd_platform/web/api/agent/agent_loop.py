@@ -0,0 +1,178 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, List, Optional
+
+from fastapi.responses import StreamingResponse as FastAPIStreamingResponse
+from lanarky.responses import StreamingResponse
+from loguru import logger
+from starlette.types import Message
+
+from reworkd_platform.db.crud.oauth import OAuthCrud
+from reworkd_platform.schemas.agent import AgentLoop, Loop_Step
+from reworkd_platform.settings import settings
+from reworkd_platform.web.api.agent.agent_service.agent_service import AgentService
+from reworkd_platform.web.api.agent.dependancies import AgentCRUDFactory
+from reworkd_platform.web.api.errors import PlatformaticError
+
+AgentServiceFactory = Callable[..., AgentService]
+
+
+def format_event(event: str, data: Any) -> str:
+    """Server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def iterate_response(
+    response: FastAPIStreamingResponse,
+) -> AsyncGenerator[str, None]:
+    """
+    Yields the body chunks of a streaming response without sending it.
+    LangChain backed responses only produce output when given a `send` callable,
+    so their chain is executed here with a send that feeds a queue.
+    """
+    if not isinstance(response, StreamingResponse):
+        async for chunk in response.body_iterator:
+            yield chunk if isinstance(chunk, str) else chunk.decode()
+        return
+
+    queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue()
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.body":
+            await queue.put(message.get("body", b""))
+
+    async def execute() -> None:
+        try:
+            await response.chain_executor(send)
+        finally:
+            await queue.put(None)
+
+    task = asyncio.create_task(execute())
+    try:
+        while (chunk := await queue.get()) is not None:
+            yield chunk.decode()
+        await task
+    finally:
+        task.cancel()
+
+
+class AgentLoopRunner:
+    """
+    Runs the start / analyze / execute / create loop server-side and streams every
+    step as typed server-sent events. Each step is accounted for through the
+    AgentCRUD like the equivalent client driven request would be, in its own
+    short transaction so a long run neither pins a pooled connection nor hides
+    its steps until it ends. Tool lookups use short sessions as well.
+    """
+
+    def __init__(
+        self,
+        run: AgentLoop,
+        create_crud: AgentCRUDFactory,
+        create_service: AgentServiceFactory,
+        max_loops: Optional[int] = None,
+    ):
+        self.run = run
+        self.create_crud = create_crud
+        self.create_service = create_service
+        self.max_loops = max_loops or settings.max_loops
+
+    async def stream(self) -> AsyncGenerator[str, None]:
+        yield format_event("start", {"run_id": self.run.run_id})
+
+        closed = False
+        try:
+            try:
+                async for event in self._run():
+                    yield event
+            except PlatformaticError as e:
+                if e.should_log:
+                    logger.exception(e)
+                yield format_event(
+                    "error", {"error": e.__class__.__name__, "detail": e.detail}
+                )
+            except Exception as e:
+                logger.exception(e)
+                yield format_event(
+                    "error",
+                    {"error": e.__class__.__name__, "detail": "Unexpected error"},
+                )
+        except BaseException:
+            # Closed or cancelled by the client, an async generator can't yield
+            closed = True
+            raise
+        finally:
+            if not closed:
+                yield format_event("end", {"run_id": self.run.run_id})
+
+    async def _run(self) -> AsyncGenerator[str, None]:
+        goal = self.run.goal
+        tasks = await self.create_service().start_goal_agent(goal=goal)
+        yield format_event("tasks", {"tasks": tasks})
+
+        completed_tasks: List[str] = []
+        results: List[str] = []
+
+        for _ in range(self.max_loops):
+            if not tasks:
+                break
+            task = tasks.pop(0)
+
+            await self._step("analyze")
+            async with self._service() as service:
+                analysis = await service.analyze_task_agent(
+                    goal=goal, task=task, tool_names=self.run.tool_names
+                )
+            yield format_event("analysis", {"task": task, **analysis.dict()})
+
+            async with self._service() as service:
+                await service.prefetch_analyses(
+                    run_id=self.run.run_id,
+                    goal=goal,
+                    tasks=tasks,
+                    tool_names=self.run.tool_names,
+                )
+
+            await self._step("execute")
+            async with self._service(streaming=True) as service:
+                response = await service.execute_task_agent(
+                    goal=goal, task=task, analysis=analysis
+                )
+            chunks: List[str] = []
+            async for chunk in iterate_response(response):
+                chunks.append(chunk)
+                yield format_event("execution", {"task": task, "token": chunk})
+
+            result = "".join(chunks)
+            completed_tasks.append(task)
+            results.append(result)
+            yield format_event("result", {"task": task, "result": result})
+
+            await self._step("create")
+            new_tasks = await self.create_service().create_tasks_agent(
+                goal=goal,
+                tasks=tasks,
+                last_task=task,
+                result=result,
+                completed_tasks=completed_tasks,
+            )
+            tasks.extend(new_tasks)
+            yield format_event("tasks", {"tasks": new_tasks})
+
+        await self._step("summarize")
+        response = await self.create_service(
+            streaming=True, llm_model="gpt-3.5-turbo-16k"
+        ).summarize_task_agent(goal=goal, results=results)
+        async for chunk in iterate_response(response):
+            yield format_event("summary", {"token": chunk})
+
+    @asynccontextmanager
+    async def _service(self, **kwargs: Any) -> AsyncIterator[AgentService]:
+        """A service whose tool lookups use a session released once it is done"""
+        async with self.create_crud() as crud:
+            yield self.create_service(oauth_crud=OAuthCrud(crud.session), **kwargs)
+
+    async def _step(self, type_: Loop_Step) -> None:
+        async with self.create_crud() as crud:
+            await crud.create_task(self.run.run_id, type_)
@@ -2,6 +2,7 @@ from typing import List, Optional, Protocol
 
 from fastapi.responses import StreamingResponse as FastAPIStreamingResponse
 
+from reworkd_platform.schemas.agent import AnalysisBatch
 from reworkd_platform.web.api.agent.analysis import Analysis
 
 
@@ -14,6 +15,16 @@ class AgentService(Protocol):
     ) -> Analysis:
         pass
 
+    async def analyze_tasks_agent(
+        self, *, goal: str, tasks: List[str], tool_names: List[str]
+    ) -> AnalysisBatch:
+        pass
+
+    async def prefetch_analyses(
+        self, *, run_id: str, goal: str, tasks: List[str], tool_names: List[str]
+    ) -> None:
+        pass
+
     async def execute_task_agent(
         self,
         *,
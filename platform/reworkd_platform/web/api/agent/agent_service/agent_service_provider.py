@@ -5,6 +5,12 @@ from fastapi import Depends
 from reworkd_platform.db.crud.oauth import OAuthCrud
 from reworkd_platform.schemas.agent import AgentRun, LLM_Model
 from reworkd_platform.schemas.user import UserBase
+from reworkd_platform.services.completion_cache.cache import CompletionCache
+from reworkd_platform.services.completion_cache.dependencies import (
+    get_completion_cache,
+)
+from reworkd_platform.services.rate_limiter.dependencies import get_rate_limiter
+from reworkd_platform.services.rate_limiter.limiter import RateLimiter
 from reworkd_platform.services.tokenizer.dependencies import get_token_service
 from reworkd_platform.services.tokenizer.token_service import TokenService
 from reworkd_platform.settings import settings
@@ -24,30 +30,59 @@ def get_agent_service(
     streaming: bool = False,
     llm_model: Optional[LLM_Model] = None,
 ) -> Callable[..., AgentService]:
+    def func(
+        create_service: Callable[..., AgentService] = Depends(
+            get_agent_service_factory(validator)
+        ),
+    ) -> AgentService:
+        return create_service(streaming=streaming, llm_model=llm_model)
+
+    return func
+
+
+def get_agent_service_factory(
+    validator: Callable[..., Coroutine[Any, Any, AgentRun]],
+) -> Callable[..., Callable[..., AgentService]]:
+    """
+    Dependency returning a factory for agent services of the validated run.
+    Used by endpoints that need several services, e.g. streaming and non-streaming.
+    """
+
     def func(
         run: AgentRun = Depends(validator),
         user: UserBase = Depends(get_current_user),
         token_service: TokenService = Depends(get_token_service),
         oauth_crud: OAuthCrud = Depends(OAuthCrud.inject),
-    ) -> AgentService:
-        if settings.ff_mock_mode_enabled:
-            return MockAgentService()
-
-        model = create_model(
-            settings,
-            run.model_settings,
-            user,
-            streaming=streaming,
-            force_model=llm_model,
-        )
-
-        return OpenAIAgentService(
-            model,
-            run.model_settings,
-            token_service,
-            callbacks=None,
-            user=user,
-            oauth_crud=oauth_crud,
-        )
+        completion_cache: Optional[CompletionCache] = Depends(get_completion_cache),
+        rate_limiter: Optional[RateLimiter] = Depends(get_rate_limiter),
+    ) -> Callable[..., AgentService]:
+        def create_service(
+            streaming: bool = False,
+            llm_model: Optional[LLM_Model] = None,
+            oauth_crud: OAuthCrud = oauth_crud,
+        ) -> AgentService:
+            if settings.ff_mock_mode_enabled:
+                return MockAgentService()
+
+            model = create_model(
+                settings,
+                run.model_settings,
+                user,
+                streaming=streaming,
+                force_model=llm_model,
+                rate_limiter=rate_limiter,
+            )
+
+            return OpenAIAgentService(
+                model,
+                run.model_settings,
+                token_service,
+                callbacks=None,
+                user=user,
+                oauth_crud=oauth_crud,
+                completion_cache=completion_cache,
+            )
+
+        return create_service
 
     return func
@@ -3,6 +3,7 @@ from typing import Any, List
 
 from fastapi.responses import StreamingResponse as FastAPIStreamingResponse
 
+from reworkd_platform.schemas.agent import AnalysisBatch
 from reworkd_platform.web.api.agent.agent_service.agent_service import (
     AgentService,
     Analysis,
@@ -27,6 +28,22 @@ class MockAgentService(AgentService):
             reasoning="Mock to avoid wasting money calling the OpenAI API.",
         )
 
+    async def analyze_tasks_agent(self, **kwargs: Any) -> AnalysisBatch:
+        time.sleep(1.5)
+        return AnalysisBatch(
+            analyses=[
+                Analysis(
+                    action="reason",
+                    arg="Mock analysis",
+                    reasoning="Mock to avoid wasting money calling the OpenAI API.",
+                )
+                for _ in kwargs.get("tasks", [])
+            ]
+        )
+
+    async def prefetch_analyses(self, **kwargs: Any) -> None:
+        pass
+
     async def execute_task_agent(self, **kwargs: Any) -> FastAPIStreamingResponse:
         time.sleep(0.5)
         return stream_string(
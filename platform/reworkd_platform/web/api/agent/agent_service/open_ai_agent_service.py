@@ -1,4 +1,6 @@
-from typing import List, Optional
+import asyncio
+from functools import partial
+from typing import List, Optional, Type, Union
 
 from fastapi.responses import StreamingResponse as FastAPIStreamingResponse
 from lanarky.responses import StreamingResponse
@@ -11,15 +13,23 @@ from loguru import logger
 from pydantic import ValidationError
 
 from reworkd_platform.db.crud.oauth import OAuthCrud
-from reworkd_platform.schemas.agent import ModelSettings
+from reworkd_platform.schemas.agent import (
+    AnalysisBatch,
+    AnalysisError,
+    LLM_Model,
+    ModelSettings,
+)
 from reworkd_platform.schemas.user import UserBase
+from reworkd_platform.services.completion_cache.cache import CompletionCache
 from reworkd_platform.services.tokenizer.token_service import TokenService
+from reworkd_platform.settings import settings as platform_settings
 from reworkd_platform.web.api.agent.agent_service.agent_service import AgentService
 from reworkd_platform.web.api.agent.analysis import Analysis, AnalysisArguments
+from reworkd_platform.web.api.agent.chains import create_tasks_chain, start_goal_chain
 from reworkd_platform.web.api.agent.helpers import (
     call_model_with_handling,
-    openai_error_handler,
     parse_with_handling,
+    predict_messages_with_handling,
 )
 from reworkd_platform.web.api.agent.model_factory import WrappedChatOpenAI
 from reworkd_platform.web.api.agent.prompts import (
@@ -27,9 +37,15 @@ from reworkd_platform.web.api.agent.prompts import (
     chat_prompt,
     create_tasks_prompt,
     start_goal_prompt,
+    summarize_prompt,
+)
+from reworkd_platform.web.api.agent.speculation import (
+    speculation_key,
+    speculative_analyses,
 )
 from reworkd_platform.web.api.agent.task_output_parser import TaskOutputParser
-from reworkd_platform.web.api.agent.tools.open_ai_function import get_tool_function
+from reworkd_platform.web.api.agent.tools.open_ai_function import function_specs
+from reworkd_platform.web.api.agent.tools.tool import Tool
 from reworkd_platform.web.api.agent.tools.tools import (
     get_default_tool,
     get_tool_from_name,
@@ -37,7 +53,15 @@ from reworkd_platform.web.api.agent.tools.tools import (
     get_user_tools,
 )
 from reworkd_platform.web.api.agent.tools.utils import summarize
-from reworkd_platform.web.api.errors import OpenAIError
+from reworkd_platform.web.api.errors import OpenAIError, PlatformaticError
+
+
+# Tokens left for the context a tool fetches while executing a task
+TOOL_CONTEXT_RESERVE_TOKENS = 1000
+# Summaries combine many results and get at least this many completion tokens
+SUMMARY_MIN_COMPLETION_TOKENS = 1000
+# Model of the calls that combine the results of a whole run
+LONG_CONTEXT_MODEL: LLM_Model = "gpt-3.5-turbo-16k"
 
 
 class OpenAIAgentService(AgentService):
@@ -49,6 +73,7 @@ class OpenAIAgentService(AgentService):
         callbacks: Optional[List[AsyncCallbackHandler]],
         user: UserBase,
         oauth_crud: OAuthCrud,
+        completion_cache: Optional[CompletionCache] = None,
     ):
         self.model = model
         self.settings = settings
@@ -56,28 +81,26 @@ class OpenAIAgentService(AgentService):
         self.callbacks = callbacks
         self.user = user
         self.oauth_crud = oauth_crud
+        self.completion_cache = completion_cache
 
     async def start_goal_agent(self, *, goal: str) -> List[str]:
-        # 使用 from_messages 方法创建聊天提示模板
-        prompt = ChatPromptTemplate.from_messages(
-            [SystemMessagePromptTemplate(prompt=start_goal_prompt)]
-        )
-
-        self.token_service.calculate_max_tokens(
+        budget = self.token_service.plan(
+            "start",
             self.model,
-            prompt.format_prompt(
+            prompt_tokens=self.token_service.count_prompt(
+                start_goal_prompt,
                 goal=goal,
                 language=self.settings.language,
-            ).to_string(),
+            ),
         )
         #用于封装对语言模型的调用，并处理可能的错误   completion变量的类型是str 是对话完返回的文本结果
         completion = await call_model_with_handling(
             self.model,
-            ChatPromptTemplate.from_messages(
-                [SystemMessagePromptTemplate(prompt=start_goal_prompt)]
-            ),
+            start_goal_chain,
             {"goal": goal, "language": self.settings.language},
             settings=self.settings,
+            cache=self.completion_cache,
+            llm_kwargs=budget.llm_kwargs,
             callbacks=self.callbacks,
         )
 
@@ -90,25 +113,99 @@ class OpenAIAgentService(AgentService):
     async def analyze_task_agent(
         self, *, goal: str, task: str, tool_names: List[str]
     ) -> Analysis:
+        if platform_settings.speculative_analysis_enabled:
+            key = self._speculation_key(goal, task, tool_names)
+            if analysis := await speculative_analyses.pop(key):
+                return analysis
+
         user_tools = await get_user_tools(tool_names, self.user, self.oauth_crud)
-        functions = list(map(get_tool_function, user_tools))
+        return await self._analyze_task(goal, task, user_tools)
+
+    async def prefetch_analyses(
+        self, *, run_id: str, goal: str, tasks: List[str], tool_names: List[str]
+    ) -> None:
+        """
+        Starts analyzing the next queued tasks in the background.
+        Tools are resolved here so the speculation never touches the request's
+        database session.
+        """
+        tasks = tasks[: platform_settings.speculative_analysis_depth]
+        if not platform_settings.speculative_analysis_enabled or not tasks:
+            return
+
+        user_tools = await get_user_tools(tool_names, self.user, self.oauth_crud)
+        for task in tasks:
+            speculative_analyses.schedule(
+                self._speculation_key(goal, task, tool_names),
+                run_key=run_id,
+                analyze=partial(self._analyze_task, goal, task, user_tools),
+            )
+
+    def _speculation_key(self, goal: str, task: str, tool_names: List[str]) -> str:
+        return speculation_key(
+            str(self.user.id),
+            self.settings.model,
+            self.settings.language,
+            goal,
+            task,
+            tool_names=tool_names,
+        )
+
+    async def analyze_tasks_agent(
+        self, *, goal: str, tasks: List[str], tool_names: List[str]
+    ) -> AnalysisBatch:
+        user_tools = await get_user_tools(tool_names, self.user, self.oauth_crud)
+        semaphore = asyncio.Semaphore(platform_settings.max_concurrent_analyses)
+
+        async def analyze(task: str) -> Union[Analysis, PlatformaticError]:
+            async with semaphore:
+                try:
+                    return await self._analyze_task(goal, task, user_tools)
+                except PlatformaticError as e:
+                    return e
+
+        results = await asyncio.gather(*(analyze(task) for task in tasks))
+
+        return AnalysisBatch(
+            analyses=[r if isinstance(r, Analysis) else None for r in results],
+            errors=[
+                AnalysisError(index=i, error=r.__class__.__name__, detail=r.detail)
+                for i, r in enumerate(results)
+                if isinstance(r, PlatformaticError)
+            ],
+        )
+
+    async def _analyze_task(
+        self, goal: str, task: str, user_tools: List[Type[Tool]]
+    ) -> Analysis:
+        functions, tool_tokens = function_specs.assemble(
+            user_tools, self.token_service
+        )
         prompt = analyze_task_prompt.format_prompt(
             goal=goal,
             task=task,
             language=self.settings.language,
         )
 
-        self.token_service.calculate_max_tokens(
+        budget = self.token_service.plan(
+            "analyze",
             self.model,
-            prompt.to_string(),
-            str(functions),
+            prompt_tokens=self.token_service.count_prompt(
+                analyze_task_prompt,
+                goal=goal,
+                task=task,
+                language=self.settings.language,
+            ),
+            tool_tokens=tool_tokens,
         )
 
-        message = await openai_error_handler(
-            func=self.model.apredict_messages,
-            messages=prompt.to_messages(),
+        message = await predict_messages_with_handling(
+            self.model,
+            prompt.to_messages(),
             functions=functions,
             settings=self.settings,
+            cache=self.completion_cache,
+            llm_kwargs=budget.llm_kwargs,
             callbacks=self.callbacks,
         )
 
@@ -132,12 +229,21 @@ class OpenAIAgentService(AgentService):
         task: str,
         analysis: Analysis,
     ) -> StreamingResponse:
-        # TODO: More mature way of calculating max_tokens
-        if self.model.max_tokens > 3000:
-            self.model.max_tokens = max(self.model.max_tokens - 1000, 3000)
+        # Tools build their prompts from results fetched during the call, so
+        # only the inputs are known here and the tool context is reserved
+        budget = self.token_service.plan(
+            "execute",
+            self.model,
+            prompt_tokens=sum(
+                self.token_service.count_batch([goal, task, analysis.arg])
+            )
+            + TOOL_CONTEXT_RESERVE_TOKENS,
+        )
 
         tool_class = get_tool_from_name(analysis.action)
-        return await tool_class(self.model, self.settings.language).call(
+        return await tool_class(
+            self.model, self.settings.language, budget.llm_kwargs
+        ).call(
             goal,
             task,
             analysis.arg,
@@ -154,10 +260,6 @@ class OpenAIAgentService(AgentService):
         result: str,
         completed_tasks: Optional[List[str]] = None,
     ) -> List[str]:
-        prompt = ChatPromptTemplate.from_messages(
-            [SystemMessagePromptTemplate(prompt=create_tasks_prompt)]
-        )
-
         args = {
             "goal": goal,
             "language": self.settings.language,
@@ -166,12 +268,20 @@ class OpenAIAgentService(AgentService):
             "result": result,
         }
 
-        self.token_service.calculate_max_tokens(
-            self.model, prompt.format_prompt(**args).to_string()
+        budget = self.token_service.plan(
+            "create",
+            self.model,
+            prompt_tokens=self.token_service.count_prompt(create_tasks_prompt, **args),
         )
 
         completion = await call_model_with_handling(
-            self.model, prompt, args, settings=self.settings, callbacks=self.callbacks
+            self.model,
+            create_tasks_chain,
+            args,
+            settings=self.settings,
+            cache=self.completion_cache,
+            llm_kwargs=budget.llm_kwargs,
+            callbacks=self.callbacks,
         )
 
         previous_tasks = (completed_tasks or []) + tasks
@@ -183,12 +293,25 @@ class OpenAIAgentService(AgentService):
         goal: str,
         results: List[str],
     ) -> FastAPIStreamingResponse:
-        self.model.model_name = "gpt-3.5-turbo-16k"
-        self.model.max_tokens = 8000  # Total tokens = prompt tokens + completion tokens
+        completion_tokens = max(self.model.max_tokens, SUMMARY_MIN_COMPLETION_TOKENS)
+        prompt_tokens = self.token_service.count_prompt(
+            summarize_prompt, goal=goal, language=self.settings.language
+        )
 
-        snippet_max_tokens = 7000  # Leave room for the rest of the prompt
-        text_tokens = self.token_service.tokenize("".join(results))
-        text = self.token_service.detokenize(text_tokens[0:snippet_max_tokens])
+        text = self.token_service.truncate(
+            results,
+            self.token_service.get_input_space(
+                LONG_CONTEXT_MODEL, prompt_tokens, completion_tokens
+            ),
+        )
+        budget = self.token_service.plan(
+            "summarize",
+            self.model,
+            prompt_tokens=prompt_tokens + self.token_service.count(text),
+            completion_tokens=completion_tokens,
+            trimmed=len(text) < sum(map(len, results)),
+            model_name=LONG_CONTEXT_MODEL,
+        )
         logger.info(f"Summarizing text: {text}")
 
         return summarize(
@@ -196,6 +319,7 @@ class OpenAIAgentService(AgentService):
             language=self.settings.language,
             goal=goal,
             text=text,
+            llm_kwargs=budget.llm_kwargs,
         )
 
     async def chat(
@@ -204,23 +328,35 @@ class OpenAIAgentService(AgentService):
         message: str,
         results: List[str],
     ) -> FastAPIStreamingResponse:
-        self.model.model_name = "gpt-3.5-turbo-16k"
-        prompt = ChatPromptTemplate.from_messages(   
+        prompt_tokens = self.token_service.count_prompt(
+            chat_prompt, language=self.settings.language
+        ) + self.token_service.count(message)
+
+        # Keep the most recent results the context can hold
+        kept_results = self.token_service.fit_latest(
+            results,
+            self.token_service.get_input_space(
+                LONG_CONTEXT_MODEL, prompt_tokens, self.model.max_tokens
+            ),
+        )
+        budget = self.token_service.plan(
+            "chat",
+            self.model,
+            prompt_tokens=prompt_tokens
+            + sum(self.token_service.count_batch(kept_results)),
+            trimmed=kept_results != results,
+            model_name=LONG_CONTEXT_MODEL,
+        )
+
+        prompt = ChatPromptTemplate.from_messages(
             [
                 SystemMessagePromptTemplate(prompt=chat_prompt),
-                *[HumanMessage(content=result) for result in results],
+                *[HumanMessage(content=result) for result in kept_results],
                 HumanMessage(content=message),
             ]
         )
 
-        self.token_service.calculate_max_tokens(
-            self.model,
-            prompt.format_prompt(
-                language=self.settings.language,
-            ).to_string(),
-        )
-
-        chain = LLMChain(llm=self.model, prompt=prompt)
+        chain = LLMChain(llm=self.model, prompt=prompt, llm_kwargs=budget.llm_kwargs)
 
         return StreamingResponse.from_chain(
             chain,
@@ -2,6 +2,8 @@ from typing import Dict
 
 from pydantic import BaseModel, validator
 
+from reworkd_platform.web.api.agent.tools.registry import get_tool_name, tool_registry
+
 
 class AnalysisArguments(BaseModel):
     """
@@ -17,17 +19,14 @@ class Analysis(AnalysisArguments):
 
     @validator("action")
     def action_must_be_valid_tool(cls, v: str) -> str:
-        # TODO: Remove circular import
-        from reworkd_platform.web.api.agent.tools.tools import get_available_tools_names
-
-        if v not in get_available_tools_names():
+        if not tool_registry.is_valid(v):
             raise ValueError(f"Analysis action '{v}' is not a valid tool")
         return v
 
     @validator("action")
     def search_action_must_have_arg(cls, v: str, values: Dict[str, str]) -> str:
+        # Tools import the schemas, which import the analysis
         from reworkd_platform.web.api.agent.tools.search import Search
-        from reworkd_platform.web.api.agent.tools.tools import get_tool_name
 
         if v == get_tool_name(Search) and not values["arg"]:
             raise ValueError("Analysis arg cannot be empty if action is 'search'")
@@ -35,11 +34,8 @@ class Analysis(AnalysisArguments):
 
     @classmethod
     def get_default_analysis(cls, task: str) -> "Analysis":
-        # TODO: Remove circular import
-        from reworkd_platform.web.api.agent.tools.tools import get_default_tool_name
-
         return cls(
             reasoning="Hmm... I'll try searching it up",
-            action=get_default_tool_name(),
+            action=get_tool_name(tool_registry.default),
             arg=task,
         )
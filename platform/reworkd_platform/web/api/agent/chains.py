@@ -0,0 +1,46 @@
+from typing import Any
+
+from langchain import LLMChain
+from langchain.prompts import ChatPromptTemplate, SystemMessagePromptTemplate
+from langchain.schema import BasePromptTemplate
+from langchain.schema.language_model import BaseLanguageModel
+
+from reworkd_platform.web.api.agent.prompts import (
+    code_prompt,
+    create_tasks_prompt,
+    execute_task_prompt,
+    start_goal_prompt,
+    summarize_prompt,
+    summarize_sid_prompt,
+    summarize_with_sources_prompt,
+)
+
+
+class ChainTemplate:
+    """
+    LLMChain for a fixed prompt, bound to the model of a request per call.
+    Binding constructs the chain without validation and keeps no reference to
+    the model. Parameters of the call, such as its max_tokens, are sent with
+    the model call; the inputs are passed when the bound chain is run.
+    """
+
+    def __init__(self, prompt: BasePromptTemplate):
+        self.prompt = prompt
+
+    def bind(self, llm: BaseLanguageModel, **llm_kwargs: Any) -> LLMChain:
+        return LLMChain.construct(llm=llm, prompt=self.prompt, llm_kwargs=llm_kwargs)
+
+
+def _system_prompt(prompt: BasePromptTemplate) -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages(
+        [SystemMessagePromptTemplate(prompt=prompt)]
+    )
+
+
+start_goal_chain = ChainTemplate(_system_prompt(start_goal_prompt))
+create_tasks_chain = ChainTemplate(_system_prompt(create_tasks_prompt))
+execute_task_chain = ChainTemplate(execute_task_prompt)
+code_chain = ChainTemplate(code_prompt)
+summarize_chain = ChainTemplate(summarize_prompt)
+summarize_with_sources_chain = ChainTemplate(summarize_with_sources_prompt)
+summarize_sid_chain = ChainTemplate(summarize_sid_prompt)
@@ -1,34 +1,70 @@
-from typing import TypeVar
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, AsyncIterator, Callable, Optional, TypeVar
 
 from fastapi import Body, Depends
 #用 SQLAlchemy 进行数据库操作
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from reworkd_platform.db.crud.agent import AgentCRUD
-from reworkd_platform.db.dependencies import get_db_session
+from reworkd_platform.db.dependencies import get_db_session, get_db_session_factory
 from reworkd_platform.schemas.agent import (
     AgentChat,
+    AgentLoop,
+    AgentLoopCreate,
     AgentRun,
     AgentRunCreate,
     AgentSummarize,
     AgentTaskAnalyze,
+    AgentTaskAnalyzeBatch,
     AgentTaskCreate,
     AgentTaskExecute,
     Loop_Step,
 )
 from reworkd_platform.schemas.user import UserBase
+from reworkd_platform.services.task_writer.dependencies import get_task_writer
+from reworkd_platform.services.task_writer.writer import AgentTaskWriter
 from reworkd_platform.web.api.dependencies import get_current_user
 #泛型类型 T, T 可以是 AgentTaskAnalyze, AgentTaskExecute ..AgentChat等
 T = TypeVar(
-    "T", AgentTaskAnalyze, AgentTaskExecute, AgentTaskCreate, AgentSummarize, AgentChat
+    "T",
+    AgentTaskAnalyze,
+    AgentTaskAnalyzeBatch,
+    AgentTaskExecute,
+    AgentTaskCreate,
+    AgentSummarize,
+    AgentChat,
 )
 
 
 def agent_crud(
     user: UserBase = Depends(get_current_user),
     session: AsyncSession = Depends(get_db_session),
+    writer: Optional[AgentTaskWriter] = Depends(get_task_writer),
 ) -> AgentCRUD:
-    return AgentCRUD(session, user)
+    return AgentCRUD(session, user, writer)
+
+
+AgentCRUDFactory = Callable[[], AsyncContextManager[AgentCRUD]]
+
+
+def agent_crud_factory(
+    user: UserBase = Depends(get_current_user),
+    session_factory: "async_sessionmaker[AsyncSession]" = Depends(
+        get_db_session_factory
+    ),
+    writer: Optional[AgentTaskWriter] = Depends(get_task_writer),
+) -> AgentCRUDFactory:
+    """
+    AgentCRUDs on short-lived sessions committed on exit, for streamed
+    responses that would otherwise hold the request's connection throughout
+    """
+
+    @asynccontextmanager
+    async def create_crud() -> AsyncIterator[AgentCRUD]:
+        async with session_factory() as session, session.begin():
+            yield AgentCRUD(session, user, writer)
+
+    return create_crud
 
 
 async def agent_start_validator(
@@ -45,9 +81,24 @@ async def agent_start_validator(
     id_ = (await crud.create_run(body.goal)).id
     return AgentRun(**body.dict(), run_id=str(id_))
 
+
+async def agent_loop_validator(
+    body: AgentLoopCreate = Body(
+        example={
+            "goal": "Create business plan for a bagel company",
+            "tool_names": ["search"],
+        },
+    ),
+    crud: AgentCRUD = Depends(agent_crud),
+) -> AgentLoop:
+    id_ = (await crud.create_run(body.goal)).id
+    return AgentLoop(**body.dict(), run_id=str(id_))
+
 #通用的验证函数 validate ， crud: 一个 AgentCRUD 实例 ，type_: 一个 Loop_Step 类型的值，用于指定任务的类型
-async def validate(body: T, crud: AgentCRUD, type_: Loop_Step) -> T:
-    body.run_id = (await crud.create_task(body.run_id, type_)).id
+async def validate(body: T, crud: AgentCRUD, type_: Loop_Step, steps: int = 1) -> T:
+    # Every step is recorded or none is. run_id stays the run's id, which
+    # speculation is capped by
+    await crud.create_tasks(body.run_id, type_, steps)
     return body
 
 
@@ -58,6 +109,19 @@ async def agent_analyze_validator(
     return await validate(body, crud, "analyze")
 
 
+async def agent_analyze_batch_validator(
+    body: AgentTaskAnalyzeBatch = Body(
+        example={
+            "goal": "Create business plan for a bagel company",
+            "run_id": "<run id>",
+            "tasks": ["bagel market size", "bagel shop startup costs"],
+        },
+    ),
+    crud: AgentCRUD = Depends(agent_crud),
+) -> AgentTaskAnalyzeBatch:
+    return await validate(body, crud, "analyze", steps=len(body.tasks))
+
+
 #验证并处理一个执行任务(AgentTaskExecute)
 async def agent_execute_validator(
     body: AgentTaskExecute = Body(
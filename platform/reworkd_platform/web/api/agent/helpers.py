@@ -1,8 +1,12 @@
-from typing import Any, Callable, Dict, TypeVar
+from typing import Any, Callable, Dict, List, Optional, TypeVar
 
-from langchain import BasePromptTemplate, LLMChain
 from langchain.chat_models.base import BaseChatModel
-from langchain.schema import BaseOutputParser, OutputParserException
+from langchain.schema import (
+    AIMessage,
+    BaseMessage,
+    BaseOutputParser,
+    OutputParserException,
+)
 from openai.error import (
     AuthenticationError,
     InvalidRequestError,
@@ -11,10 +15,16 @@ from openai.error import (
 )
 
 from reworkd_platform.schemas.agent import ModelSettings
-from reworkd_platform.web.api.errors import OpenAIError
+from reworkd_platform.services.completion_cache.cache import CompletionCache
+from reworkd_platform.services.singleflight import SingleFlight
+from reworkd_platform.web.api.agent.chains import ChainTemplate
+from reworkd_platform.web.api.errors import OpenAIError, PlatformaticError
 
 T = TypeVar("T")
 
+# Identical concurrent deterministic completions share one model call
+completion_flight = SingleFlight("completion")
+
 
 def parse_with_handling(parser: BaseOutputParser[T], completion: str) -> T:
     try:
@@ -30,6 +40,8 @@ async def openai_error_handler(
 ) -> Any:
     try:
         return await func(*args, **kwargs)
+    except PlatformaticError:
+        raise
     except ServiceUnavailableError as e:
         raise OpenAIError(
             e,
@@ -68,13 +80,108 @@ async def openai_error_handler(
 async def call_model_with_handling(
     #函数签名
     model: BaseChatModel,
-    prompt: BasePromptTemplate,
+    chain_template: ChainTemplate,
     args: Dict[str, str],
     settings: ModelSettings,
+    cache: Optional[CompletionCache] = None,
+    llm_kwargs: Optional[Dict[str, Any]] = None,
     #其他可选参数
     **kwargs: Any,
 ) -> str:
-    #传递语言模型和提示模板实例来创建 LLMChain实例
-    chain = LLMChain(llm=model, prompt=prompt)
-    #调用 openai_error_handler 函数来执行链的运行并处理可能的错误
-    return await openai_error_handler(chain.arun, args, settings=settings, **kwargs)
+    llm_kwargs = llm_kwargs or {}
+    messages = chain_template.prompt.format_prompt(**args).to_messages()
+    key = _get_cache_key(model, settings, cache, messages, llm_kwargs=llm_kwargs)
+    if cache and key and (cached := await cache.aget(key)) is not None:
+        return cached
+
+    async def complete() -> str:
+        #将预先构建的 LLMChain 绑定到语言模型
+        chain = chain_template.bind(model, **llm_kwargs)
+        #调用 openai_error_handler 函数来执行链的运行并处理可能的错误
+        completion = await openai_error_handler(
+            chain.arun, args, settings=settings, **kwargs
+        )
+
+        if cache and key:
+            await cache.aset(key, completion)
+        return completion
+
+    # Only deterministic completions are shared. Coalesced callers receive the
+    # result without their callbacks being invoked.
+    if getattr(model, "temperature", settings.temperature) == 0:
+        flight_key = (
+            CompletionCache.create_key(
+                **_call_params(model, settings, llm_kwargs),
+                temperature=0,
+                messages=messages,
+            ),
+            settings.custom_api_key,
+        )
+        return await completion_flight.do(flight_key, complete)
+
+    return await complete()
+
+
+async def predict_messages_with_handling(
+    model: BaseChatModel,
+    messages: List[BaseMessage],
+    settings: ModelSettings,
+    functions: Optional[List[Dict[str, Any]]] = None,
+    cache: Optional[CompletionCache] = None,
+    llm_kwargs: Optional[Dict[str, Any]] = None,
+    **kwargs: Any,
+) -> BaseMessage:
+    llm_kwargs = llm_kwargs or {}
+    key = _get_cache_key(model, settings, cache, messages, functions, llm_kwargs)
+    if cache and key and (cached := await cache.aget(key)) is not None:
+        return AIMessage(**cached)
+
+    message = await openai_error_handler(
+        func=model.apredict_messages,
+        messages=messages,
+        functions=functions,
+        settings=settings,
+        **llm_kwargs,
+        **kwargs,
+    )
+
+    if cache and key:
+        await cache.aset(
+            key,
+            {"content": message.content, "additional_kwargs": message.additional_kwargs},
+        )
+    return message
+
+
+def _get_cache_key(
+    model: BaseChatModel,
+    settings: ModelSettings,
+    cache: Optional[CompletionCache],
+    messages: List[BaseMessage],
+    functions: Optional[List[Dict[str, Any]]] = None,
+    llm_kwargs: Optional[Dict[str, Any]] = None,
+) -> Optional[str]:
+    temperature = getattr(model, "temperature", settings.temperature)
+    if not cache or not cache.should_cache(temperature, settings.use_cache):
+        return None
+
+    return cache.create_key(
+        **_call_params(model, settings, llm_kwargs or {}),
+        temperature=temperature,
+        messages=messages,
+        functions=functions,
+    )
+
+
+def _call_params(
+    model: BaseChatModel, settings: ModelSettings, llm_kwargs: Dict[str, Any]
+) -> Dict[str, Any]:
+    """The model and max_tokens a call is made with, its own overriding the model's"""
+    return {
+        "model_name": llm_kwargs.get(
+            "model", getattr(model, "model_name", settings.model)
+        ),
+        "max_tokens": llm_kwargs.get(
+            "max_tokens", getattr(model, "max_tokens", settings.max_tokens)
+        ),
+    }
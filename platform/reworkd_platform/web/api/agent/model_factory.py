@@ -1,11 +1,19 @@
-from typing import Any, Dict, Optional, Tuple, Type, Union
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
 
+import openai
+from langchain.callbacks.manager import AsyncCallbackManagerForLLMRun
 from langchain.chat_models import AzureChatOpenAI, ChatOpenAI
+from langchain.schema import BaseMessage, ChatResult
 from pydantic import Field
 
 from reworkd_platform.schemas.agent import LLM_Model, ModelSettings
 from reworkd_platform.schemas.user import UserBase
+from reworkd_platform.services.http_client.session import get_llm_session
+from reworkd_platform.services.metrics import metrics
 from reworkd_platform.settings import Settings
+from reworkd_platform.settings import settings as platform_settings
 
 
 class WrappedChatOpenAI(ChatOpenAI):
@@ -15,6 +23,53 @@ class WrappedChatOpenAI(ChatOpenAI):
     )
     max_tokens: int
     model_name: LLM_Model = Field(alias="model")
+    rate_limiter: Any = Field(
+        default=None,
+        description="RateLimiter every completion is budgeted against",
+    )
+    rate_limit_key: str = "default"  # Calls are queued fairly per key
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        # Without a session the openai client opens a new one for every call
+        openai.aiosession.set(get_llm_session())
+        if not self.rate_limiter:
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+        # langchain retries by calling the client again, so every attempt is
+        # budgeted by handing it a client that acquires before each request
+        tokens = self.rate_limiter.estimate(
+            messages, kwargs.get("max_tokens", self.max_tokens)
+        )
+        client = BudgetedClient(
+            self.client, self.rate_limiter, self.rate_limit_key, tokens
+        )
+        budgeted = self.copy(update={"client": client})
+        return await super(WrappedChatOpenAI, budgeted)._agenerate(
+            messages, stop, run_manager, **kwargs
+        )
+
+
+class BudgetedClient:
+    """OpenAI client acquiring from the rate limiter before every request"""
+
+    def __init__(self, client: Any, rate_limiter: Any, key: str, tokens: int):
+        self.client = client
+        self.rate_limiter = rate_limiter
+        self.key = key
+        self.tokens = tokens
+
+    async def acreate(self, **kwargs: Any) -> Any:
+        await self.rate_limiter.acquire(self.key, self.tokens)
+        return await self.client.acreate(**kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
 
 
 class WrappedAzureChatOpenAI(AzureChatOpenAI, WrappedChatOpenAI):
@@ -25,6 +80,40 @@ class WrappedAzureChatOpenAI(AzureChatOpenAI, WrappedChatOpenAI):
 
 WrappedChat = Union[WrappedAzureChatOpenAI, WrappedChatOpenAI]
 
+# API base, API key, model, streaming and, for Azure, the API version
+ModelKey = Tuple[str, str, str, bool, Optional[str]]
+
+
+class ModelPool:
+    """
+    Per-worker pool of validated chat models keyed by how they reach the API.
+    Requests get a shallow copy carrying their own parameters, which skips
+    pydantic validation and leaves the pooled models untouched.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._models: "OrderedDict[ModelKey, WrappedChat]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: ModelKey, build: Callable[[], WrappedChat]) -> WrappedChat:
+        with self._lock:
+            if (model := self._models.get(key)) is not None:
+                self._models.move_to_end(key)
+                metrics.increment("model_pool.hit")
+                return model
+
+        metrics.increment("model_pool.miss")
+        model = build()
+        with self._lock:
+            self._models[key] = model
+            while len(self._models) > self.max_size:
+                self._models.popitem(last=False)
+        return model
+
+
+model_pool = ModelPool(max_size=platform_settings.llm_client_pool_size)
+
 
 def create_model(
     settings: Settings,
@@ -32,23 +121,59 @@ def create_model(
     user: UserBase,
     streaming: bool = False,
     force_model: Optional[LLM_Model] = None,
+    rate_limiter: Optional[Any] = None,
+    pool: Optional[ModelPool] = None,
 ) -> WrappedChat:
     use_azure = (
         not model_settings.custom_api_key and "azure" in settings.openai_api_base
     )
 
     llm_model = force_model or model_settings.model
-    model: Type[WrappedChat] = WrappedChatOpenAI
     base, headers, use_helicone = get_base_and_headers(settings, model_settings, user)
+    api_key = model_settings.custom_api_key or settings.openai_api_key
+    key: ModelKey = (
+        base,
+        api_key,
+        llm_model,
+        streaming,
+        settings.openai_api_version if use_azure else None,
+    )
+
+    model = (pool or model_pool).get(
+        key,
+        lambda: _build_model(
+            settings, llm_model, base, api_key, streaming, use_azure, use_helicone
+        ),
+    )
+    return model.copy(
+        update={
+            "temperature": model_settings.temperature,
+            "max_tokens": model_settings.max_tokens,
+            "model_kwargs": {"user": user.email, "headers": headers},
+            # The platform's budget does not apply to users' own keys
+            "rate_limiter": None if model_settings.custom_api_key else rate_limiter,
+            "rate_limit_key": str(user.id),
+        }
+    )
+
+
+def _build_model(
+    settings: Settings,
+    llm_model: LLM_Model,
+    base: str,
+    api_key: str,
+    streaming: bool,
+    use_azure: bool,
+    use_helicone: bool,
+) -> WrappedChat:
+    model: Type[WrappedChat] = WrappedChatOpenAI
     kwargs = {
         "openai_api_base": base,
-        "openai_api_key": model_settings.custom_api_key or settings.openai_api_key,
-        "temperature": model_settings.temperature,
+        "openai_api_key": api_key,
         "model": llm_model,
-        "max_tokens": model_settings.max_tokens,
+        "max_tokens": 1,  # Set per request
         "streaming": streaming,
         "max_retries": 5,
-        "model_kwargs": {"user": user.email, "headers": headers},
     }
 
     if use_azure:
@@ -0,0 +1,112 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.settings import settings
+from reworkd_platform.web.api.agent.analysis import Analysis
+
+MAX_TRACKED_RUNS = 10_000
+
+
+def speculation_key(*parts: str, tool_names: Optional[List[str]] = None) -> str:
+    payload = json.dumps([parts, sorted(tool_names or [])])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Speculation:
+    task: "asyncio.Task[Optional[Analysis]]"
+    created: float
+
+
+class SpeculativeAnalyses:
+    """
+    Short-lived cache of analyses started before they were requested.
+    While a task executes, the analyses of the next queued tasks are computed in
+    the background so the following analyze call can return immediately.
+    Speculation is capped per run and globally; entries that expire without
+    being consumed are counted as wasted. The cache is per worker.
+    """
+
+    def __init__(self, ttl: float, max_per_run: int, max_in_flight: int):
+        self.ttl = ttl
+        self.max_per_run = max_per_run
+        self.max_in_flight = max_in_flight
+        self._entries: Dict[str, Speculation] = {}
+        self._runs: "OrderedDict[str, int]" = OrderedDict()
+
+    def schedule(
+        self, key: str, run_key: str, analyze: Callable[[], Awaitable[Analysis]]
+    ) -> bool:
+        self._expire()
+        if key in self._entries:
+            return False
+
+        spent = self._runs.get(run_key, 0)
+        if spent >= self.max_per_run or self._in_flight() >= self.max_in_flight:
+            metrics.increment("speculation.skipped")
+            return False
+
+        self._runs[run_key] = spent + 1
+        self._runs.move_to_end(run_key)
+        if len(self._runs) > MAX_TRACKED_RUNS:
+            self._runs.popitem(last=False)
+
+        task = asyncio.create_task(self._run(analyze))
+        self._entries[key] = Speculation(task=task, created=time.monotonic())
+        metrics.increment("speculation.started")
+        return True
+
+    async def pop(self, key: str) -> Optional[Analysis]:
+        self._expire()
+        if (entry := self._entries.pop(key, None)) is None:
+            metrics.increment("speculation.miss")
+            return None
+
+        # Shielded so a cancelled request does not cancel the shared analysis
+        analysis = await asyncio.shield(entry.task)
+        if analysis is None:
+            metrics.increment("speculation.wasted")
+            return None
+
+        metrics.increment("speculation.hit")
+        return analysis
+
+    def clear(self) -> None:
+        for entry in self._entries.values():
+            entry.task.cancel()
+        self._entries.clear()
+        self._runs.clear()
+
+    @staticmethod
+    async def _run(analyze: Callable[[], Awaitable[Analysis]]) -> Optional[Analysis]:
+        try:
+            return await analyze()
+        except Exception as e:
+            logger.warning(f"Speculative analysis failed: {e}")
+            return None
+
+    def _in_flight(self) -> int:
+        return sum(1 for entry in self._entries.values() if not entry.task.done())
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        expired = [k for k, v in self._entries.items() if now - v.created > self.ttl]
+
+        for key in expired:
+            self._entries.pop(key).task.cancel()
+            metrics.increment("speculation.wasted")
+
+
+speculative_analyses = SpeculativeAnalyses(
+    ttl=settings.speculative_analysis_ttl,
+    max_per_run=settings.speculative_analysis_max_per_run,
+    max_in_flight=settings.speculative_analysis_max_in_flight,
+)
@@ -0,0 +1,53 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.settings import settings
+
+MAX_TRACKED_USERS = 10_000
+
+
+class AvailabilityCache:
+    """
+    Short lived cache of per-user dynamic tool availability.
+    Entries are shared across requests of a worker and dropped when an OAuth
+    installation of the user changes. Other workers only see the change once
+    their entries expire, so the TTL should stay short. A TTL of 0 disables it.
+    """
+
+    def __init__(self, ttl: float, max_users: int = MAX_TRACKED_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._users: "OrderedDict[str, Dict[str, Tuple[bool, float]]]" = OrderedDict()
+
+    def get(self, user_id: str, tool_name: str) -> Optional[bool]:
+        if self.ttl <= 0:
+            return None
+
+        entry = self._users.get(user_id, {}).get(tool_name)
+        if entry is None or entry[1] < time.monotonic():
+            metrics.increment("tool_availability.miss")
+            return None
+
+        metrics.increment("tool_availability.hit")
+        return entry[0]
+
+    def set(self, user_id: str, tool_name: str, available: bool) -> None:
+        if self.ttl <= 0:
+            return
+
+        tools = self._users.setdefault(user_id, {})
+        tools[tool_name] = (available, time.monotonic() + self.ttl)
+        self._users.move_to_end(user_id)
+        if len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._users.clear()
+
+
+availability_cache = AvailabilityCache(ttl=settings.tool_availability_ttl)
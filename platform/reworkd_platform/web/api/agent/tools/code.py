@@ -2,8 +2,8 @@ from typing import Any
 
 from fastapi.responses import StreamingResponse as FastAPIStreamingResponse
 from lanarky.responses import StreamingResponse
-from langchain import LLMChain
 
+from reworkd_platform.web.api.agent.chains import code_chain
 from reworkd_platform.web.api.agent.tools.tool import Tool
 
 #这个可以替换为 自定义工具
@@ -14,9 +14,7 @@ class Code(Tool):
     async def call(
         self, goal: str, task: str, input_str: str, *args: Any, **kwargs: Any
     ) -> FastAPIStreamingResponse:
-        from reworkd_platform.web.api.agent.prompts import code_prompt
-
-        chain = LLMChain(llm=self.model, prompt=code_prompt)
+        chain = code_chain.bind(self.model, **self.llm_kwargs)
 
         return StreamingResponse.from_chain(
             chain,
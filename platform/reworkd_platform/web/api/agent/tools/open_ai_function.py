@@ -1,5 +1,9 @@
-from typing import Type, TypedDict
+import json
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Hashable, List, Tuple, Type, TypedDict
 
+from reworkd_platform.services.tokenizer.token_service import TokenService
 from reworkd_platform.web.api.agent.tools.tool import Tool
 from reworkd_platform.web.api.agent.tools.tools import get_tool_name
 
@@ -41,3 +45,63 @@ def get_tool_function(tool: Type[Tool]) -> FunctionDescription:
             "required": ["reasoning", "arg"],
         },
     }
+
+
+@dataclass(frozen=True)
+class FunctionSpec:
+    """A tool's function specification with its serialized form and token cost"""
+
+    function: FunctionDescription
+    json: str
+    tokens: int
+
+
+class FunctionSpecRegistry:
+    """
+    Builds each tool's function specification once per encoding.
+    The specification is serialized to the JSON sent to the API and its exact
+    token count is stored with it, so assembling the functions of a request is
+    a lookup per tool and a sum.
+    """
+
+    def __init__(self) -> None:
+        self._specs: Dict[Tuple[Type[Tool], Hashable], FunctionSpec] = {}
+        self._lock = Lock()
+
+    def get(self, tool: Type[Tool], token_service: TokenService) -> FunctionSpec:
+        key = (tool, token_service.encoding.name)
+        if (spec := self._specs.get(key)) is not None:
+            return spec
+
+        with self._lock:
+            if (spec := self._specs.get(key)) is None:
+                function = get_tool_function(tool)
+                serialized = json.dumps(function)
+                spec = FunctionSpec(
+                    function=function,
+                    json=serialized,
+                    tokens=token_service.count(serialized),
+                )
+                self._specs[key] = spec
+            return spec
+
+    def assemble(
+        self, tools: List[Type[Tool]], token_service: TokenService
+    ) -> Tuple[List[FunctionDescription], int]:
+        """
+        Functions of a request and their token cost.
+        The cost of the list is the cost of each specification plus one token
+        per separator or bracket of the JSON array.
+        """
+        specs = [self.get(tool, token_service) for tool in tools]
+        functions = [spec.function for spec in specs]
+        if not specs:
+            return functions, 0
+        return functions, sum(spec.tokens for spec in specs) + len(specs) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._specs.clear()
+
+
+function_specs = FunctionSpecRegistry()
@@ -2,8 +2,8 @@ from typing import Any
 
 from fastapi.responses import StreamingResponse as FastAPIStreamingResponse
 from lanarky.responses import StreamingResponse
-from langchain import LLMChain
 
+from reworkd_platform.web.api.agent.chains import execute_task_chain
 from reworkd_platform.web.api.agent.tools.tool import Tool
 
 #用的是大模型的推理功能
@@ -18,10 +18,8 @@ class Reason(Tool):
     async def call(
         self, goal: str, task: str, input_str: str, *args: Any, **kwargs: Any
     ) -> FastAPIStreamingResponse:
-        #导入 execute_task_prompt
-        from reworkd_platform.web.api.agent.prompts import execute_task_prompt
-        #也是用LangChain框架 创建 LLMChain 实例，传入语言模型和提示模板
-        chain = LLMChain(llm=self.model, prompt=execute_task_prompt)
+        #也是用LangChain框架 将预先构建的 LLMChain 绑定到语言模型
+        chain = execute_task_chain.bind(self.model, **self.llm_kwargs)
         #返回一个流式响应 调用 StreamingResponse.from_chain 方法
         return StreamingResponse.from_chain(
             chain,
@@ -0,0 +1,120 @@
+from importlib import import_module
+from importlib.metadata import entry_points
+from typing import TYPE_CHECKING, Dict, List, Optional, Type
+
+from loguru import logger
+
+if TYPE_CHECKING:  # Tools import the schemas, which import the analysis
+    from reworkd_platform.web.api.agent.tools.tool import Tool
+
+ENTRY_POINT_GROUP = "reworkd_platform.tools"
+BUILTIN_TOOLS_MODULE = "reworkd_platform.web.api.agent.tools.tools"
+
+
+def get_tool_name(tool: Type["Tool"]) -> str:
+    return format_tool_name(tool.__name__)
+
+
+def format_tool_name(tool_name: str) -> str:
+    return tool_name.lower()
+
+
+class ToolRegistry:
+    """
+    Index of the agent's tools by normalized name.
+    The built-in tools register themselves when the tools module is imported and
+    third party tools are loaded from the entry point group on startup. The
+    `available()` flags and the public tool list are computed once.
+    """
+
+    def __init__(self) -> None:
+        self._tools: Dict[str, Type["Tool"]] = {}
+        self._external: List[Type["Tool"]] = []
+        self._defaults: List[Type["Tool"]] = []
+        self._default: Optional[Type["Tool"]] = None
+        self._available: Dict[str, bool] = {}
+        self._public: Optional[List[Dict[str, Optional[str]]]] = None
+
+    def register(
+        self, tool: Type["Tool"], *, default: bool = False, fallback: bool = False
+    ) -> None:
+        """
+        Add a tool. Default tools are always given to the agent, and the fallback
+        is used for names that match no tool.
+        """
+        name = get_tool_name(tool)
+        if name in self._tools:
+            raise ValueError(f"Tool '{name}' is already registered")
+
+        self._tools[name] = tool
+        (self._defaults if default else self._external).append(tool)
+        if fallback:
+            self._default = tool
+        self._available.clear()
+        self._public = None
+
+    def load_entry_points(self) -> None:
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            try:
+                self.register(entry_point.load())
+            except Exception as e:
+                logger.warning(f"Failed to load tool '{entry_point.name}': {e}")
+
+    def get(self, name: str) -> Type["Tool"]:
+        tools = self._get_tools()
+        if (tool := tools.get(name)) is not None:
+            return tool
+        return tools.get(format_tool_name(name), self.default)
+
+    def is_valid(self, name: str) -> bool:
+        return name in self._get_tools()
+
+    def is_available(self, tool: Type["Tool"]) -> bool:
+        name = get_tool_name(tool)
+        if (available := self._available.get(name)) is None:
+            available = self._available[name] = tool.available()
+        return available
+
+    @property
+    def default(self) -> Type["Tool"]:
+        self._get_tools()
+        if self._default is None:
+            raise LookupError("No fallback tool is registered")
+        return self._default
+
+    @property
+    def external(self) -> List[Type["Tool"]]:
+        self._get_tools()
+        return self._external
+
+    @property
+    def defaults(self) -> List[Type["Tool"]]:
+        self._get_tools()
+        return self._defaults
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._get_tools())
+
+    def public_tools(self) -> List[Dict[str, Optional[str]]]:
+        """Payload of the external tools that are available to users"""
+        if self._public is None:
+            self._public = [
+                {
+                    "name": get_tool_name(tool),
+                    "description": tool.public_description,
+                    "color": "TODO: Change to image of tool",
+                    "image_url": tool.image_url,
+                }
+                for tool in self.external
+                if self.is_available(tool)
+            ]
+        return self._public
+
+    def _get_tools(self) -> Dict[str, Type["Tool"]]:
+        if not self._tools:
+            import_module(BUILTIN_TOOLS_MODULE)
+        return self._tools
+
+
+tool_registry = ToolRegistry()
@@ -1,11 +1,13 @@
+from functools import partial
 from typing import Any, List
 from urllib.parse import quote
-#用来异步http请求
-import aiohttp
 from aiohttp import ClientResponseError
 from fastapi.responses import StreamingResponse as FastAPIStreamingResponse
 from loguru import logger
 
+from reworkd_platform.services.http_client.session import get_session
+from reworkd_platform.services.search_cache.lifetime import get_search_cache
+from reworkd_platform.services.singleflight import SingleFlight
 from reworkd_platform.settings import settings
 from reworkd_platform.web.api.agent.stream_mock import stream_string
 from reworkd_platform.web.api.agent.tools.reason import Reason
@@ -18,11 +20,24 @@ from reworkd_platform.web.api.agent.tools.utils import (
 # Search google via serper.dev. Adapted from LangChain
 # https://github.com/hwchase17/langchain/blob/master/langchain/utilities
 
+# Identical concurrent queries share one Serper request
+serper_flight = SingleFlight("serper")
+
+GOOGLE_SEARCH_URL = "https://www.google.com/search?q="
+
+
 #使用Serper API执行Google搜索 并返回搜索结果
 async def _google_serper_search_results(
     #搜索的查询字符串，  搜索的类型 默认值为search
     search_term: str, search_type: str = "search"
 ) -> dict[str, Any]:   #函数签名
+    return await serper_flight.do(
+        (search_term, search_type),
+        partial(_fetch_serper_results, search_term, search_type),
+    )
+
+
+async def _fetch_serper_results(search_term: str, search_type: str) -> dict[str, Any]:
     headers = {
         "X-API-KEY": settings.serp_api_key or "",
         "Content-Type": "application/json",
@@ -30,16 +45,14 @@ async def _google_serper_search_results(
     params = {
         "q": search_term,
     }
-    #使用 aiohttp 创建一个异步会话，并发送 POST 请求
-    async with aiohttp.ClientSession() as session:
-        #发送 POST 请求到 Serper API，传递请求头和查询参数
-        async with session.post(
-            f"https://google.serper.dev/{search_type}", headers=headers, params=params
-        ) as response:
-            response.raise_for_status()
-            #解析响应 JSON 数据并返回结果
-            search_results = await response.json()
-            return search_results
+    #使用共享的连接池会话发送 POST 请求到 Serper API，传递请求头和查询参数
+    async with get_session().post(
+        f"https://google.serper.dev/{search_type}", headers=headers, params=params
+    ) as response:
+        response.raise_for_status()
+        #解析响应 JSON 数据并返回结果
+        search_results = await response.json()
+        return search_results
 
 
 class Search(Tool):
@@ -70,7 +83,7 @@ class Search(Tool):
             #记录异常
             logger.exception("Error calling Serper API, falling back to reasoning")
             #如果搜索失败，回退到 Reason 类进行推理
-            return await Reason(self.model, self.language).call(
+            return await Reason(self.model, self.language, self.llm_kwargs).call(
                 goal, task, input_str, *args, **kwargs
             )
 
@@ -78,51 +91,99 @@ class Search(Tool):
         self, goal: str, task: str, input_str: str, *args: Any, **kwargs: Any
     ) -> FastAPIStreamingResponse:
         #使用 Google 搜索工具
-        results = await _google_serper_search_results(
-            input_str,
-        )
-        # 返回5个
-        k = 5  # Number of results to return
-        snippets: List[CitedSnippet] = []
-        #检查搜索结果中是否包含 answerBox
-        if results.get("answerBox"):
-            answer_values = []
-            answer_box = results.get("answerBox", {})
-            #提取答案
-            if answer_box.get("answer"):
-                answer_values.append(answer_box.get("answer"))
-            #提取片段
-            elif answer_box.get("snippet"):
-                answer_values.append(answer_box.get("snippet").replace("\n", " "))
-            #提取高亮片段
-            elif answer_box.get("snippetHighlighted"):
-                answer_values.append(", ".join(answer_box.get("snippetHighlighted")))
-
-            if len(answer_values) > 0:
-                #添加到 snippets 列表中
-                snippets.append(
-                    CitedSnippet(
-                        len(snippets) + 1,
-                        "\n".join(answer_values),
-                        f"https://www.google.com/search?q={quote(input_str)}",
-                    )
-                )
-        #遍历 organic 结果
-        for i, result in enumerate(results["organic"][:k]):
-            texts = []
-            link = ""
-            #提取片段
-            if "snippet" in result:
-                texts.append(result["snippet"])
-            #提取链接
-            if "link" in result:
-                link = result["link"]
-            for attribute, value in result.get("attributes", {}).items():
-                texts.append(f"{attribute}: {value}.")
-            #添加到 snippets 列表
-            snippets.append(CitedSnippet(len(snippets) + 1, "\n".join(texts), link))
+        snippets = await _search_snippets(input_str)
         #没有找到搜索结果
         if len(snippets) == 0:
             return stream_string("No good Google Search Result was found", True)
         #根据搜索结果生成总结并返回流式响应
-        return summarize_with_sources(self.model, self.language, goal, task, snippets)
+        return summarize_with_sources(
+            self.model, self.language, goal, task, snippets, self.llm_kwargs
+        )
+
+
+async def _search_snippets(
+    query: str, search_type: str = "search"
+) -> List[CitedSnippet]:
+    """
+    Snippets for a query, served from the search cache when possible.
+    Expired entries are still served while Serper rate limits or fails.
+    """
+    cache = get_search_cache()
+    if cache and (snippets := await cache.aget(query, search_type)) is not None:
+        return _with_query(snippets, query)
+
+    try:
+        results = await _google_serper_search_results(query, search_type)
+    except ClientResponseError as e:
+        retryable = e.status == 429 or e.status >= 500
+        if retryable and cache:
+            if stale := await cache.aget_stale(query, search_type):
+                logger.warning(f"Serper returned {e.status}, serving cached results")
+                return _with_query(stale, query)
+        raise
+
+    snippets = _parse_snippets(results, query)
+    if cache and snippets:
+        await cache.aset(query, search_type, snippets)
+    return snippets
+
+
+def _with_query(snippets: List[CitedSnippet], query: str) -> List[CitedSnippet]:
+    """
+    Cached entries are shared by every spelling of a normalized query, so the
+    answer box link is rebuilt from the query of the current caller
+    """
+    return [
+        CitedSnippet(snippet.index, snippet.text, _google_search_url(query))
+        if snippet.url.startswith(GOOGLE_SEARCH_URL)
+        else snippet
+        for snippet in snippets
+    ]
+
+
+def _google_search_url(query: str) -> str:
+    return f"{GOOGLE_SEARCH_URL}{quote(query)}"
+
+
+def _parse_snippets(results: dict[str, Any], query: str) -> List[CitedSnippet]:
+    # 返回5个
+    k = 5  # Number of results to return
+    snippets: List[CitedSnippet] = []
+    #检查搜索结果中是否包含 answerBox
+    if results.get("answerBox"):
+        answer_values = []
+        answer_box = results.get("answerBox", {})
+        #提取答案
+        if answer_box.get("answer"):
+            answer_values.append(answer_box.get("answer"))
+        #提取片段
+        elif answer_box.get("snippet"):
+            answer_values.append(answer_box.get("snippet").replace("\n", " "))
+        #提取高亮片段
+        elif answer_box.get("snippetHighlighted"):
+            answer_values.append(", ".join(answer_box.get("snippetHighlighted")))
+
+        if len(answer_values) > 0:
+            #添加到 snippets 列表中
+            snippets.append(
+                CitedSnippet(
+                    len(snippets) + 1,
+                    "\n".join(answer_values),
+                    _google_search_url(query),
+                )
+            )
+    #遍历 organic 结果
+    for i, result in enumerate(results["organic"][:k]):
+        texts = []
+        link = ""
+        #提取片段
+        if "snippet" in result:
+            texts.append(result["snippet"])
+        #提取链接
+        if "link" in result:
+            link = result["link"]
+        for attribute, value in result.get("attributes", {}).items():
+            texts.append(f"{attribute}: {value}.")
+        #添加到 snippets 列表
+        snippets.append(CitedSnippet(len(snippets) + 1, "\n".join(texts), link))
+    return snippets
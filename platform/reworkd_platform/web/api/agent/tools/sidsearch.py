@@ -1,15 +1,22 @@
 import json
 from datetime import datetime, timedelta
-from typing import Any, List, Optional
+from functools import partial
+from typing import Any, Callable, List, Optional
 
-import aiohttp
 from fastapi.responses import StreamingResponse as FastAPIStreamingResponse
 from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from reworkd_platform.db.crud.oauth import OAuthCrud
 from reworkd_platform.db.models.auth import OauthCredentials
 from reworkd_platform.schemas.user import UserBase
+from reworkd_platform.services.http_client.session import get_session
 from reworkd_platform.services.security import encryption_service
+from reworkd_platform.services.singleflight import SingleFlight
+from reworkd_platform.services.token_refresher.tokens import (
+    TOKEN_REFRESH_MARGIN,
+    access_tokens,
+)
 from reworkd_platform.settings import settings
 from reworkd_platform.web.api.agent.stream_mock import stream_string
 from reworkd_platform.web.api.agent.tools.tool import Tool
@@ -17,6 +24,11 @@ from reworkd_platform.web.api.agent.tools.utils import Snippet, summarize_sid
 
 from reworkd_platform.web.api.agent.tools.search import Search
 
+# One token exchange per installation at a time, since a refresh token that is
+# exchanged twice may be revoked. Detached, so a caller going away cannot
+# abort an exchange between the provider rotating the token and it being saved
+sid_refresh_flight = SingleFlight("sid_refresh", detached=True)
+
 
 async def _sid_search_results(
     search_term: str, limit: int, token: str
@@ -24,15 +36,14 @@ async def _sid_search_results(
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
     data = {"query": search_term, "limit": limit}
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            "https://api.sid.ai/v1/users/me/query",
-            headers=headers,
-            data=json.dumps(data),
-        ) as response:
-            response.raise_for_status()
-            search_results = await response.json()
-            return search_results
+    async with get_session().post(
+        "https://api.sid.ai/v1/users/me/query",
+        headers=headers,
+        data=json.dumps(data),
+    ) as response:
+        response.raise_for_status()
+        search_results = await response.json()
+        return search_results
 
 
 async def token_exchange(refresh_token: str) -> tuple[str, datetime]:
@@ -43,14 +54,13 @@ async def token_exchange(refresh_token: str) -> tuple[str, datetime]:
         "redirect_uri": settings.sid_redirect_uri,
         "refresh_token": refresh_token,
     }
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            "https://auth.sid.ai/oauth/token", data=data
-        ) as response:
-            response.raise_for_status()
-            response_data = await response.json()
-            access_token = response_data["access_token"]
-            expires_in = response_data["expires_in"]
+    async with get_session().post(
+        "https://auth.sid.ai/oauth/token", data=data
+    ) as response:
+        response.raise_for_status()
+        response_data = await response.json()
+        access_token = response_data["access_token"]
+        expires_in = response_data["expires_in"]
     return access_token, datetime.now() + timedelta(seconds=expires_in)
 
 
@@ -59,14 +69,65 @@ async def get_access_token(
 ) -> Optional[str]:
     if not installation.refresh_token_enc:
         return None
-    if datetime.now() + timedelta(minutes=5) > installation.access_token_expiration:
-        refresh_token = encryption_service.decrypt(installation.refresh_token_enc)
-        access_token, expiration = await token_exchange(refresh_token)
-        installation.access_token_enc = encryption_service.encrypt(access_token)
-        installation.access_token_expiration = expiration
-        await installation.save(oauth_crud.session)
+    if (token := access_tokens.get(installation.id)) is not None:
+        return token
+
+    expiring_before = datetime.now() + TOKEN_REFRESH_MARGIN
+    if expiring_before > installation.access_token_expiration:
+        # The exchange outlives the request, so it gets a session of its own
+        create_session = partial(
+            AsyncSession, oauth_crud.session.bind, expire_on_commit=False
+        )
+        token = await sid_refresh_flight.do(
+            installation.id,
+            partial(
+                refresh_installation, create_session, installation.id, expiring_before
+            ),
+        )
+        if token is not None:
+            return token
+
+        # Renewed elsewhere since it was read, or still being renewed
+        await oauth_crud.session.refresh(installation)
+        if installation.access_token_expiration <= datetime.now():
+            return None
 
-    return encryption_service.decrypt(installation.access_token_enc)
+    token = encryption_service.decrypt(installation.access_token_enc)
+    access_tokens.set(installation.id, token, installation.access_token_expiration)
+    return token
+
+
+async def refresh_installation(
+    create_session: Callable[[], AsyncSession],
+    installation_id: str,
+    expiring_before: datetime,
+) -> Optional[str]:
+    """
+    Renews an installation's access token in a transaction of its own, with its
+    row locked like the background refresher does, so no two workers exchange
+    the same refresh token. None if it was renewed or is being renewed elsewhere.
+    """
+    async with create_session() as session, session.begin():
+        installation = await OAuthCrud(session).lock_expiring_installation(
+            installation_id, expiring_before
+        )
+        if installation is None:
+            return None
+
+        return await refresh_access_token(session, installation)
+
+
+async def refresh_access_token(
+    session: AsyncSession, installation: OauthCredentials
+) -> str:
+    refresh_token = encryption_service.decrypt(installation.refresh_token_enc)
+    access_token, expiration = await token_exchange(refresh_token)
+    installation.access_token_enc = encryption_service.encrypt(access_token)
+    installation.access_token_expiration = expiration
+    await installation.save(session)
+
+    access_tokens.set(installation.id, access_token, expiration)
+    return access_token
 
 
 class SID(Tool):
@@ -124,7 +185,9 @@ class SID(Tool):
         if not snippets:
             return None
 
-        return summarize_sid(self.model, self.language, goal, task, snippets)
+        return summarize_sid(
+            self.model, self.language, goal, task, snippets, self.llm_kwargs
+        )
 
 
     async def call(
@@ -138,6 +201,6 @@ class SID(Tool):
         **kwargs: Any,
     ) -> FastAPIStreamingResponse:
          # fall back to search if no results are found
-        return await self._run_sid(goal, task, input_str, user, oauth_crud) or await Search(self.model, self.language).call(
+        return await self._run_sid(goal, task, input_str, user, oauth_crud) or await Search(self.model, self.language, self.llm_kwargs).call(
         goal, task, input_str, user, oauth_crud
     )
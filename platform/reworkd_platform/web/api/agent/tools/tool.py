@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from lanarky.responses import StreamingResponse
 from langchain.chat_models.base import BaseChatModel
@@ -16,10 +16,17 @@ class Tool(ABC):
 
     model: BaseChatModel
     language: str
+    llm_kwargs: Dict[str, Any]  # Parameters of this call's model calls
 
-    def __init__(self, model: BaseChatModel, language: str):
+    def __init__(
+        self,
+        model: BaseChatModel,
+        language: str,
+        llm_kwargs: Optional[Dict[str, Any]] = None,
+    ):
         self.model = model
         self.language = language
+        self.llm_kwargs = llm_kwargs or {}
 
     @staticmethod
     def available() -> bool:
@@ -1,19 +1,47 @@
+import asyncio
 from typing import List, Type
 
 from reworkd_platform.db.crud.oauth import OAuthCrud
 from reworkd_platform.schemas.user import UserBase
+from reworkd_platform.web.api.agent.tools.availability import availability_cache
 from reworkd_platform.web.api.agent.tools.code import Code
 from reworkd_platform.web.api.agent.tools.image import Image
 from reworkd_platform.web.api.agent.tools.search import Search
 from reworkd_platform.web.api.agent.tools.sidsearch import SID
+from reworkd_platform.web.api.agent.tools.registry import (
+    format_tool_name,
+    get_tool_name,
+    tool_registry,
+)
 from reworkd_platform.web.api.agent.tools.tool import Tool
 
+# Wikipedia,  # TODO: Remove if async doesn't work
+tool_registry.register(Image)
+tool_registry.register(Code)
+tool_registry.register(SID)
+tool_registry.register(Search, default=True, fallback=True)
+
 
 async def get_user_tools(
     tool_names: List[str], user: UserBase, crud: OAuthCrud
 ) -> List[Type[Tool]]:
     tools = list(map(get_tool_from_name, tool_names)) + get_default_tools()
-    return [tool for tool in tools if await tool.dynamic_available(user, crud)]
+    available = await asyncio.gather(
+        *(is_dynamically_available(tool, user, crud) for tool in tools)
+    )
+    return [tool for tool, is_available in zip(tools, available) if is_available]
+
+
+async def is_dynamically_available(
+    tool: Type[Tool], user: UserBase, crud: OAuthCrud
+) -> bool:
+    name = get_tool_name(tool)
+    if (available := availability_cache.get(user.id, name)) is not None:
+        return available
+
+    available = await tool.dynamic_available(user, crud)
+    availability_cache.set(user.id, name, available)
+    return available
 
 
 def get_available_tools() -> List[Type[Tool]]:
@@ -21,30 +49,15 @@ def get_available_tools() -> List[Type[Tool]]:
 
 
 def get_available_tools_names() -> List[str]:
-    return [get_tool_name(tool) for tool in get_available_tools()]
+    return tool_registry.names
 
 
 def get_external_tools() -> List[Type[Tool]]:
-    return [
-        # Wikipedia,  # TODO: Remove if async doesn't work
-        Image,
-        Code,
-        SID,
-    ]
+    return list(tool_registry.external)
 
 
 def get_default_tools() -> List[Type[Tool]]:
-    return [
-        Search,
-    ]
-
-
-def get_tool_name(tool: Type[Tool]) -> str:
-    return format_tool_name(tool.__name__)
-
-
-def format_tool_name(tool_name: str) -> str:
-    return tool_name.lower()
+    return list(tool_registry.defaults)
 
 
 def get_tools_overview(tools: List[Type[Tool]]) -> str:
@@ -63,15 +76,11 @@ def get_tools_overview(tools: List[Type[Tool]]) -> str:
 
 
 def get_tool_from_name(tool_name: str) -> Type[Tool]:
-    for tool in get_available_tools():
-        if get_tool_name(tool) == format_tool_name(tool_name):
-            return tool
-
-    return get_default_tool()
+    return tool_registry.get(tool_name)
 
 
 def get_default_tool() -> Type[Tool]:
-    return Search
+    return tool_registry.default
 
 
 def get_default_tool_name() -> str:
@@ -1,11 +1,16 @@
 from dataclasses import dataclass
-from typing import List
+from typing import Any, Dict, List, Optional
 
 from fastapi.responses import StreamingResponse as FastAPIStreamingResponse
 from lanarky.responses import StreamingResponse
-from langchain import LLMChain
 from langchain.chat_models.base import BaseChatModel
 
+from reworkd_platform.web.api.agent.chains import (
+    summarize_chain,
+    summarize_sid_chain,
+    summarize_with_sources_chain,
+)
+
 
 @dataclass
 class CitedSnippet:
@@ -36,10 +41,9 @@ def summarize(
     language: str,
     goal: str,
     text: str,
+    llm_kwargs: Optional[Dict[str, Any]] = None,
 ) -> FastAPIStreamingResponse:
-    from reworkd_platform.web.api.agent.prompts import summarize_prompt
-
-    chain = LLMChain(llm=model, prompt=summarize_prompt)
+    chain = summarize_chain.bind(model, **(llm_kwargs or {}))
 
     return StreamingResponse.from_chain(
         chain,
@@ -58,10 +62,9 @@ def summarize_with_sources(
     goal: str,
     query: str,
     snippets: List[CitedSnippet],
+    llm_kwargs: Optional[Dict[str, Any]] = None,
 ) -> FastAPIStreamingResponse:
-    from reworkd_platform.web.api.agent.prompts import summarize_with_sources_prompt
-
-    chain = LLMChain(llm=model, prompt=summarize_with_sources_prompt)
+    chain = summarize_with_sources_chain.bind(model, **(llm_kwargs or {}))
 
     return StreamingResponse.from_chain(
         chain,
@@ -81,10 +84,9 @@ def summarize_sid(
     goal: str,
     query: str,
     snippets: List[Snippet],
+    llm_kwargs: Optional[Dict[str, Any]] = None,
 ) -> FastAPIStreamingResponse:
-    from reworkd_platform.web.api.agent.prompts import summarize_sid_prompt
-
-    chain = LLMChain(llm=model, prompt=summarize_sid_prompt)
+    chain = summarize_sid_chain.bind(model, **(llm_kwargs or {}))
 
     return StreamingResponse.from_chain(
         chain,
@@ -1,24 +1,44 @@
-from typing import List, Optional
+import asyncio
+from typing import List, Optional, Set
 
 from fastapi import APIRouter, Depends
 from fastapi.responses import StreamingResponse as FastAPIStreamingResponse
+from loguru import logger
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from reworkd_platform.db.crud.agent import AgentCRUD
+from reworkd_platform.db.crud.oauth import OAuthCrud
+from reworkd_platform.db.dependencies import get_db_session_factory
 from reworkd_platform.schemas.agent import (
     AgentChat,
+    AgentLoop,
     AgentRun,
     AgentSummarize,
     AgentTaskAnalyze,
+    AgentTaskAnalyzeBatch,
     AgentTaskCreate,
     AgentTaskExecute,
+    AnalysisBatch,
     NewTasksResponse,
 )
+from reworkd_platform.settings import settings
 from reworkd_platform.web.api.agent.agent_service.agent_service import AgentService
+from reworkd_platform.web.api.agent.agent_loop import (
+    AgentLoopRunner,
+    AgentServiceFactory,
+)
 from reworkd_platform.web.api.agent.agent_service.agent_service_provider import (
     get_agent_service,
+    get_agent_service_factory,
 )
 from reworkd_platform.web.api.agent.analysis import Analysis
 from reworkd_platform.web.api.agent.dependancies import (
+    AgentCRUDFactory,
+    agent_analyze_batch_validator,
+    agent_crud,
+    agent_crud_factory,
+    agent_loop_validator,
     agent_analyze_validator,
     agent_chat_validator,
     agent_create_validator,
@@ -26,10 +46,13 @@ from reworkd_platform.web.api.agent.dependancies import (
     agent_start_validator,
     agent_summarize_validator,
 )
-from reworkd_platform.web.api.agent.tools.tools import get_external_tools, get_tool_name
+from reworkd_platform.web.api.agent.tools.tools import tool_registry
 
 router = APIRouter()
 
+# Strong references to the running prefetches, which nothing awaits
+_prefetches: Set["asyncio.Task[None]"] = set()
+
 #启动任务的 API 端点，该端点接受任务目标并调用任务代理服务来生成新任务
 @router.post(
     "/start",
@@ -55,19 +78,69 @@ async def analyze_tasks(
     )
 
 
+@router.post("/analyze/batch")
+async def analyze_tasks_batch(
+    req_body: AgentTaskAnalyzeBatch = Depends(agent_analyze_batch_validator),
+    agent_service: AgentService = Depends(
+        get_agent_service(agent_analyze_batch_validator)
+    ),
+) -> AnalysisBatch:
+    return await agent_service.analyze_tasks_agent(
+        goal=req_body.goal,
+        tasks=req_body.tasks,
+        tool_names=req_body.tool_names or [],
+    )
+
+
 @router.post("/execute")
 async def execute_tasks(
     req_body: AgentTaskExecute = Depends(agent_execute_validator),
     agent_service: AgentService = Depends(
         get_agent_service(validator=agent_execute_validator, streaming=True),
     ),
+    create_service: AgentServiceFactory = Depends(
+        get_agent_service_factory(agent_execute_validator)
+    ),
+    session_factory: "async_sessionmaker[AsyncSession]" = Depends(
+        get_db_session_factory
+    ),
 ) -> FastAPIStreamingResponse:
-    return await agent_service.execute_task_agent(
+    response = await agent_service.execute_task_agent(
         goal=req_body.goal or "",
         task=req_body.task or "",
         analysis=req_body.analysis,
     )
 
+    if settings.speculative_analysis_enabled and req_body.next_tasks:
+        task = asyncio.create_task(
+            prefetch_analyses(create_service, session_factory, req_body)
+        )
+        _prefetches.add(task)
+        task.add_done_callback(_prefetches.discard)
+    return response
+
+
+async def prefetch_analyses(
+    create_service: AgentServiceFactory,
+    session_factory: "async_sessionmaker[AsyncSession]",
+    body: AgentTaskExecute,
+) -> None:
+    """
+    Starts the speculative analyses of the next tasks without delaying the
+    response. It runs on a service and session of its own, so it neither alters
+    the executing model nor shares the request's session while it streams.
+    """
+    try:
+        async with session_factory() as session:
+            await create_service(oauth_crud=OAuthCrud(session)).prefetch_analyses(
+                run_id=body.run_id,
+                goal=body.goal,
+                tasks=body.next_tasks,
+                tool_names=body.tool_names,
+            )
+    except Exception as e:
+        logger.warning(f"Prefetching analyses failed: {e}")
+
 
 @router.post("/create")
 async def create_tasks(
@@ -118,6 +191,23 @@ async def chat(
     )
 
 
+@router.post("/run")
+async def run_agent(
+    req_body: AgentLoop = Depends(agent_loop_validator),
+    crud: AgentCRUD = Depends(agent_crud),
+    create_crud: AgentCRUDFactory = Depends(agent_crud_factory),
+    create_service: AgentServiceFactory = Depends(
+        get_agent_service_factory(agent_loop_validator)
+    ),
+) -> FastAPIStreamingResponse:
+    """Runs the whole agent loop server-side, streaming each step as an SSE event"""
+    # The steps' sessions must see the run, and the request's connection is
+    # released instead of being held for the length of the stream
+    await crud.session.commit()
+    runner = AgentLoopRunner(req_body, create_crud, create_service)
+    return FastAPIStreamingResponse(runner.stream(), media_type="text/event-stream")
+
+
 class ToolModel(BaseModel):
     name: str
     description: str
@@ -131,16 +221,4 @@ class ToolsResponse(BaseModel):
 
 @router.get("/tools")
 async def get_user_tools() -> ToolsResponse:
-    tools = get_external_tools()
-    formatted_tools = [
-        ToolModel(
-            name=get_tool_name(tool),
-            description=tool.public_description,
-            color="TODO: Change to image of tool",
-            image_url=tool.image_url,
-        )
-        for tool in tools
-        if tool.available()
-    ]
-
-    return ToolsResponse(tools=formatted_tools)
+    return ToolsResponse(tools=tool_registry.public_tools())
@@ -1,5 +1,8 @@
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, Optional, Tuple
 
 from fastapi import Depends, Header
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -9,8 +12,74 @@ from sqlalchemy.orm.exc import NoResultFound
 from reworkd_platform.db.crud.user import UserCrud
 from reworkd_platform.db.dependencies import get_db_session
 from reworkd_platform.schemas.user import UserBase
+from reworkd_platform.services.metrics import metrics
+from reworkd_platform.settings import settings
 from reworkd_platform.web.api.http_responses import forbidden
 
+CachedSession = Tuple[Optional[UserBase], float]  # user or invalid, valid until
+
+
+class SessionCache:
+    """
+    Bounded cache of authenticated users by session token.
+    An entry lives for at most `ttl` seconds and never past the expiry of its
+    session. Unknown tokens are cached as invalid for `negative_ttl` seconds.
+    Sessions are created and deleted by the frontend's auth, which this service
+    never hears from, so a signed out session keeps authenticating on a worker
+    until its entry expires: at most `ttl` seconds, 0 disabling the cache.
+    """
+
+    def __init__(self, ttl: float, negative_ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, CachedSession]" = OrderedDict()
+
+    def get(self, token: str) -> Optional[CachedSession]:
+        key = _hash(token)
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            metrics.increment("session_cache.miss")
+            return None
+
+        self._entries.move_to_end(key)
+        metrics.increment(
+            "session_cache.hit" if entry[0] else "session_cache.negative_hit"
+        )
+        return entry
+
+    def set(self, token: str, user: UserBase, expires: datetime) -> None:
+        remaining = (expires - datetime.utcnow()).total_seconds()
+        self._put(token, user, min(self.ttl, remaining))
+
+    def set_invalid(self, token: str) -> None:
+        self._put(token, None, self.negative_ttl)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _put(self, token: str, user: Optional[UserBase], ttl: float) -> None:
+        if ttl <= 0:
+            return
+
+        key = _hash(token)
+        self._entries[key] = (user, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        metrics.gauge("session_cache.size", len(self._entries))
+
+
+def _hash(token: str) -> bytes:
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+
+session_cache = SessionCache(
+    ttl=settings.session_cache_ttl,
+    negative_ttl=settings.session_cache_negative_ttl,
+    max_entries=settings.session_cache_max_entries,
+)
+
 
 def user_crud(
     session: AsyncSession = Depends(get_db_session),
@@ -25,17 +94,25 @@ async def get_current_user(
 ) -> UserBase:
     session_token = bearer.credentials
 
+    if (cached := session_cache.get(session_token)) is not None:
+        if (user := cached[0]) is None:
+            raise forbidden("Invalid session token")
+        return user
+
     try:
         session = await crud.get_user_session(session_token)
     except NoResultFound:
+        session_cache.set_invalid(session_token)
         raise forbidden("Invalid session token")
 
     if session.expires <= datetime.utcnow():
         raise forbidden("Session token expired")
 
-    return UserBase(
+    user = UserBase(
         id=session.user.id,
         name=session.user.name,
         email=session.user.email,
         image=session.user.image,
     )
+    session_cache.set(session_token, user, session.expires)
+    return user
@@ -36,3 +36,7 @@ class MaxLoopsError(PlatformaticError):
 
 class MultipleSummaryError(PlatformaticError):
     pass
+
+
+class RateLimitExceededError(PlatformaticError):
+    pass
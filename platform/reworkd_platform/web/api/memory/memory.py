@@ -1,13 +1,51 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from pydantic import BaseModel
+
+from reworkd_platform.settings import settings
+
+OPENAI_EMBEDDING_DIM = 1536
 
 SimilarTasks = List[Tuple[str, float]]
+T = TypeVar("T")
+
+
+class QueryResult(BaseModel):
+    id: str
+    score: float
+    metadata: Dict[str, Any] = {}
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+async def run_in_thread(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Runs a blocking memory call on a thread pool shared by all memories.
+    The pool is bounded so slow backends cannot exhaust the default executor.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.memory_max_threads,
+            thread_name_prefix="memory",
+        )
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
 
 
 class AgentMemory(ABC):
     """
     Base class for AgentMemory
     Expose __enter__ and __exit__ to ensure connections get closed within requests
+
+    The async methods run the blocking ones on a bounded thread pool. Backends
+    with native async I/O override them.
     """
 
     @abstractmethod
@@ -30,6 +68,23 @@ class AgentMemory(ABC):
     def reset_class(self) -> None:
         raise NotImplementedError()
 
+    async def __aenter__(self) -> "AgentMemory":
+        return await run_in_thread(self.__enter__)
+
+    async def __aexit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        await run_in_thread(self.__exit__, exc_type, exc_value, traceback)
+
+    async def aadd_tasks(self, tasks: List[str]) -> List[str]:
+        return await run_in_thread(self.add_tasks, tasks)
+
+    async def aget_similar_tasks(
+        self, query: str, score_threshold: float = 0.95
+    ) -> List[str]:
+        return await run_in_thread(self.get_similar_tasks, query, score_threshold)
+
+    async def areset_class(self) -> None:
+        await run_in_thread(self.reset_class)
+
     @staticmethod
     def should_use() -> bool:
         return True
@@ -51,3 +51,40 @@ class MemoryWithFallback(AgentMemory):
         except Exception as e:
             logger.exception(e)
             self.secondary.reset_class()
+
+    async def __aenter__(self) -> AgentMemory:
+        try:
+            return await self.primary.__aenter__()
+        except Exception as e:
+            logger.exception(e)
+            return await self.secondary.__aenter__()
+
+    async def __aexit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        try:
+            await self.primary.__aexit__(exc_type, exc_value, traceback)
+        except Exception as e:
+            logger.exception(e)
+            await self.secondary.__aexit__(exc_type, exc_value, traceback)
+
+    async def aadd_tasks(self, tasks: List[str]) -> List[str]:
+        try:
+            return await self.primary.aadd_tasks(tasks)
+        except Exception as e:
+            logger.exception(e)
+            return await self.secondary.aadd_tasks(tasks)
+
+    async def aget_similar_tasks(
+        self, query: str, score_threshold: float = 0
+    ) -> List[str]:
+        try:
+            return await self.primary.aget_similar_tasks(query)
+        except Exception as e:
+            logger.exception(e)
+            return await self.secondary.aget_similar_tasks(query)
+
+    async def areset_class(self) -> None:
+        try:
+            await self.primary.areset_class()
+        except Exception as e:
+            logger.exception(e)
+            await self.secondary.areset_class()
@@ -23,3 +23,20 @@ class NullAgentMemory(AgentMemory):
 
     def reset_class(self) -> None:
         pass
+
+    async def __aenter__(self) -> AgentMemory:
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        pass
+
+    async def aadd_tasks(self, tasks: List[str]) -> List[str]:
+        return []
+
+    async def aget_similar_tasks(
+        self, query: str, score_threshold: float = 0
+    ) -> List[str]:
+        return []
+
+    async def areset_class(self) -> None:
+        pass
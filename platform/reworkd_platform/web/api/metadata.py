@@ -6,10 +6,14 @@ from fastapi import APIRouter
 from httpx import AsyncClient, HTTPStatusError, RequestError
 from pydantic import BaseModel, Field
 
+from reworkd_platform.services.singleflight import SingleFlight
 from reworkd_platform.web.api.errors import PlatformaticError
 
 router = APIRouter()
 
+# Identical concurrent lookups share one page fetch
+metadata_flight = SingleFlight("metadata")
+
 
 class Metadata(BaseModel):
     title: Optional[str] = Field(default=None, description="Title of the page")
@@ -21,6 +25,10 @@ class Metadata(BaseModel):
     "",
 )
 async def extract_metadata(url: str) -> Metadata:
+    return await metadata_flight.do(url, lambda: _extract_metadata(url))
+
+
+async def _extract_metadata(url: str) -> Metadata:
     try:
         headers = {
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 12_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/104.0.0.0 Safari/537.36"
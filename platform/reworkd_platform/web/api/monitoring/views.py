@@ -1,5 +1,9 @@
+from typing import Any, Dict
+
 from fastapi import APIRouter
 
+from reworkd_platform.services.metrics import metrics
+
 router = APIRouter()
 
 
@@ -18,3 +22,12 @@ def error_check() -> None:
     Checks that errors are being correctly logged.
     """
     raise Exception("This is an expected error from the error check endpoint!")
+
+
+@router.get("/metrics")
+def get_metrics() -> Dict[str, Any]:
+    """
+    Returns a snapshot of the in-process counters, gauges, summaries and
+    histograms for the current worker.
+    """
+    return metrics.snapshot()
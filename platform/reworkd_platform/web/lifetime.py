@@ -6,7 +6,37 @@ from sqlalchemy.ext.asyncio import async_sessionmaker
 from reworkd_platform.db.meta import meta
 from reworkd_platform.db.models import load_all_models
 from reworkd_platform.db.utils import create_engine
+from reworkd_platform.services.completion_cache.lifetime import (
+    init_completion_cache,
+    shutdown_completion_cache,
+)
+from reworkd_platform.services.embedding_batcher.lifetime import (
+    init_embedding_batcher,
+    shutdown_embedding_batcher,
+)
+from reworkd_platform.services.embedding_cache.lifetime import (
+    init_embedding_cache,
+    shutdown_embedding_cache,
+)
+from reworkd_platform.services.http_client.lifetime import (
+    init_http_session,
+    shutdown_http_session,
+)
+from reworkd_platform.services.rate_limiter.lifetime import init_rate_limiter
+from reworkd_platform.services.search_cache.lifetime import (
+    init_search_cache,
+    shutdown_search_cache,
+)
+from reworkd_platform.services.task_writer.lifetime import (
+    init_task_writer,
+    shutdown_task_writer,
+)
+from reworkd_platform.services.token_refresher.lifetime import (
+    init_token_refresher,
+    shutdown_token_refresher,
+)
 from reworkd_platform.services.tokenizer.lifetime import init_tokenizer
+from reworkd_platform.web.api.agent.tools.tools import tool_registry
 
 
 def _setup_db(app: FastAPI) -> None:  # pragma: no cover
@@ -54,7 +84,16 @@ def register_startup_event(
     @app.on_event("startup")
     async def _startup() -> None:  # noqa: WPS430
         _setup_db(app)
+        init_task_writer(app)
         init_tokenizer(app)
+        init_rate_limiter(app)
+        init_completion_cache(app)
+        init_http_session(app)
+        init_search_cache(app)
+        init_embedding_cache(app)
+        init_embedding_batcher(app)
+        tool_registry.load_entry_points()
+        init_token_refresher(app)
         # await _create_tables()
 
     return _startup
@@ -72,6 +111,13 @@ def register_shutdown_event(
 
     @app.on_event("shutdown")
     async def _shutdown() -> None:  # noqa: WPS430
+        await shutdown_token_refresher(app)
+        await shutdown_task_writer(app)
         await app.state.db_engine.dispose()
+        shutdown_completion_cache(app)
+        await shutdown_http_session(app)
+        shutdown_search_cache(app)
+        await shutdown_embedding_batcher(app)
+        shutdown_embedding_cache(app)
 
     return _shutdown